@@ -0,0 +1,124 @@
+"""Compare the cost of the MCAP write paths for converted events.
+
+Run from the repository root:
+
+    python benchmarks/write_path.py --messages 200000
+
+Every path writes the same gauge events, with zstd chunk compression, to an
+in-memory stream:
+
+- protobuf-writer: ``mcap_protobuf.writer.Writer.write_message`` with a
+  message object, which looks up the schema and channel by message type and
+  serializes each message
+- write-event: ``EventWriter.write_event`` with a message object, which also
+  records the series index
+- message-record: ``ChunkCopyWriter.add_message`` with a ``Message`` record
+  built for each pre-serialized message
+- write-serialized: ``EventWriter.write_serialized`` with pre-serialized bytes
+"""
+
+import argparse
+import io
+import time
+from typing import Callable, List
+
+from mcap.records import Message
+from mcap_protobuf.writer import Writer
+
+from vector2mcap import event_pb2
+from vector2mcap.mcap_chunks import ChunkCopyWriter
+from vector2mcap.mcap_writer import TOPIC, EventWriter
+
+
+def make_events(count: int) -> List[event_pb2.EventWrapper]:
+    """Build gauge events spread over 100 series."""
+    events = []
+    for index in range(count):
+        event = event_pb2.EventWrapper()
+        metric = event.metric
+        metric.name = "cpu_usage"
+        metric.namespace = "host"
+        metric.tags_v1["host"] = f"host-{index % 100}"
+        metric.tags_v1["region"] = "eu-west-1"
+        metric.timestamp.FromNanoseconds(1_752_675_600_000_000_000 + index * 1000)
+        metric.kind = event_pb2.Metric.Absolute
+        metric.gauge.value = index * 0.5
+        events.append(event)
+    return events
+
+
+def protobuf_writer(events: List[event_pb2.EventWrapper]) -> None:
+    with Writer(io.BytesIO()) as writer:
+        for event in events:
+            log_time = event.metric.timestamp.ToNanoseconds()
+            writer.write_message(TOPIC, event, log_time=log_time, publish_time=log_time)
+
+
+def write_event(events: List[event_pb2.EventWrapper]) -> None:
+    with EventWriter(io.BytesIO()) as writer:
+        for event in events:
+            writer.write_event(event, event.metric.timestamp.ToNanoseconds())
+
+
+def message_record(serialized: List[tuple]) -> None:
+    writer = ChunkCopyWriter(io.BytesIO())
+    writer.start()
+    for log_time, data in serialized:
+        writer.add_message(
+            Message(
+                channel_id=1,
+                sequence=0,
+                log_time=log_time,
+                publish_time=log_time,
+                data=data,
+            )
+        )
+    writer.finish()
+
+
+def write_serialized(serialized: List[tuple]) -> None:
+    with EventWriter(io.BytesIO()) as writer:
+        for log_time, data in serialized:
+            writer.write_serialized(TOPIC, data, log_time)
+
+
+def measure(name: str, run: Callable[[], None], count: int, repeat: int) -> None:
+    best = min(_timed(run) for _ in range(repeat))
+    print(f"{name:<18} {best:8.3f} s  {count / best:12,.0f} messages/s")
+
+
+def _timed(run: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    events = make_events(args.messages)
+    serialized = [
+        (event.metric.timestamp.ToNanoseconds(), event.SerializeToString())
+        for event in events
+    ]
+
+    measure(
+        "protobuf-writer", lambda: protobuf_writer(events), len(events), args.repeat
+    )
+    measure("write-event", lambda: write_event(events), len(events), args.repeat)
+    measure(
+        "message-record", lambda: message_record(serialized), len(events), args.repeat
+    )
+    measure(
+        "write-serialized",
+        lambda: write_serialized(serialized),
+        len(events),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
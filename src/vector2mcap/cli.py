@@ -1,44 +1,366 @@
 """Command-line interface for vector2mcap."""
 
-import glob
+import json
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import click
 from rich.console import Console
 from rich.progress import Progress, TaskID
 
+from .discovery import Discovery, WorkPlan, discover_inputs, plan_work
+from .filters import EventFilter, parse_tag, parse_time_bound
+from .memory import MemoryBudget, parse_size
+from .rollup import Rollup
+from .sampling import EveryNthSampler, RangeSampling, ReservoirSampler
+
 
 console = Console()
 
+# Problems printed by 'verify' before the rest are summarized
+MAX_PROBLEMS_SHOWN = 20
+
+
+def _time_bound_option(ctx, param, value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return parse_time_bound(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _tag_option(ctx, param, values: tuple[str, ...]) -> dict[str, str]:
+    tags = {}
+    for value in values:
+        try:
+            key, tag_value = parse_tag(value)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        tags[key] = tag_value
+    return tags
+
+
+def _discover(input_patterns: tuple[str, ...]) -> Discovery:
+    """Find the input files for paths, directories and glob patterns."""
+    discovery = discover_inputs(input_patterns)
+    for pattern in discovery.unmatched:
+        console.print(f"[yellow]Warning: No files match pattern '{pattern}'[/yellow]")
+
+    if not discovery.files:
+        console.print("[red]Error: No input files found[/red]")
+        raise click.ClickException("No input files found")
+    return discovery
+
+
+def _size_option(ctx, param, value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _expand_patterns(input_patterns: tuple[str, ...]) -> list[str]:
+    """Expand input patterns to unique file paths in conversion order."""
+    return [input_file.path for input_file in _discover(input_patterns).files]
+
+
+def _print_inputs(discovery: Discovery) -> None:
+    """Print the discovered inputs in order."""
+    from datetime import datetime, timezone
+
+    from rich.table import Table
+
+    files = Table("#", "File", "Bytes", "Modified (UTC)")
+    for index, input_file in enumerate(discovery.files, 1):
+        modified = datetime.fromtimestamp(input_file.mtime_ns / 1e9, timezone.utc)
+        files.add_row(
+            str(index),
+            input_file.path,
+            f"{input_file.size:,}",
+            modified.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+    console.print(files)
+    console.print(f"{len(discovery.files)} files, {discovery.total_size:,} bytes")
 
-@click.command()
+
+def _print_work_plan(plan: WorkPlan) -> None:
+    """Print how work units are split and ordered across workers."""
+    from rich.table import Table
+
+    units = Table("Unit", "File", "Byte range", "Bytes")
+    for index, unit in enumerate(plan.units, 1):
+        units.add_row(
+            str(index), unit.path, f"{unit.start:,}-{unit.end:,}", f"{unit.size:,}"
+        )
+    console.print(units)
+    console.print(
+        f"{len(plan.units)} units over {plan.workers} workers, "
+        f"{plan.split_files} files split; largest worker load "
+        f"{max(plan.loads):,} bytes, smallest {min(plan.loads):,}"
+    )
+
+
+def _filter_options(command):
+    """Add the event filter options to a command."""
+    options = [
+        click.option(
+            "--include-name",
+            multiple=True,
+            help="Only convert metrics whose name matches this glob (repeatable)",
+        ),
+        click.option(
+            "--exclude-name",
+            multiple=True,
+            help="Skip metrics whose name matches this glob (repeatable)",
+        ),
+        click.option(
+            "--tag",
+            "tags",
+            multiple=True,
+            callback=_tag_option,
+            help="Only convert metrics with tag key=value (repeatable)",
+        ),
+        click.option(
+            "--since",
+            callback=_time_bound_option,
+            help="Only convert metrics at or after this ISO 8601 time",
+        ),
+        click.option(
+            "--until",
+            callback=_time_bound_option,
+            help="Only convert metrics before this ISO 8601 time",
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+class DefaultCommandGroup(click.Group):
+    """Command group that runs a default command when no subcommand is named.
+
+    Keeps ``vector2mcap input.out -o output.mcap`` working alongside
+    subcommands such as ``vector2mcap merge``.
+    """
+
+    default_command = "convert"
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if (
+            args
+            and args[0] not in self.commands
+            and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup)
+def main() -> None:
+    """Convert Vector JSONL files to MCAP format.
+
+    Without a subcommand, arguments are passed to 'convert'.
+    """
+
+
+@main.command()
 @click.argument("input_patterns", nargs=-1, required=True)
-@click.option("-o", "--output", required=True, help="Output MCAP file path")
+@click.option(
+    "-o",
+    "--output",
+    help="Output MCAP file path (a directory with --partition-by)",
+)
 @click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
-def main(input_patterns: tuple[str, ...], output: str, verbose: bool) -> None:
+@_filter_options
+@click.option(
+    "--sorted",
+    "sorted_input",
+    is_flag=True,
+    help="Input files are time-sorted: seek to --since and stop after --until",
+)
+@click.option(
+    "--checkpoint-interval",
+    type=click.IntRange(min=0),
+    default=100_000,
+    show_default=True,
+    help="Record a recovery checkpoint every N messages (0 disables)",
+)
+@click.option(
+    "--resume-from",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Continue an interrupted conversion from the checkpoint in this "
+    "recovered MCAP file",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    help="Write series definitions once and samples by series id "
+    "(vector_series/vector_sample topics) instead of full events",
+)
+@click.option(
+    "--dedupe",
+    is_flag=True,
+    help="Skip absolute counter and gauge samples whose value has not changed",
+)
+@click.option(
+    "--heartbeat",
+    type=click.FloatRange(min=0, min_open=True),
+    help="With --dedupe, still write an unchanged sample after this many seconds",
+)
+@click.option(
+    "--rollup",
+    "rollup_window",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Aggregate each series into windows of this many seconds on the "
+    "vector_rollup topic",
+)
+@click.option(
+    "--rollup-lateness",
+    type=click.FloatRange(min=0),
+    default=0,
+    help="Seconds a sample may lag the newest one and still join its window",
+)
+@click.option(
+    "--rollup-only",
+    is_flag=True,
+    help="With --rollup, write only the rollups and not the raw events",
+)
+@click.option(
+    "--partition-by",
+    metavar="TAG",
+    help="Write one MCAP file per value of this tag into the output directory",
+)
+@click.option(
+    "--max-open-files",
+    type=click.IntRange(min=1),
+    default=64,
+    show_default=True,
+    help="With --partition-by, the most partition files kept open at once",
+)
+@click.option(
+    "--sample-every",
+    type=click.IntRange(min=1),
+    help="Keep the first sample of each series and every Nth after it",
+)
+@click.option(
+    "--sample-reservoir",
+    type=click.IntRange(min=1),
+    help="Keep a random sample of up to N events per series",
+)
+@click.option(
+    "--sample-ranges",
+    type=click.IntRange(min=1),
+    help="Only read N evenly spaced byte ranges of each input file",
+)
+@click.option(
+    "--sample-range-size",
+    type=click.IntRange(min=1),
+    default=1024 * 1024,
+    show_default=True,
+    help="Bytes per range with --sample-ranges",
+)
+@click.option(
+    "--max-memory",
+    metavar="SIZE",
+    callback=_size_option,
+    help="Keep memory use under SIZE (e.g. 512M, 2G) by sizing chunk buffers "
+    "and writing them out early under pressure",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Print the input files in conversion order and exit; files are "
+    "converted one after another, without a parallel work plan",
+)
+def convert(
+    input_patterns: tuple[str, ...],
+    output: str,
+    verbose: bool,
+    include_name: tuple[str, ...],
+    exclude_name: tuple[str, ...],
+    tags: dict[str, str],
+    since: Optional[int],
+    until: Optional[int],
+    sorted_input: bool,
+    checkpoint_interval: int,
+    resume_from: Optional[str],
+    compact: bool,
+    dedupe: bool,
+    heartbeat: Optional[float],
+    rollup_window: Optional[float],
+    rollup_lateness: float,
+    rollup_only: bool,
+    partition_by: Optional[str],
+    max_open_files: int,
+    sample_every: Optional[int],
+    sample_reservoir: Optional[int],
+    sample_ranges: Optional[int],
+    sample_range_size: int,
+    max_memory: Optional[int],
+    dry_run: bool,
+) -> None:
     """Convert Vector JSONL files to MCAP format.
 
-    INPUT_PATTERNS can be file paths or glob patterns like "*.out"
+    INPUT_PATTERNS can be file paths, directories (read recursively) or glob
+    patterns like "*.out" or "logs/**/*.jsonl". Files are converted in name
+    order, with rotated files such as "metrics.out.2" oldest first.
     """
     from .converter import convert_files
+    from .recovery import read_checkpoint
 
-    # Expand glob patterns to actual file paths
-    input_files = []
-    for pattern in input_patterns:
-        matches = glob.glob(pattern)
-        if not matches:
-            console.print(
-                f"[yellow]Warning: No files match pattern '{pattern}'[/yellow]"
-            )
-        input_files.extend(matches)
+    if heartbeat is not None and not dedupe:
+        raise click.UsageError("--heartbeat requires --dedupe")
+    if rollup_only and rollup_window is None:
+        raise click.UsageError("--rollup-only requires --rollup")
+    if partition_by is not None and resume_from is not None:
+        raise click.UsageError("--resume-from cannot be combined with --partition-by")
+    if sample_every is not None and sample_reservoir is not None:
+        raise click.UsageError(
+            "--sample-every and --sample-reservoir cannot be combined"
+        )
+    if sample_ranges is not None and (resume_from is not None or sorted_input):
+        raise click.UsageError(
+            "--sample-ranges cannot be combined with --resume-from or --sorted"
+        )
+    sampler = None
+    if sample_every is not None:
+        sampler = EveryNthSampler(sample_every)
+    elif sample_reservoir is not None:
+        sampler = ReservoirSampler(sample_reservoir)
+    range_sampling = None
+    if sample_ranges is not None:
+        range_sampling = RangeSampling(sample_ranges, sample_range_size)
+    rollup = None
+    if rollup_window is not None:
+        rollup = Rollup(
+            int(rollup_window * 1_000_000_000), int(rollup_lateness * 1_000_000_000)
+        )
 
-    if not input_files:
-        console.print("[red]Error: No input files found[/red]")
-        raise click.ClickException("No input files found")
+    if output is None and not dry_run:
+        raise click.UsageError("Missing option '-o' / '--output'")
 
-    # Remove duplicates and sort
-    input_files = sorted(set(input_files))
+    discovery = _discover(input_patterns)
+    if dry_run:
+        _print_inputs(discovery)
+        # Events go into one time-ordered file, so there is no work plan
+        console.print("Files are converted one after another in this order")
+        return
+    input_files = [input_file.path for input_file in discovery.files]
+
+    checkpoint = None
+    if resume_from is not None:
+        checkpoint = read_checkpoint(resume_from)
+        if checkpoint is None:
+            raise click.ClickException(f"No checkpoint found in {resume_from}")
+        if verbose:
+            console.print(
+                f"[green]Resuming from byte {checkpoint.offset} of "
+                f"{checkpoint.file_path}[/green]"
+            )
 
     if verbose:
         console.print(f"[green]Found {len(input_files)} input files:[/green]")
@@ -46,8 +368,41 @@ def main(input_patterns: tuple[str, ...], output: str, verbose: bool) -> None:
             console.print(f"  {file}")
         console.print(f"[green]Output file: {output}[/green]")
 
+    event_filter = EventFilter(
+        include_names=include_name,
+        exclude_names=exclude_name,
+        tags=tags,
+        since=since,
+        until=until,
+    )
+
+    memory_budget = None
+    if max_memory is not None:
+        try:
+            memory_budget = MemoryBudget(max_memory)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+
     try:
-        convert_files(input_files, output, verbose)
+        convert_files(
+            input_files,
+            output,
+            verbose=verbose,
+            event_filter=event_filter,
+            sorted_input=sorted_input,
+            checkpoint_interval=checkpoint_interval,
+            resume_from=checkpoint,
+            compact=compact,
+            dedupe=dedupe,
+            heartbeat=None if heartbeat is None else int(heartbeat * 1_000_000_000),
+            rollup=rollup,
+            keep_raw=not rollup_only,
+            partition_by=partition_by,
+            max_open_files=max_open_files,
+            sampler=sampler,
+            range_sampling=range_sampling,
+            memory_budget=memory_budget,
+        )
         console.print(
             f"[green]Successfully converted {len(input_files)} files to {output}[/green]"
         )
@@ -56,5 +411,564 @@ def main(input_patterns: tuple[str, ...], output: str, verbose: bool) -> None:
         raise click.ClickException(str(e))
 
 
+@main.command()
+@click.argument("input_files", nargs=-1, required=True)
+@click.option("-o", "--output", required=True, help="Output MCAP file path")
+@click.option(
+    "--concat",
+    is_flag=True,
+    help="Concatenate inputs in the order given instead of interleaving by time",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def merge(
+    input_files: tuple[str, ...], output: str, concat: bool, verbose: bool
+) -> None:
+    """Merge MCAP files produced by vector2mcap into one file.
+
+    Compressed chunks are copied verbatim where possible; only chunks whose
+    time ranges overlap are decompressed and re-chunked.
+    """
+    from .merger import merge_mcap
+
+    missing = [path for path in input_files if not Path(path).is_file()]
+    if missing:
+        raise click.ClickException(f"Input file not found: {missing[0]}")
+
+    try:
+        stats = merge_mcap(list(input_files), output, not concat, verbose)
+        console.print(
+            f"[green]Successfully merged {len(input_files)} files "
+            f"({stats.messages} messages) to {output}[/green]"
+        )
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", required=True, help="Output MCAP file path")
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def recover(input_file: str, output: str, verbose: bool) -> None:
+    """Rebuild a readable MCAP file from a truncated conversion output.
+
+    Prints the checkpoint to pass to 'convert --resume-from' so that the
+    conversion continues where it stopped.
+    """
+    from .recovery import recover_mcap
+
+    try:
+        result = recover_mcap(input_file, output, verbose)
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+    console.print(
+        f"[green]Recovered {result.messages_recovered} messages to {output}[/green]"
+    )
+    if not result.truncated:
+        console.print("[blue]Input was not truncated; nothing to resume[/blue]")
+        return
+    if result.last_log_time is not None:
+        console.print(f"Last log time: {result.last_log_time}")
+    checkpoint = result.checkpoint
+    if checkpoint is None:
+        console.print(
+            "[yellow]No checkpoint found: the input position is unknown, "
+            "use --since with the last log time to continue[/yellow]"
+        )
+        return
+    line = "" if checkpoint.line_number is None else f" (line {checkpoint.line_number})"
+    console.print(
+        f"Resume position: {checkpoint.file_path} byte {checkpoint.offset}{line}"
+    )
+    console.print(
+        f"Continue with: vector2mcap convert <inputs> -o <output> --resume-from {output}"
+    )
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", required=True, help="Output file path")
+@click.option(
+    "--format",
+    "row_format",
+    type=click.Choice(["jsonl", "csv", "parquet"]),
+    help="Output format  [default: from the output extension, else jsonl]",
+)
+@click.option(
+    "--topic",
+    "topics",
+    multiple=True,
+    help="Only export this topic (repeatable)  [default: all metric topics]",
+)
+@click.option(
+    "--since",
+    callback=_time_bound_option,
+    help="Only export messages at or after this ISO 8601 time",
+)
+@click.option(
+    "--until",
+    callback=_time_bound_option,
+    help="Only export messages before this ISO 8601 time",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Decoding processes  [default: one per CPU]",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def export(
+    input_file: str,
+    output: str,
+    row_format: Optional[str],
+    topics: tuple[str, ...],
+    since: Optional[int],
+    until: Optional[int],
+    workers: Optional[int],
+    verbose: bool,
+) -> None:
+    """Export the metrics of an MCAP file to JSONL, CSV or Parquet.
+
+    JSONL output is in Vector's format and can be converted again. CSV and
+    Parquet have timestamp, topic, name, namespace, tags, kind, type and value
+    columns.
+    """
+    from .export import export_mcap
+
+    if row_format is None:
+        suffix = Path(output).suffix.lower().lstrip(".")
+        row_format = suffix if suffix in ("csv", "parquet") else "jsonl"
+
+    try:
+        stats = export_mcap(
+            input_file,
+            output,
+            row_format,
+            list(topics) or None,
+            since,
+            until,
+            workers,
+            verbose,
+        )
+        console.print(f"[green]Exported {stats.rows} rows to {output}[/green]")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+
+@main.command()
+@click.argument("mcap_file", type=click.Path(exists=True, dir_okay=False))
+@click.argument("input_patterns", nargs=-1)
+@_filter_options
+@click.option(
+    "--sample",
+    "sample_rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0,
+    help="Fraction of input events to look up in the output and compare in full",
+)
+@click.option("--seed", type=int, help="Seed for choosing sampled events")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Chunk-checking processes  [default: one per CPU]",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def verify(
+    mcap_file: str,
+    input_patterns: tuple[str, ...],
+    include_name: tuple[str, ...],
+    exclude_name: tuple[str, ...],
+    tags: dict[str, str],
+    since: Optional[int],
+    until: Optional[int],
+    sample_rate: float,
+    seed: Optional[int],
+    workers: Optional[int],
+    verbose: bool,
+) -> None:
+    """Check an MCAP file's integrity, and that it matches its inputs.
+
+    Chunk CRCs and indexes are checked in parallel without decoding messages.
+    When INPUT_PATTERNS are given, their event count and time range are
+    compared with the summary; pass the filter options the conversion was run
+    with. Exits with an error if any problem is found.
+    """
+    from .verify import verify_mcap
+
+    if sample_rate and not input_patterns:
+        raise click.UsageError("--sample requires input files")
+    input_files = _expand_patterns(input_patterns) if input_patterns else []
+    event_filter = EventFilter(
+        include_names=include_name,
+        exclude_names=exclude_name,
+        tags=tags,
+        since=since,
+        until=until,
+    )
+
+    try:
+        report = verify_mcap(
+            mcap_file, input_files, event_filter, sample_rate, workers, seed, verbose
+        )
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+    for warning in report.warnings:
+        console.print(f"[yellow]Warning: {warning}[/yellow]")
+    for problem in report.problems[:MAX_PROBLEMS_SHOWN]:
+        console.print(f"[red]{problem}[/red]")
+    if len(report.problems) > MAX_PROBLEMS_SHOWN:
+        console.print(
+            f"[red]... and {len(report.problems) - MAX_PROBLEMS_SHOWN} more[/red]"
+        )
+    if not report.ok:
+        raise click.ClickException(
+            f"Verification of {mcap_file} found {len(report.problems)} problems"
+        )
+    checked = f"{report.chunks_checked} chunks, {report.messages} messages"
+    if report.input_events is not None:
+        checked += f", {report.input_events} input events"
+    if report.samples_checked:
+        checked += f", {report.samples_checked} sampled events"
+    console.print(f"[green]Verified {mcap_file}: {checked}[/green]")
+
+
+def _time_span(profile) -> str:
+    from .export import format_timestamp
+
+    if profile.start_time is None:
+        return "-"
+    return (
+        f"{format_timestamp(profile.start_time)} to "
+        f"{format_timestamp(profile.end_time)}"
+    )
+
+
+@main.command()
+@click.argument("input_patterns", nargs=-1, required=True)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Files or file ranges scanned at once  [default: one per CPU]",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=0),
+    default=10,
+    show_default=True,
+    help="Number of most frequent metric names to list",
+)
+@click.option("--json", "as_json", is_flag=True, help="Print the profile as JSON")
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Print the input files and how they would be split across workers",
+)
+def scan(
+    input_patterns: tuple[str, ...],
+    workers: Optional[int],
+    top: int,
+    as_json: bool,
+    dry_run: bool,
+) -> None:
+    """Profile Vector JSONL files before converting them.
+
+    Reports lines per file, malformed lines, time span, metric type mix and
+    estimated series and tag value cardinality, without converting anything.
+    """
+    from rich.table import Table
+
+    from .scan import scan_files
+
+    discovery = _discover(input_patterns)
+    if dry_run:
+        _print_inputs(discovery)
+        _print_work_plan(plan_work(discovery.files, workers or os.cpu_count() or 1))
+        return
+    try:
+        result = scan_files(discovery.files, workers)
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+    total = result.total
+    if as_json:
+        profile = total.to_dict(top)
+        profile["per_file"] = {
+            file.path: {
+                "bytes": file.bytes,
+                "lines": file.lines,
+                "malformed": file.malformed,
+                "start_time": file.start_time,
+                "end_time": file.end_time,
+            }
+            for file in result.files
+        }
+        click.echo(json.dumps(profile, indent=2))
+        return
+
+    files = Table("File", "Bytes", "Lines", "Malformed", "Time span")
+    for file in result.files:
+        files.add_row(
+            file.path,
+            f"{file.bytes:,}",
+            f"{file.lines:,}",
+            f"{file.malformed:,}",
+            _time_span(file),
+        )
+    console.print(files)
+
+    console.print(f"Events: {total.events:,} of {total.lines:,} lines")
+    console.print(f"Malformed lines: {total.malformed:,} ({total.malformed_rate:.2%})")
+    if total.unsupported:
+        console.print(
+            f"[yellow]Events of unsupported types: {total.unsupported:,}[/yellow]"
+        )
+    console.print(f"Time span: {_time_span(total)}")
+    console.print(f"Series (estimated): {total.series.estimate():,}")
+    console.print(f"Metric names: {len(total.names):,}")
+    console.print(
+        "Value types: "
+        + ", ".join(
+            f"{key} {count:,}" for key, count in total.value_types.most_common()
+        )
+    )
+    console.print(
+        "Kinds: "
+        + ", ".join(f"{key} {count:,}" for key, count in total.kinds.most_common())
+    )
+
+    if total.tag_values:
+        tags = Table("Tag", "Distinct values (estimated)")
+        for key, sketch in sorted(total.tag_values.items()):
+            tags.add_row(key, f"{sketch.estimate():,}")
+        console.print(tags)
+    if top and total.names:
+        names = Table("Metric name", "Events")
+        for name, count in total.names.most_common(top):
+            names.add_row(name, f"{count:,}")
+        console.print(names)
+
+
+def _listen_option(ctx, param, value: str) -> tuple[str, int]:
+    from .serve import parse_listen_address
+
+    try:
+        return parse_listen_address(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+@main.command()
+@click.option(
+    "--listen",
+    "address",
+    default=":8080",
+    show_default=True,
+    callback=_listen_option,
+    help="Address to listen on, as host:port or :port",
+)
+@click.option("-o", "--output", required=True, help="Output directory")
+@click.option(
+    "--roll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=3600,
+    show_default=True,
+    help="Seconds after which a new output file is started",
+)
+@click.option(
+    "--roll-messages",
+    type=click.IntRange(min=1),
+    default=10_000_000,
+    show_default=True,
+    help="Messages after which a new output file is started",
+)
+@click.option(
+    "--max-queued-batches",
+    type=click.IntRange(min=1),
+    default=64,
+    show_default=True,
+    help="Batches waiting to be written before requests are slowed and refused",
+)
+@click.option(
+    "--backpressure-timeout",
+    type=click.FloatRange(min=0),
+    default=5,
+    show_default=True,
+    help="Seconds a request waits for the writer before a 429 response",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    help="Write series definitions once and samples by series id",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def serve(
+    address: tuple[str, int],
+    output: str,
+    roll_interval: float,
+    roll_messages: int,
+    max_queued_batches: int,
+    backpressure_timeout: float,
+    compact: bool,
+    verbose: bool,
+) -> None:
+    """Receive events from Vector's http sink and write rolling MCAP files.
+
+    Point an http sink with the json codec at this server; gzip compression
+    is supported. Runs until interrupted, then writes everything received.
+    """
+    from .serve import IngestServer
+
+    try:
+        server = IngestServer(
+            output,
+            address,
+            roll_interval,
+            roll_messages,
+            max_queued_batches,
+            backpressure_timeout,
+            compact=compact,
+            verbose=verbose,
+        )
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+    host, port = server.server_address
+    console.print(f"[green]Listening on {host or '0.0.0.0'}:{port}[/green]")
+    server.serve_forever()
+    stats = server.stats
+    console.print(
+        f"[green]Wrote {stats.written} events from {stats.batches} batches "
+        f"to {len(server.outputs)} files in {output}[/green]"
+    )
+    if stats.refused_batches:
+        console.print(
+            f"[yellow]Refused {stats.refused_batches} batches while the writer "
+            "was behind[/yellow]"
+        )
+
+
+@main.command()
+@click.argument(
+    "directories", nargs=-1, required=True, type=click.Path(file_okay=False)
+)
+@click.option("-o", "--output", required=True, help="Output directory")
+@click.option(
+    "--pattern",
+    default="*",
+    show_default=True,
+    help="Only convert files whose names match this glob",
+)
+@click.option(
+    "--settle",
+    type=click.FloatRange(min=0),
+    default=30,
+    show_default=True,
+    help="Seconds a file must be unchanged before it is converted",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=2,
+    show_default=True,
+    help="Seconds between directory scans when inotify is unavailable",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Files converted at once  [default: one per CPU]",
+)
+@click.option(
+    "--roll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Write rolling files started this many seconds apart instead of one "
+    "file per input",
+)
+@click.option(
+    "--roll-messages",
+    type=click.IntRange(min=1),
+    default=10_000_000,
+    show_default=True,
+    help="Messages after which a new rolling file is started",
+)
+@click.option(
+    "--state",
+    "state_file",
+    help="File recording what has been converted  "
+    "[default: .vector2mcap-watch.json in the output directory]",
+)
+@click.option(
+    "--once",
+    is_flag=True,
+    help="Convert the files there now without waiting for them to settle, then exit",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    help="Write series definitions once and samples by series id",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Enable verbose output")
+def watch(
+    directories: tuple[str, ...],
+    output: str,
+    pattern: str,
+    settle: float,
+    poll_interval: float,
+    workers: Optional[int],
+    roll_interval: Optional[float],
+    roll_messages: int,
+    state_file: Optional[str],
+    once: bool,
+    compact: bool,
+    verbose: bool,
+) -> None:
+    """Convert files in directories as Vector finishes or rotates them.
+
+    Runs until interrupted, converting each file once it is closed, renamed
+    or unchanged for --settle seconds. What has been converted is recorded,
+    so restarting resumes where it stopped and rotated files are skipped.
+    """
+    from .watch import Watcher
+
+    try:
+        watcher = Watcher(
+            directories,
+            output,
+            pattern,
+            settle,
+            poll_interval,
+            workers,
+            roll_interval,
+            roll_messages,
+            compact=compact,
+            state_file=state_file,
+            verbose=verbose,
+        )
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.ClickException(str(e))
+
+    if not once:
+        method = "inotify" if watcher.uses_inotify else "polling"
+        console.print(
+            f"[green]Watching {len(directories)} directories ({method})[/green]"
+        )
+    watcher.run(once=once)
+    stats = watcher.stats
+    console.print(
+        f"[green]Converted {stats.events} events from {stats.conversions} files "
+        f"to {len(watcher.outputs)} outputs in {output}[/green]"
+    )
+    if stats.invalid_lines:
+        console.print(f"[yellow]Skipped {stats.invalid_lines} invalid lines[/yellow]")
+    if stats.failures:
+        console.print(f"[red]{stats.failures} conversions failed[/red]")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+"""Compact series-dictionary encoding of Vector metrics.
+
+Instead of repeating the name, namespace and tags in every ``EventWrapper``,
+the compact encoding writes a ``SeriesDefinition`` once per series on the
+``vector_series`` topic and a small ``Sample`` carrying only the series id and
+value on the ``vector_sample`` topic. Series ids are hashes of the series key,
+so the same series has the same id in every file and compact files can be
+merged without remapping.
+
+Metrics whose value type has no compact form are written as full
+``EventWrapper`` messages on the default topic of the same file.
+"""
+
+from typing import Dict, Iterator, Optional
+
+from mcap.reader import make_reader
+
+from . import compact_pb2, event_pb2
+from .series import SeriesKey
+
+
+SERIES_TOPIC = "vector_series"
+
+SAMPLE_TOPIC = "vector_sample"
+
+# Topic of full events, which the compact encoding falls back to
+EVENT_TOPIC = "vector_event"
+
+# Metric value types that have a compact form
+COMPACT_VALUE_TYPES = ("counter", "gauge", "set", "aggregated_histogram3")
+
+
+def series_definition(key: SeriesKey, series_id: int) -> compact_pb2.SeriesDefinition:
+    """Build the definition message for a series."""
+    name, namespace, tags = key
+    definition = compact_pb2.SeriesDefinition(
+        id=series_id, name=name, namespace=namespace
+    )
+    definition.tags.update(tags)
+    return definition
+
+
+def metric_to_sample(
+    metric: event_pb2.Metric, series_id: int
+) -> Optional[compact_pb2.Sample]:
+    """Convert a metric to a sample of the given series.
+
+    Returns:
+        The sample, or None if the metric's value type has no compact form
+    """
+    sample = compact_pb2.Sample(
+        series_id=series_id,
+        incremental=metric.kind == event_pb2.Metric.Kind.Incremental,
+        interval_ms=metric.interval_ms,
+    )
+    value_type = metric.WhichOneof("value")
+    if value_type == "counter":
+        sample.counter = metric.counter.value
+    elif value_type == "gauge":
+        sample.gauge = metric.gauge.value
+    elif value_type == "set":
+        sample.set.values.extend(metric.set.values)
+    elif value_type == "aggregated_histogram3":
+        histogram = metric.aggregated_histogram3
+        sample.aggregated_histogram.count = histogram.count
+        sample.aggregated_histogram.sum = histogram.sum
+        for bucket in histogram.buckets:
+            sample.aggregated_histogram.buckets.add(
+                upper_limit=bucket.upper_limit, count=bucket.count
+            )
+    else:
+        return None
+    return sample
+
+
+def sample_to_metric(
+    definition: compact_pb2.SeriesDefinition,
+    sample: compact_pb2.Sample,
+    log_time: int,
+) -> event_pb2.Metric:
+    """Expand a sample back into a full metric.
+
+    Args:
+        definition: Definition of the sample's series
+        sample: The sample
+        log_time: The sample's MCAP log time, in nanoseconds
+
+    Returns:
+        The metric as it would have been written by the default encoding
+    """
+    metric = event_pb2.Metric(name=definition.name, namespace=definition.namespace)
+    metric.tags_v1.update(definition.tags)
+    metric.timestamp.FromNanoseconds(log_time)
+    metric.interval_ms = sample.interval_ms
+    metric.kind = (
+        event_pb2.Metric.Kind.Incremental
+        if sample.incremental
+        else event_pb2.Metric.Kind.Absolute
+    )
+
+    value_type = sample.WhichOneof("value")
+    if value_type == "counter":
+        metric.counter.value = sample.counter
+    elif value_type == "gauge":
+        metric.gauge.value = sample.gauge
+    elif value_type == "set":
+        metric.set.values.extend(sample.set.values)
+    elif value_type == "aggregated_histogram":
+        histogram = sample.aggregated_histogram
+        metric.aggregated_histogram3.count = histogram.count
+        metric.aggregated_histogram3.sum = histogram.sum
+        for bucket in histogram.buckets:
+            metric.aggregated_histogram3.buckets.add(
+                upper_limit=bucket.upper_limit, count=bucket.count
+            )
+    return metric
+
+
+class CompactDecoder:
+    """Expand compact samples using the series definitions seen so far."""
+
+    def __init__(self) -> None:
+        self.definitions: Dict[int, compact_pb2.SeriesDefinition] = {}
+
+    def add_definition(self, data: bytes) -> None:
+        """Register a serialized ``SeriesDefinition``."""
+        definition = compact_pb2.SeriesDefinition()
+        definition.ParseFromString(data)
+        self.definitions[definition.id] = definition
+
+    def decode(self, data: bytes, log_time: int) -> event_pb2.Metric:
+        """Expand a serialized ``Sample``.
+
+        Raises:
+            KeyError: If the sample's series has not been defined
+        """
+        sample = compact_pb2.Sample()
+        sample.ParseFromString(data)
+        return sample_to_metric(self.definitions[sample.series_id], sample, log_time)
+
+
+def iter_compact_metrics(mcap_file: str) -> Iterator[event_pb2.Metric]:
+    """Read a compact MCAP file as full metrics, in log time order.
+
+    Args:
+        mcap_file: MCAP file written with the compact encoding
+
+    Yields:
+        One metric per sample, and per event written in full
+    """
+    decoder = CompactDecoder()
+    with open(mcap_file, "rb") as f:
+        reader = make_reader(f)
+        for _, _, message in reader.iter_messages(topics=[SERIES_TOPIC]):
+            decoder.add_definition(message.data)
+        for _, channel, message in reader.iter_messages(
+            topics=[SAMPLE_TOPIC, EVENT_TOPIC]
+        ):
+            if channel.topic == SAMPLE_TOPIC:
+                yield decoder.decode(message.data, message.log_time)
+            else:
+                yield event_pb2.EventWrapper.FromString(message.data).metric
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: src/vector2mcap/compact.proto
+"""Generated protocol buffer code."""
+
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
+    b'\n\x1dsrc/vector2mcap/compact.proto\x12\x0bvector2mcap"\xa3\x01\n\x10SeriesDefinition\x12\n\n\x02id\x18\x01 \x01(\x06\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\tnamespace\x18\x03 \x01(\t\x12\x35\n\x04tags\x18\x04 \x03(\x0b\x32\'.vector2mcap.SeriesDefinition.TagsEntry\x1a+\n\tTagsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01"\x1b\n\tStringSet\x12\x0e\n\x06values\x18\x01 \x03(\t"5\n\x0fHistogramBucket\x12\x13\n\x0bupper_limit\x18\x01 \x01(\x01\x12\r\n\x05\x63ount\x18\x02 \x01(\x04"V\n\tHistogram\x12-\n\x07\x62uckets\x18\x01 \x03(\x0b\x32\x1c.vector2mcap.HistogramBucket\x12\r\n\x05\x63ount\x18\x02 \x01(\x04\x12\x0b\n\x03sum\x18\x03 \x01(\x01"\xd1\x01\n\x06Sample\x12\x11\n\tseries_id\x18\x01 \x01(\x06\x12\x13\n\x0bincremental\x18\x02 \x01(\x08\x12\x11\n\x07\x63ounter\x18\x03 \x01(\x01H\x00\x12\x0f\n\x05gauge\x18\x04 \x01(\x01H\x00\x12%\n\x03set\x18\x05 \x01(\x0b\x32\x16.vector2mcap.StringSetH\x00\x12\x36\n\x14\x61ggregated_histogram\x18\x06 \x01(\x0b\x32\x16.vector2mcap.HistogramH\x00\x12\x13\n\x0binterval_ms\x18\x07 \x01(\rB\x07\n\x05valueb\x06proto3'
+)
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(
+    DESCRIPTOR, "src.vector2mcap.compact_pb2", globals()
+)
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+    DESCRIPTOR._options = None
+    _SERIESDEFINITION_TAGSENTRY._options = None
+    _SERIESDEFINITION_TAGSENTRY._serialized_options = b"8\001"
+    _SERIESDEFINITION._serialized_start = 47
+    _SERIESDEFINITION._serialized_end = 210
+    _SERIESDEFINITION_TAGSENTRY._serialized_start = 167
+    _SERIESDEFINITION_TAGSENTRY._serialized_end = 210
+    _STRINGSET._serialized_start = 212
+    _STRINGSET._serialized_end = 239
+    _HISTOGRAMBUCKET._serialized_start = 241
+    _HISTOGRAMBUCKET._serialized_end = 294
+    _HISTOGRAM._serialized_start = 296
+    _HISTOGRAM._serialized_end = 382
+    _SAMPLE._serialized_start = 385
+    _SAMPLE._serialized_end = 594
+# @@protoc_insertion_point(module_scope)
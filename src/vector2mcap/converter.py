@@ -1,16 +1,75 @@
 """Main conversion logic orchestrating the conversion process."""
 
-from .mcap_writer import write_mcap
+from typing import Optional
+
+from .filters import EventFilter
+from .memory import MemoryBudget
+from .mcap_writer import DEFAULT_CHECKPOINT_INTERVAL, write_mcap
+from .recovery import Checkpoint
+from .rollup import Rollup
+from .sampling import RangeSampling, Sampler
 
 
 def convert_files(
-    input_files: list[str], output_file: str, verbose: bool = False
+    input_files: list[str],
+    output_file: str,
+    *,
+    verbose: bool = False,
+    event_filter: Optional[EventFilter] = None,
+    sorted_input: bool = False,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    resume_from: Optional[Checkpoint] = None,
+    compact: bool = False,
+    dedupe: bool = False,
+    heartbeat: Optional[int] = None,
+    rollup: Optional[Rollup] = None,
+    keep_raw: bool = True,
+    partition_by: Optional[str] = None,
+    max_open_files: int = 64,
+    sampler: Optional[Sampler] = None,
+    range_sampling: Optional[RangeSampling] = None,
+    memory_budget: Optional[MemoryBudget] = None,
 ) -> None:
     """Convert JSONL files to MCAP format.
 
     Args:
         input_files: List of input JSONL file paths
-        output_file: Output MCAP file path
+        output_file: Output MCAP file path, or directory when partitioning
         verbose: Enable verbose output
+        event_filter: Optional filter selecting which events to convert
+        sorted_input: Each input file is sorted by timestamp
+        checkpoint_interval: Record a checkpoint every this many messages, or
+            never if 0
+        resume_from: Checkpoint of an interrupted conversion to continue from
+        compact: Write the compact series-dictionary encoding
+        dedupe: Skip absolute samples whose value is unchanged
+        heartbeat: With dedupe, nanoseconds after which an unchanged sample is
+            written anyway
+        rollup: Aggregate events into windows on the vector_rollup topic
+        keep_raw: With rollup, also write the raw events
+        partition_by: Write one file per value of this tag
+        max_open_files: When partitioning, the most partition files kept open
+        sampler: Only write the events this per-series sampler keeps
+        range_sampling: Only read evenly spaced byte ranges of each input
+        memory_budget: Size buffers and relieve memory pressure to stay
+            within this budget
     """
-    write_mcap(input_files, output_file, verbose)
+    write_mcap(
+        input_files,
+        output_file,
+        verbose=verbose,
+        event_filter=event_filter,
+        sorted_input=sorted_input,
+        checkpoint_interval=checkpoint_interval,
+        resume_from=resume_from,
+        compact=compact,
+        dedupe=dedupe,
+        heartbeat=heartbeat,
+        rollup=rollup,
+        keep_raw=keep_raw,
+        partition_by=partition_by,
+        max_open_files=max_open_files,
+        sampler=sampler,
+        range_sampling=range_sampling,
+        memory_budget=memory_budget,
+    )
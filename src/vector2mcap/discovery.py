@@ -0,0 +1,313 @@
+"""Find input files, order them and plan parallel work over them.
+
+Inputs may be files, directories (read recursively) or glob patterns, where
+``**`` matches any number of directories. Patterns are expanded with an
+``os.scandir`` walk that records each file's size and modification time in
+the same pass, so planning needs no further ``stat`` calls. Hidden entries
+are skipped unless a pattern names them explicitly.
+
+Files are ordered for conversion so that rotated files come out in time
+order: ``metrics.out.2`` sorts before ``metrics.out.10`` rather than after
+it, and the files of a rotation set are ordered by their numeric suffix in
+whichever direction their modification times say is oldest first. Numbers
+elsewhere in names are also compared by value.
+
+For parallel work, ``plan_work`` splits large files into byte ranges and
+orders all pieces largest first, so that no single big file is left running
+alone at the end.
+"""
+
+import glob
+import math
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Files larger than this are split into ranges for parallel work
+DEFAULT_SPLIT_SIZE = 64 * 1024 * 1024
+
+# Ranges are never made smaller than this, however many workers there are
+MIN_SPLIT_SIZE = 1024 * 1024
+
+_ROTATION_RE = re.compile(r"^(.*)\.(\d+)$")
+_NUMBER_RE = re.compile(r"(\d+)")
+
+
+@dataclass(frozen=True)
+class InputFile:
+    """A discovered input file.
+
+    Attributes:
+        path: Path as found, relative if the pattern was
+        size: Size in bytes
+        mtime_ns: Modification time in nanoseconds
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class Discovery:
+    """Files found for a set of input patterns."""
+
+    files: List[InputFile] = field(default_factory=list)
+    unmatched: List[str] = field(default_factory=list)
+
+    @property
+    def total_size(self) -> int:
+        """Combined size of all files, in bytes."""
+        return sum(file.size for file in self.files)
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+def _scandir(directory: str) -> List[os.DirEntry]:
+    try:
+        with os.scandir(directory or ".") as entries:
+            return list(entries)
+    except OSError:
+        return []
+
+
+def _from_entry(entry: os.DirEntry) -> Optional[InputFile]:
+    try:
+        stat = entry.stat()
+    except OSError:
+        return None
+    return InputFile(entry.path, stat.st_size, stat.st_mtime_ns)
+
+
+def _walk_directory(directory: str) -> Iterator[InputFile]:
+    """Yield every non-hidden file under a directory."""
+    pending = [directory]
+    while pending:
+        for entry in _scandir(pending.pop()):
+            if _is_hidden(entry.name):
+                continue
+            if entry.is_dir():
+                pending.append(entry.path)
+            elif entry.is_file():
+                input_file = _from_entry(entry)
+                if input_file is not None:
+                    yield input_file
+
+
+def _stat_path(path: str) -> Iterator[InputFile]:
+    """Yield a file, or the files under a directory."""
+    if os.path.isdir(path):
+        yield from _walk_directory(path)
+        return
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    yield InputFile(path, stat.st_size, stat.st_mtime_ns)
+
+
+def _match(directory: str, parts: Sequence[str]) -> Iterator[InputFile]:
+    """Yield the files matching pattern components below a directory."""
+    part, rest = parts[0], parts[1:]
+    if part == "**":
+        if not rest:
+            yield from _walk_directory(directory or ".")
+            return
+        # Zero directories, then each subdirectory in turn
+        yield from _match(directory, rest)
+        for entry in _scandir(directory):
+            if entry.is_dir() and not _is_hidden(entry.name):
+                yield from _match(entry.path, parts)
+        return
+
+    if not glob.has_magic(part):
+        path = os.path.join(directory, part)
+        if rest:
+            if os.path.isdir(path):
+                yield from _match(path, rest)
+        else:
+            yield from _stat_path(path)
+        return
+
+    for entry in _scandir(directory):
+        if _is_hidden(entry.name) and not part.startswith("."):
+            continue
+        if not fnmatchcase(entry.name, part):
+            continue
+        if rest:
+            if entry.is_dir():
+                yield from _match(entry.path, rest)
+        elif entry.is_dir():
+            yield from _walk_directory(entry.path)
+        elif entry.is_file():
+            input_file = _from_entry(entry)
+            if input_file is not None:
+                yield input_file
+
+
+def _natural_key(text: str) -> List[Union[str, int]]:
+    """Split text so that runs of digits compare by value."""
+    return [
+        int(piece) if index % 2 else piece
+        for index, piece in enumerate(_NUMBER_RE.split(text))
+    ]
+
+
+def order_inputs(files: Sequence[InputFile]) -> List[InputFile]:
+    """Order files for conversion, oldest data first.
+
+    Files whose names differ only by a numeric suffix (``metrics.out``,
+    ``metrics.out.1``, ``metrics.out.2``...) form a rotation set. By default
+    higher suffixes are older and the unsuffixed file is the newest, as
+    logrotate names them; if modification times show the suffixes counting
+    up instead, the set is ordered the other way. Sets and other files are
+    ordered by name, comparing numbers by value.
+    """
+    groups: Dict[str, List[Tuple[Optional[int], InputFile]]] = defaultdict(list)
+    for input_file in files:
+        match = _ROTATION_RE.match(input_file.path)
+        if match:
+            groups[match.group(1)].append((int(match.group(2)), input_file))
+        else:
+            groups[input_file.path].append((None, input_file))
+
+    ordered: List[InputFile] = []
+    for base in sorted(groups, key=_natural_key):
+        members = groups[base]
+        rotated = sorted(
+            (
+                (number, input_file)
+                for number, input_file in members
+                if number is not None
+            ),
+            key=lambda member: member[0],
+        )
+        current = [input_file for number, input_file in members if number is None]
+        if len(rotated) > 1 and rotated[-1][1].mtime_ns > rotated[0][1].mtime_ns:
+            # Suffixes count up as files are written
+            rotated_files = [input_file for _, input_file in rotated]
+        else:
+            rotated_files = [input_file for _, input_file in reversed(rotated)]
+        if (
+            current
+            and rotated_files
+            and current[0].mtime_ns < rotated_files[0].mtime_ns
+        ):
+            ordered.extend(current + rotated_files)
+        else:
+            ordered.extend(rotated_files + current)
+    return ordered
+
+
+def discover_inputs(patterns: Sequence[str]) -> Discovery:
+    """Expand input patterns into an ordered list of unique files.
+
+    Args:
+        patterns: File paths, directories or glob patterns
+
+    Returns:
+        The files in conversion order, and the patterns that matched nothing
+    """
+    discovery = Discovery()
+    found: Dict[str, InputFile] = {}
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            parts = pattern.split("/")
+            if parts[0] == "":
+                matches = list(_match("/", parts[1:]))
+            else:
+                matches = list(_match("", parts))
+        else:
+            matches = list(_stat_path(pattern))
+        if not matches:
+            discovery.unmatched.append(pattern)
+        for input_file in matches:
+            found.setdefault(os.path.normpath(input_file.path), input_file)
+    discovery.files = order_inputs(list(found.values()))
+    return discovery
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    """A byte range of one input file, covering the lines that start in it."""
+
+    path: str
+    start: int
+    end: int
+
+    @property
+    def size(self) -> int:
+        """Bytes in the range."""
+        return self.end - self.start
+
+
+@dataclass
+class WorkPlan:
+    """Pieces of work in submission order, and their expected balance.
+
+    Attributes:
+        units: File ranges, largest first
+        workers: Number of workers the plan is for
+        loads: Bytes each worker gets when every unit goes to the least
+            loaded worker in turn
+    """
+
+    units: List[WorkUnit]
+    workers: int
+    loads: List[int]
+
+    @property
+    def split_files(self) -> int:
+        """Number of files split into more than one range."""
+        ranges: Dict[str, int] = defaultdict(int)
+        for unit in self.units:
+            ranges[unit.path] += 1
+        return sum(1 for count in ranges.values() if count > 1)
+
+
+def plan_work(
+    files: Sequence[InputFile],
+    workers: int,
+    split_size: int = DEFAULT_SPLIT_SIZE,
+) -> WorkPlan:
+    """Split files into ranges and order them for parallel processing.
+
+    A file is split when it is larger than ``split_size`` or than an even
+    share of all the input per worker, but never into ranges smaller than
+    ``MIN_SPLIT_SIZE``. Units are ordered largest first, which lets a pool
+    that hands out work in order stay close to evenly loaded.
+
+    Args:
+        files: Input files with their sizes
+        workers: Number of workers that will run the units
+        split_size: Largest range a file is split into
+
+    Returns:
+        The plan, with units in the order they should be submitted
+    """
+    if workers < 1 or split_size < 1:
+        raise ValueError("Workers and split size must be at least 1")
+    total = sum(input_file.size for input_file in files)
+    share = math.ceil(total / workers) if total else split_size
+    range_size = max(min(split_size, share), MIN_SPLIT_SIZE)
+
+    units = []
+    for input_file in files:
+        pieces = max(1, math.ceil(input_file.size / range_size))
+        step = math.ceil(input_file.size / pieces) if input_file.size else 0
+        for index in range(pieces):
+            start = min(index * step, input_file.size)
+            end = input_file.size if index == pieces - 1 else start + step
+            units.append(WorkUnit(input_file.path, start, end))
+    units.sort(key=lambda unit: unit.size, reverse=True)
+
+    loads = [0] * workers
+    for unit in units:
+        loads[loads.index(min(loads))] += unit.size
+    return WorkPlan(units, workers, loads)
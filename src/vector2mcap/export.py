@@ -0,0 +1,333 @@
+"""Export converted MCAP files back to JSONL, CSV or Parquet.
+
+Chunks are selected using the summary section, so only chunks that overlap the
+requested time range and contain a requested topic are read. They are then
+decompressed and decoded in parallel worker processes, which also format the
+rows, and the main process writes the results in batches.
+
+JSONL output uses Vector's native metric format, so exported files can be
+converted again. CSV and Parquet have one row per metric with the columns in
+``COLUMNS``; ``value`` is empty for metrics without a scalar value.
+"""
+
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from mcap.reader import SeekingReader
+from mcap.records import ChunkIndex
+from rich.console import Console
+
+from . import event_pb2
+from .compact import SAMPLE_TOPIC, SERIES_TOPIC, CompactDecoder
+from .mcap_chunks import chunk_messages, read_chunk
+from .mcap_writer import ROLLUP_TOPIC, TOPIC
+from .parallel import make_executor, ordered_map
+from .series import metric_value
+
+
+console = Console()
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+COLUMNS = ("timestamp", "topic", "name", "namespace", "tags", "kind", "type", "value")
+
+# Topics exported when none are requested
+DEFAULT_TOPICS = (TOPIC, ROLLUP_TOPIC, SAMPLE_TOPIC)
+
+# Rows written to Parquet per row group
+PARQUET_BATCH_ROWS = 100_000
+
+
+@dataclass
+class ExportStats:
+    """Counters describing an export."""
+
+    chunks_total: int = 0
+    chunks_read: int = 0
+    rows: int = 0
+
+
+@dataclass
+class _ChunkTask:
+    """A chunk for a worker to decode, with everything needed to filter it."""
+
+    mcap_file: str
+    chunk_index: ChunkIndex
+    channels: Dict[int, str]
+    since: Optional[int]
+    until: Optional[int]
+    row_format: str
+
+
+# Series definitions of compact files, installed in each worker process
+_decoder: Optional[CompactDecoder] = None
+
+
+def _init_worker(definitions: List[bytes]) -> None:
+    global _decoder
+    _decoder = CompactDecoder()
+    for definition in definitions:
+        _decoder.add_definition(definition)
+
+
+def format_timestamp(nanoseconds: int) -> str:
+    """Format Unix nanoseconds as RFC 3339 with nanosecond precision."""
+    seconds, nanos = divmod(nanoseconds, 1_000_000_000)
+    dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    return f"{dt:%Y-%m-%dT%H:%M:%S}.{nanos:09d}Z"
+
+
+def metric_to_json(metric: event_pb2.Metric) -> Dict[str, Any]:
+    """Convert a metric back to Vector's native JSON format."""
+    data: Dict[str, Any] = {"name": metric.name}
+    if metric.namespace:
+        data["namespace"] = metric.namespace
+    data["tags"] = dict(metric.tags_v1)
+    data["timestamp"] = format_timestamp(metric.timestamp.ToNanoseconds())
+    data["kind"] = (
+        "incremental"
+        if metric.kind == event_pb2.Metric.Kind.Incremental
+        else "absolute"
+    )
+    if metric.interval_ms:
+        data["interval_ms"] = metric.interval_ms
+
+    value_type = metric.WhichOneof("value")
+    if value_type in ("counter", "gauge"):
+        data[value_type] = {"value": getattr(metric, value_type).value}
+    elif value_type == "set":
+        data["set"] = {"values": list(metric.set.values)}
+    elif value_type == "aggregated_histogram3":
+        histogram = metric.aggregated_histogram3
+        data["aggregated_histogram"] = {
+            "buckets": [
+                {"upper_limit": bucket.upper_limit, "count": bucket.count}
+                for bucket in histogram.buckets
+            ],
+            "count": histogram.count,
+            "sum": histogram.sum,
+        }
+    return {"metric": data}
+
+
+def _metric_row(topic: str, metric: event_pb2.Metric) -> tuple:
+    return (
+        metric.timestamp.ToNanoseconds(),
+        topic,
+        metric.name,
+        metric.namespace,
+        json.dumps(dict(sorted(metric.tags_v1.items())), separators=(",", ":")),
+        event_pb2.Metric.Kind.Name(metric.kind).lower(),
+        metric.WhichOneof("value") or "",
+        metric_value(metric),
+    )
+
+
+def _decode_chunk(task: _ChunkTask) -> List[Any]:
+    """Decode the selected messages of a chunk and format them as rows.
+
+    Returns:
+        Encoded lines for JSONL, otherwise row tuples
+    """
+    with open(task.mcap_file, "rb") as f:
+        messages = chunk_messages(read_chunk(f, task.chunk_index))
+
+    rows = []
+    messages.sort(key=lambda message: message.log_time)
+    for message in messages:
+        topic = task.channels.get(message.channel_id)
+        if topic is None:
+            continue
+        if task.since is not None and message.log_time < task.since:
+            continue
+        if task.until is not None and message.log_time >= task.until:
+            continue
+
+        if topic == SAMPLE_TOPIC:
+            metric = _decoder.decode(message.data, message.log_time)
+        else:
+            event = event_pb2.EventWrapper()
+            event.ParseFromString(message.data)
+            if not event.HasField("metric"):
+                continue
+            metric = event.metric
+
+        if task.row_format == "jsonl":
+            rows.append(json.dumps(metric_to_json(metric)).encode() + b"\n")
+        else:
+            rows.append(_metric_row(topic, metric))
+    return rows
+
+
+class _RowWriter:
+    """Write batches of rows in one of the export formats."""
+
+    def __init__(self, output_file: str, row_format: str):
+        self._format = row_format
+        self._stream = None
+        self._parquet = None
+        self._batch: List[tuple] = []
+        if row_format == "parquet":
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError(
+                    "Parquet export requires pyarrow: "
+                    "pip install 'vector2mcap[parquet]'"
+                ) from None
+            self._pyarrow = pyarrow
+            schema = pyarrow.schema(
+                [
+                    ("timestamp", pyarrow.timestamp("ns", tz="UTC")),
+                    ("topic", pyarrow.string()),
+                    ("name", pyarrow.string()),
+                    ("namespace", pyarrow.string()),
+                    ("tags", pyarrow.string()),
+                    ("kind", pyarrow.string()),
+                    ("type", pyarrow.string()),
+                    ("value", pyarrow.float64()),
+                ]
+            )
+            self._schema = schema
+            self._parquet = pyarrow.parquet.ParquetWriter(output_file, schema)
+        elif row_format == "csv":
+            self._stream = open(output_file, "w", newline="")
+            self._csv = csv.writer(self._stream)
+            self._csv.writerow(COLUMNS)
+        else:
+            self._stream = open(output_file, "wb")
+
+    def write(self, rows: List[Any]) -> None:
+        if self._format == "jsonl":
+            self._stream.writelines(rows)
+        elif self._format == "csv":
+            self._csv.writerows(
+                (format_timestamp(row[0]), *row[1:7], "" if row[7] is None else row[7])
+                for row in rows
+            )
+        else:
+            self._batch.extend(rows)
+            if len(self._batch) >= PARQUET_BATCH_ROWS:
+                self._flush_parquet()
+
+    def _flush_parquet(self) -> None:
+        if not self._batch:
+            return
+        schema = self._schema
+        table = self._pyarrow.Table.from_arrays(
+            [
+                self._pyarrow.array(column, type=field.type)
+                for column, field in zip(zip(*self._batch), schema)
+            ],
+            schema=schema,
+        )
+        self._parquet.write_table(table)
+        self._batch = []
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._flush_parquet()
+            self._parquet.close()
+        if self._stream is not None:
+            self._stream.close()
+
+
+def export_mcap(
+    input_file: str,
+    output_file: str,
+    row_format: str = "jsonl",
+    topics: Optional[List[str]] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    workers: Optional[int] = None,
+    verbose: bool = False,
+) -> ExportStats:
+    """Export the metrics of an MCAP file.
+
+    Args:
+        input_file: MCAP file written by vector2mcap
+        output_file: Output file path
+        row_format: One of ``FORMATS``
+        topics: Topics to export, by default all metric topics
+        since: Only export messages at or after this Unix nanosecond time
+        until: Only export messages before this Unix nanosecond time
+        workers: Number of decoding processes, by default one per CPU. With 1,
+            chunks are decoded in this process.
+        verbose: Enable verbose output
+
+    Returns:
+        Counts of chunks read and rows written
+
+    Raises:
+        ValueError: If the format is unknown or the input has no summary
+        RuntimeError: If Parquet is requested but pyarrow is not installed
+    """
+    if row_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {row_format}")
+    topics = list(topics or DEFAULT_TOPICS)
+
+    with open(input_file, "rb") as f:
+        reader = SeekingReader(f)
+        summary = reader.get_summary()
+        if summary is None:
+            raise ValueError(
+                f"{input_file} has no summary section; "
+                "run 'vector2mcap recover' on it first"
+            )
+        channels = {
+            channel.id: channel.topic
+            for channel in summary.channels.values()
+            if channel.topic in topics
+        }
+        definitions = []
+        if SAMPLE_TOPIC in channels.values():
+            definitions = [
+                message.data
+                for _, _, message in reader.iter_messages(topics=[SERIES_TOPIC])
+            ]
+
+    stats = ExportStats(chunks_total=len(summary.chunk_indexes))
+    tasks = [
+        _ChunkTask(input_file, chunk_index, channels, since, until, row_format)
+        for chunk_index in sorted(
+            summary.chunk_indexes, key=lambda index: index.message_start_time
+        )
+        if (since is None or chunk_index.message_end_time >= since)
+        and (until is None or chunk_index.message_start_time < until)
+        # Without message indexes the chunk's channels are unknown
+        and (
+            not chunk_index.message_index_offsets
+            or any(
+                channel_id in channels
+                for channel_id in chunk_index.message_index_offsets
+            )
+        )
+    ]
+    stats.chunks_read = len(tasks)
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    writer = _RowWriter(str(output_path), row_format)
+    try:
+        executor, workers = make_executor(
+            workers, len(tasks), _init_worker, (definitions,)
+        )
+        with executor:
+            for rows in ordered_map(executor, _decode_chunk, tasks, workers * 2):
+                writer.write(rows)
+                stats.rows += len(rows)
+    finally:
+        writer.close()
+
+    if verbose:
+        console.print(
+            f"[blue]Read {stats.chunks_read} of {stats.chunks_total} chunks[/blue]"
+        )
+        console.print(f"[green]Exported {stats.rows} rows to {output_file}[/green]")
+
+    return stats
@@ -1,20 +1,145 @@
 """File reading utilities for JSONL files."""
 
 import json
+import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Dict, Any
+from typing import BinaryIO, Iterator, Dict, Any, Optional, Tuple
 
 from rich.console import Console
 
+from .filters import EventFilter, line_timestamp
+from .sampling import RangeSampling
+
 
 console = Console()
 
+# Once the search window is this small, scanning it is cheaper than probing
+SEEK_SCAN_BYTES = 64 * 1024
+
+# Lines to read past a probe point looking for a valid timestamp
+SEEK_PROBE_LINES = 16
+
+
+@dataclass
+class ReadPosition:
+    """Where in the input the last yielded event was read from.
+
+    Attributes:
+        file_path: Absolute path of the file being read
+        offset: Byte offset just past the last yielded line
+        line_number: Line number of the last yielded line, or None if lines
+            were skipped by seeking and the count is unknown
+    """
+
+    file_path: str = ""
+    offset: int = 0
+    line_number: Optional[int] = 0
+
+
+def _probe_timestamp(f: BinaryIO, offset: int) -> tuple[Optional[int], int]:
+    """Find the timestamp of the first full line after a byte offset.
+
+    Returns:
+        (timestamp, line_start) for the first line with a valid timestamp, or
+        (None, offset) if none is found before EOF or the probe limit
+    """
+    f.seek(offset)
+    if offset > 0:
+        # Discard the (possibly partial) line the offset falls into
+        f.readline()
+    for _ in range(SEEK_PROBE_LINES):
+        line_start = f.tell()
+        line = f.readline()
+        if not line:
+            break
+        timestamp = line_timestamp(line)
+        if timestamp is not None:
+            return timestamp, line_start
+    return None, offset
+
+
+def seek_to_time(f: BinaryIO, since: int) -> int:
+    """Binary search a time-sorted JSONL file for a start time.
+
+    Each step seeks to the middle of the search window and reads the timestamp
+    of the first full line after it, so only a few KB are read per step.
+    Streams that cannot seek, such as pipes and FIFOs, are left untouched and
+    0 is returned, so the caller falls back to reading them linearly.
+
+    Args:
+        f: File opened in binary mode
+        since: Unix nanosecond timestamp to search for
+
+    Returns:
+        Offset of a line start at or before the first line with a timestamp
+        >= since. The stream is left positioned there.
+    """
+    if not f.seekable():
+        return 0
+    low = 0
+    high = os.fstat(f.fileno()).st_size
+    while high - low > SEEK_SCAN_BYTES:
+        middle = (low + high) // 2
+        timestamp, line_start = _probe_timestamp(f, middle)
+        if timestamp is not None and timestamp < since:
+            low = line_start
+        else:
+            high = middle
+    f.seek(low)
+    return low
+
+
+def _parse_line(
+    line: bytes,
+    event_filter: Optional[EventFilter],
+    file_path: str,
+    location: str,
+) -> Optional[Dict[str, Any]]:
+    """Filter and parse a stripped, non-empty line.
+
+    Returns:
+        The parsed event, or None if it is filtered out or invalid
+    """
+    if event_filter is not None and not event_filter.accept_line(line):
+        return None
+
+    try:
+        json_obj = json.loads(line)
+    except ValueError as e:
+        # Covers both malformed JSON and invalid UTF-8
+        console.print(
+            f"[yellow]Warning: Invalid JSON on {location} in {file_path}: {e}[/yellow]"
+        )
+        # Continue processing other lines instead of failing completely
+        return None
 
-def read_jsonl_file(file_path: str) -> Iterator[Dict[str, Any]]:
+    if event_filter is not None and not event_filter.accept_event(json_obj):
+        return None
+    return json_obj
+
+
+def read_jsonl_file(
+    file_path: str,
+    event_filter: Optional[EventFilter] = None,
+    sorted_input: bool = False,
+    start_offset: int = 0,
+    start_line: Optional[int] = 0,
+    position: Optional[ReadPosition] = None,
+) -> Iterator[Dict[str, Any]]:
     """Read a JSONL file and yield parsed JSON objects.
 
+    Lines are read as raw bytes so that an optional filter can reject most of
+    them before they are parsed.
+
     Args:
         file_path: Path to the JSONL file
+        event_filter: Optional filter selecting which events to yield
+        sorted_input: The file is sorted by timestamp, so the filter's time
+            range can be located by seeking instead of reading from the start
+        start_offset: Byte offset of a line start to begin reading at
+        start_line: Number of lines before start_offset, or None if unknown
+        position: Updated with the location of each line before it is yielded
 
     Yields:
         Parsed JSON objects from each line
@@ -27,38 +152,177 @@ def read_jsonl_file(file_path: str) -> Iterator[Dict[str, Any]]:
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    line_number = 0
-    with open(path, "r", encoding="utf-8") as f:
+    if event_filter is not None and event_filter.is_empty:
+        event_filter = None
+
+    seek = sorted_input and event_filter is not None
+    line_number = start_line
+    offset = start_offset
+    with open(path, "rb") as f:
+        if seek and event_filter.since is not None:
+            seek_offset = seek_to_time(f, event_filter.since)
+            if seek_offset > offset:
+                event_filter.stats.bytes_skipped += seek_offset - offset
+                offset = seek_offset
+                line_number = None
+        if offset:
+            # Files opened at the start are never seeked, so pipes work too
+            f.seek(offset)
+
         for line in f:
-            line_number += 1
+            if line_number is not None:
+                line_number += 1
+            line_start = offset
+            offset += len(line)
             line = line.strip()
 
             # Skip empty lines
             if not line:
                 continue
 
-            try:
-                yield json.loads(line)
-            except json.JSONDecodeError as e:
-                console.print(
-                    f"[yellow]Warning: Invalid JSON on line {line_number} in {file_path}: {e}[/yellow]"
-                )
-                # Continue processing other lines instead of failing completely
+            if seek and event_filter.past_until(line):
+                if f.seekable():
+                    size = os.fstat(f.fileno()).st_size
+                    event_filter.stats.bytes_skipped += size - line_start
+                break
+
+            json_obj = _parse_line(
+                line,
+                event_filter,
+                file_path,
+                (
+                    f"line {line_number}"
+                    if line_number is not None
+                    else f"byte {line_start}"
+                ),
+            )
+            if json_obj is None:
                 continue
 
+            if position is not None:
+                position.offset = offset
+                position.line_number = line_number
+            yield json_obj
 
-def read_jsonl_files(file_paths: list[str]) -> Iterator[tuple[str, Dict[str, Any]]]:
+
+def iter_range_lines(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """Read the lines that start within a byte range of a file.
+
+    Adjacent ranges therefore cover every line exactly once, and each line
+    is read whole even where it crosses the end of the range.
+
+    Yields:
+        (offset, line) for each line, with its line ending
+    """
+    offset = start
+    if start > 0:
+        # Move to the first line that starts in the range
+        f.seek(start - 1)
+        offset += len(f.readline()) - 1
+    else:
+        f.seek(0)
+    while offset < end:
+        line = f.readline()
+        if not line:
+            break
+        yield offset, line
+        offset += len(line)
+
+
+def read_jsonl_ranges(
+    file_path: str,
+    range_sampling: RangeSampling,
+    event_filter: Optional[EventFilter] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Read only evenly spaced byte ranges of a JSONL file.
+
+    Args:
+        file_path: Path to the JSONL file
+        range_sampling: How many ranges to read, and how large
+        event_filter: Optional filter selecting which events to yield
+
+    Yields:
+        Parsed JSON objects from the lines in each range
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    if event_filter is not None and event_filter.is_empty:
+        event_filter = None
+
+    with open(path, "rb") as f:
+        for start, end in range_sampling.ranges(os.fstat(f.fileno()).st_size):
+            for line_start, line in iter_range_lines(f, start, end):
+                line = line.strip()
+                if not line:
+                    continue
+                json_obj = _parse_line(
+                    line, event_filter, file_path, f"byte {line_start}"
+                )
+                if json_obj is not None:
+                    yield json_obj
+
+
+def read_jsonl_files(
+    file_paths: list[str],
+    event_filter: Optional[EventFilter] = None,
+    sorted_input: bool = False,
+    position: Optional[ReadPosition] = None,
+    resume_from: Optional[ReadPosition] = None,
+    range_sampling: Optional[RangeSampling] = None,
+) -> Iterator[tuple[str, Dict[str, Any]]]:
     """Read multiple JSONL files and yield (filename, json_object) pairs.
 
     Args:
         file_paths: List of file paths to read
+        event_filter: Optional filter selecting which events to yield
+        sorted_input: Each file is sorted by timestamp
+        position: Updated with the location of each event before it is yielded
+        resume_from: Skip everything up to this position, e.g. a checkpoint
+            of an interrupted conversion of the same files
+        range_sampling: Only read evenly spaced byte ranges of each file.
+            Positions are not tracked in this mode.
 
     Yields:
         Tuples of (filename, parsed_json_object)
+
+    Raises:
+        ValueError: If resume_from names a file that is not among file_paths
     """
-    for file_path in file_paths:
+    start_index = 0
+    if resume_from is not None:
+        resolved = [os.path.abspath(file_path) for file_path in file_paths]
+        if resume_from.file_path not in resolved:
+            raise ValueError(
+                f"Cannot resume: {resume_from.file_path} is not among the input files"
+            )
+        start_index = resolved.index(resume_from.file_path)
+
+    for index, file_path in enumerate(file_paths[start_index:], start_index):
+        start_offset, start_line = 0, 0
+        if resume_from is not None and index == start_index:
+            start_offset, start_line = resume_from.offset, resume_from.line_number
+        if position is not None:
+            position.file_path = os.path.abspath(file_path)
+            position.offset, position.line_number = start_offset, start_line
+
         try:
-            for json_obj in read_jsonl_file(file_path):
+            if range_sampling is not None:
+                events = read_jsonl_ranges(file_path, range_sampling, event_filter)
+            else:
+                events = read_jsonl_file(
+                    file_path,
+                    event_filter,
+                    sorted_input,
+                    start_offset,
+                    start_line,
+                    position,
+                )
+            for json_obj in events:
                 yield file_path, json_obj
         except FileNotFoundError as e:
             console.print(f"[red]Error: {e}[/red]")
@@ -0,0 +1,336 @@
+"""Ingest-time filtering of Vector JSONL events.
+
+Filtering happens in two stages. A cheap byte-level prefilter runs regular
+expressions over the raw line and rejects lines that cannot possibly match,
+before any JSON parsing happens. Lines that survive are parsed and confirmed
+exactly against the decoded event.
+
+The prefilter is conservative: it only rejects a line when the raw bytes prove
+it does not match, so any line it lets through is still checked exactly.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional
+
+from .json_to_protobuf import convert_timestamp
+
+
+# Matches the seconds-resolution prefix of a UTC RFC 3339 timestamp field,
+# e.g. "timestamp":"2025-07-16T14:20:06.666956352Z"
+_TIMESTAMP_RE = re.compile(
+    rb'"timestamp"\s*:\s*"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})[^"]*Z"'
+)
+_SECONDS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass
+class FilterStats:
+    """Counters describing where lines were rejected."""
+
+    lines_read: int = 0
+    prefilter_rejected: int = 0
+    filter_rejected: int = 0
+    accepted: int = 0
+    bytes_skipped: int = 0
+
+
+def parse_time_bound(value: str) -> int:
+    """Parse a --since/--until value into Unix nanoseconds.
+
+    Args:
+        value: ISO 8601 timestamp, or a number of seconds since the Unix epoch
+
+    Returns:
+        Nanoseconds since the Unix epoch
+
+    Raises:
+        ValueError: If the value cannot be parsed, or is an infinite or NaN
+            number of seconds
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is not None:
+        try:
+            return int(seconds * 1_000_000_000)
+        except (OverflowError, ValueError) as e:
+            raise ValueError(
+                f"Expected a finite number of seconds, got '{value}'"
+            ) from e
+
+    if "T" not in value and " " not in value:
+        # Bare dates are taken as midnight UTC
+        value = f"{value}T00:00:00Z"
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return convert_timestamp(dt.isoformat()).ToNanoseconds()
+
+
+def parse_tag(value: str) -> tuple[str, str]:
+    """Split a key=value tag filter.
+
+    Raises:
+        ValueError: If the value has no '=' or an empty key
+    """
+    key, sep, tag_value = value.partition("=")
+    if not sep or not key:
+        raise ValueError(f"Expected key=value, got '{value}'")
+    return key, tag_value
+
+
+def line_timestamp(line: bytes) -> Optional[int]:
+    """Parse the metric timestamp of a raw JSONL line.
+
+    Args:
+        line: Raw line bytes
+
+    Returns:
+        Unix nanoseconds, or None if the line has no valid metric timestamp
+    """
+    try:
+        return convert_timestamp(
+            json.loads(line)["metric"]["timestamp"]
+        ).ToNanoseconds()
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def timestamp_prefixes(line: bytes) -> List[bytes]:
+    """Find the seconds-resolution prefixes of UTC timestamps in a raw line.
+
+    A tag could also be called "timestamp", so a line may have several.
+
+    Args:
+        line: Raw line bytes
+
+    Returns:
+        Prefixes such as ``b"2025-07-16T14:20:06"``, in order of appearance
+    """
+    return _TIMESTAMP_RE.findall(line)
+
+
+def _json_string_bytes(value: str) -> bytes:
+    """Encode a string the way it appears inside a JSON string literal."""
+    return json.dumps(value, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+# One character as it may appear inside a JSON string: an escape sequence,
+# an ASCII character other than a quote or backslash, or a UTF-8 sequence
+_JSON_CHAR = rb"(?:\\u[0-9a-fA-F]{4}|\\.|[^\"\\\x80-\xff]|[\xc0-\xff][\x80-\xbf]+)"
+
+
+def _bracket_bytes(chars: str) -> bytes:
+    """Translate the inside of a glob ``[...]`` into a regex over raw bytes.
+
+    Positive classes of plain ASCII characters become a byte class. Anything
+    else, such as ``[!...]`` or non-ASCII members, matches any one character,
+    which is looser than the glob; events are checked exactly afterwards.
+    """
+    if chars.startswith("!") or not all(
+        " " <= char <= "~" and char not in '"\\' for char in chars
+    ):
+        return _JSON_CHAR
+    parts = []
+    for index, char in enumerate(chars):
+        if char == "-" and 0 < index < len(chars) - 1:
+            parts.append(b"-")
+        else:
+            parts.append(re.escape(char).encode("ascii"))
+    return b"[" + b"".join(parts) + b"]"
+
+
+def _name_pattern_bytes(pattern: str) -> bytes:
+    """Translate a metric name glob into a regex over raw JSON bytes."""
+    parts = []
+    index, length = 0, len(pattern)
+    while index < length:
+        char = pattern[index]
+        index += 1
+        if char == "*":
+            parts.append(_JSON_CHAR + b"*")
+        elif char == "?":
+            parts.append(_JSON_CHAR)
+        elif char == "[":
+            # Find the closing bracket the way fnmatch does: a leading "!"
+            # and a "]" right after the opening bracket are members
+            end = index
+            if end < length and pattern[end] == "!":
+                end += 1
+            if end < length and pattern[end] == "]":
+                end += 1
+            while end < length and pattern[end] != "]":
+                end += 1
+            if end >= length:
+                parts.append(re.escape(b"["))
+            else:
+                parts.append(_bracket_bytes(pattern[index:end]))
+                index = end + 1
+        else:
+            parts.append(re.escape(_json_string_bytes(char)))
+    return b"".join(parts)
+
+
+def _seconds_prefix(timestamp_ns: int) -> bytes:
+    dt = datetime.fromtimestamp(timestamp_ns // 1_000_000_000, tz=timezone.utc)
+    return dt.strftime(_SECONDS_FORMAT).encode("ascii")
+
+
+class EventFilter:
+    """Select events by metric name, tags and time range.
+
+    Args:
+        include_names: Metric name globs to keep; empty keeps every name
+        exclude_names: Metric name globs to drop
+        tags: Tag key/value pairs that must all be present
+        since: Inclusive lower time bound in Unix nanoseconds
+        until: Exclusive upper time bound in Unix nanoseconds
+    """
+
+    def __init__(
+        self,
+        include_names: Iterable[str] = (),
+        exclude_names: Iterable[str] = (),
+        tags: Optional[Dict[str, str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ):
+        self.include_names = tuple(include_names)
+        self.exclude_names = tuple(exclude_names)
+        self.tags = dict(tags or {})
+        self.since = since
+        self.until = until
+        self.stats = FilterStats()
+
+        self._line_patterns = []
+        if self.include_names:
+            alternatives = b"|".join(
+                _name_pattern_bytes(name) for name in self.include_names
+            )
+            self._line_patterns.append(
+                re.compile(rb'"name"\s*:\s*"(?:' + alternatives + rb')"')
+            )
+        for key, value in self.tags.items():
+            self._line_patterns.append(
+                re.compile(
+                    b'"'
+                    + re.escape(_json_string_bytes(key))
+                    + rb'"\s*:\s*"'
+                    + re.escape(_json_string_bytes(value))
+                    + b'"'
+                )
+            )
+
+        self._since_prefix = _seconds_prefix(since) if since is not None else None
+        self._until_prefix = _seconds_prefix(until) if until is not None else None
+
+    @property
+    def is_empty(self) -> bool:
+        """True if the filter accepts every event."""
+        return not (
+            self.include_names
+            or self.exclude_names
+            or self.tags
+            or self.since is not None
+            or self.until is not None
+        )
+
+    def accept_line(self, line: bytes) -> bool:
+        """Cheaply decide whether a raw JSONL line may match.
+
+        Args:
+            line: Raw line bytes, before JSON parsing
+
+        Returns:
+            False only if the line certainly does not match
+        """
+        self.stats.lines_read += 1
+
+        for pattern in self._line_patterns:
+            if pattern.search(line) is None:
+                self.stats.prefilter_rejected += 1
+                return False
+
+        if self._since_prefix is not None or self._until_prefix is not None:
+            prefixes = timestamp_prefixes(line)
+            # A tag could also be called "timestamp", so only reject when no
+            # candidate falls inside the range
+            if prefixes and not any(self._prefix_in_range(p) for p in prefixes):
+                self.stats.prefilter_rejected += 1
+                return False
+
+        return True
+
+    def past_until(self, line: bytes) -> bool:
+        """Check whether a raw line is certainly at or after the upper bound.
+
+        Used to stop reading time-sorted input early.
+
+        Args:
+            line: Raw line bytes, before JSON parsing
+        """
+        if self._until_prefix is None:
+            return False
+        prefixes = timestamp_prefixes(line)
+        return bool(prefixes) and all(p > self._until_prefix for p in prefixes)
+
+    def _prefix_in_range(self, prefix: bytes) -> bool:
+        if self._since_prefix is not None and prefix < self._since_prefix:
+            return False
+        if self._until_prefix is not None and prefix > self._until_prefix:
+            return False
+        return True
+
+    def accept_event(self, json_obj: Dict[str, Any]) -> bool:
+        """Exactly check a parsed JSON event against the filter.
+
+        Events whose timestamp is missing or malformed are let through so that
+        the converter reports them the same way as without a filter.
+
+        Args:
+            json_obj: Parsed JSON object from a JSONL line
+
+        Returns:
+            True if the event should be converted
+        """
+        if self._matches(json_obj):
+            self.stats.accepted += 1
+            return True
+        self.stats.filter_rejected += 1
+        return False
+
+    def _matches(self, json_obj: Dict[str, Any]) -> bool:
+        metric = json_obj.get("metric")
+        if not isinstance(metric, dict):
+            return False
+
+        name = metric.get("name", "")
+        if self.include_names and not any(
+            fnmatchcase(name, pattern) for pattern in self.include_names
+        ):
+            return False
+        if any(fnmatchcase(name, pattern) for pattern in self.exclude_names):
+            return False
+
+        if self.tags:
+            tags = metric.get("tags") or {}
+            for key, value in self.tags.items():
+                if key not in tags or str(tags[key]) != value:
+                    return False
+
+        if self.since is not None or self.until is not None:
+            try:
+                timestamp_ns = convert_timestamp(metric["timestamp"]).ToNanoseconds()
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return True
+            if self.since is not None and timestamp_ns < self.since:
+                return False
+            if self.until is not None and timestamp_ns >= self.until:
+                return False
+
+        return True
@@ -116,6 +116,16 @@ def json_to_metric(json_obj: Dict[str, Any]) -> Optional[event_pb2.Metric]:
             gauge = event_pb2.Gauge()
             gauge.value = float(metric_data["gauge"]["value"])
             metric.gauge.CopyFrom(gauge)
+        elif "aggregated_histogram" in metric_data:
+            histogram_data = metric_data["aggregated_histogram"]
+            histogram = event_pb2.AggregatedHistogram3()
+            for bucket in histogram_data.get("buckets", []):
+                histogram.buckets.add(
+                    upper_limit=float(bucket["upper_limit"]), count=int(bucket["count"])
+                )
+            histogram.count = int(histogram_data.get("count", 0))
+            histogram.sum = float(histogram_data.get("sum", 0.0))
+            metric.aggregated_histogram3.CopyFrom(histogram)
         elif "set" in metric_data:
             set_metric = event_pb2.Set()
             if "values" in metric_data["set"]:
@@ -0,0 +1,459 @@
+"""Low-level MCAP chunk reading and writing.
+
+The high-level ``mcap`` writer only accepts individual messages. Merging and
+recovering files is much faster when compressed chunks are copied verbatim, so
+this module provides a writer that accepts whole chunk records and rebuilds the
+summary section itself.
+"""
+
+import struct
+import zlib
+from collections import defaultdict
+from io import BytesIO
+from typing import BinaryIO, Dict, List, Optional, Union
+
+import lz4.frame
+import zstandard
+from mcap.data_stream import ReadDataStream, RecordBuilder
+from mcap.opcode import Opcode
+from mcap.records import (
+    Attachment,
+    AttachmentIndex,
+    Channel,
+    Chunk,
+    ChunkIndex,
+    DataEnd,
+    Footer,
+    Header,
+    Message,
+    MessageIndex,
+    Metadata,
+    MetadataIndex,
+    Schema,
+    Statistics,
+    SummaryOffset,
+)
+from mcap.stream_reader import breakup_chunk
+from mcap.writer import LIBRARY_IDENTIFIER, MCAP0_MAGIC, CompressionType
+
+
+# Opcode (1 byte) plus record length (8 bytes)
+RECORD_PREFIX_SIZE = 9
+
+# Record prefix and the fixed fields of a message record: channel id,
+# sequence, log time and publish time
+_MESSAGE_HEADER = struct.Struct("<BQHIQQ")
+
+_MESSAGE_FIELDS_SIZE = _MESSAGE_HEADER.size - RECORD_PREFIX_SIZE
+
+
+def read_chunk(stream: BinaryIO, chunk_index: ChunkIndex) -> Chunk:
+    """Read the chunk a chunk index points at."""
+    stream.seek(chunk_index.chunk_start_offset + RECORD_PREFIX_SIZE)
+    return Chunk.read(ReadDataStream(stream))
+
+
+def read_chunk_bytes(stream: BinaryIO, chunk_index: ChunkIndex) -> tuple[bytes, bytes]:
+    """Read the raw chunk record and the message index records following it.
+
+    Returns:
+        (chunk_record, message_index_records) exactly as stored in the file
+    """
+    stream.seek(chunk_index.chunk_start_offset)
+    chunk_record = stream.read(chunk_index.chunk_length)
+    message_indexes = stream.read(chunk_index.message_index_length)
+    return chunk_record, message_indexes
+
+
+def parse_message_indexes(data: bytes) -> List[MessageIndex]:
+    """Parse a run of message index records."""
+    stream = ReadDataStream(BytesIO(data))
+    indexes = []
+    while stream.count < len(data):
+        opcode = stream.read1()
+        length = stream.read8()
+        if opcode == Opcode.MESSAGE_INDEX:
+            indexes.append(MessageIndex.read(stream))
+        else:
+            stream.read(length)
+    return indexes
+
+
+def message_index_counts(message_indexes: bytes) -> Optional[Dict[int, int]]:
+    """Count messages per channel from raw message index records.
+
+    Returns:
+        Messages per channel id, or None if there are no message indexes
+    """
+    indexes = parse_message_indexes(message_indexes)
+    if not indexes:
+        return None
+    return {index.channel_id: len(index.records) for index in indexes}
+
+
+def chunk_messages(chunk: Chunk, validate_crc: bool = False) -> List[Message]:
+    """Decompress a chunk and return the messages in it, in stored order."""
+    return [
+        record
+        for record in breakup_chunk(chunk, validate_crc=validate_crc)
+        if isinstance(record, Message)
+    ]
+
+
+def _compress(data: bytes, compression: CompressionType) -> tuple[str, bytes]:
+    if compression == CompressionType.ZSTD:
+        return "zstd", zstandard.compress(data)
+    if compression == CompressionType.LZ4:
+        return "lz4", lz4.frame.compress(data)
+    return "", data
+
+
+class ChunkCopyWriter:
+    """Write an MCAP file from whole chunks and individual messages.
+
+    Schemas and channels are written to the data section before any chunk so
+    that copied chunks may reference them. Messages added one by one are
+    buffered into new chunks. The summary section is rebuilt on ``finish``.
+
+    Args:
+        stream: Binary stream to write to
+        chunk_size: Uncompressed size at which a new chunk is started
+        compression: Compression for newly built chunks
+        max_chunk_messages: Also start a new chunk after this many messages,
+            bounding the size of its message indexes
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        chunk_size: int = 1024 * 1024,
+        compression: CompressionType = CompressionType.ZSTD,
+        max_chunk_messages: Optional[int] = None,
+    ):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._compression = compression
+        self._max_chunk_messages = max_chunk_messages
+        self._schemas: Dict[int, Schema] = {}
+        self._channels: Dict[int, Channel] = {}
+        self._chunk_indexes: List[ChunkIndex] = []
+        self._attachment_indexes: List[AttachmentIndex] = []
+        self._metadata_indexes: List[MetadataIndex] = []
+        self._statistics = Statistics(
+            attachment_count=0,
+            channel_count=0,
+            channel_message_counts=defaultdict(int),
+            chunk_count=0,
+            message_count=0,
+            metadata_count=0,
+            message_start_time=0,
+            message_end_time=0,
+            schema_count=0,
+        )
+        self._pending = RecordBuilder()
+        self._pending_indexes: Dict[int, MessageIndex] = {}
+        self._pending_start_time = 0
+        self._pending_end_time = 0
+        self._pending_count = 0
+
+    @property
+    def statistics(self) -> Statistics:
+        """Statistics for everything written so far."""
+        return self._statistics
+
+    @property
+    def pending_size(self) -> int:
+        """Uncompressed bytes buffered in the chunk being built."""
+        return self._pending.count
+
+    def start(self, profile: str = "", library: str = LIBRARY_IDENTIFIER) -> None:
+        """Write the magic and header record."""
+        self._stream.write(MCAP0_MAGIC)
+        self._write_record(Header(profile=profile, library=library))
+
+    def add_schema(self, schema: Schema) -> None:
+        """Register a schema, keeping its id."""
+        self._schemas[schema.id] = schema
+        self._statistics.schema_count = len(self._schemas)
+        self._write_record(schema)
+
+    def add_channel(self, channel: Channel) -> None:
+        """Register a channel, keeping its id."""
+        self._channels[channel.id] = channel
+        self._statistics.channel_count = len(self._channels)
+        self._write_record(channel)
+
+    def copy_chunk(
+        self,
+        chunk_record: bytes,
+        message_indexes: bytes,
+        chunk_index: ChunkIndex,
+        channel_message_counts: Dict[int, int],
+    ) -> None:
+        """Copy a chunk and its message indexes verbatim.
+
+        The chunk must only reference channels already added under the same
+        ids.
+
+        Args:
+            chunk_record: Raw chunk record, including opcode and length
+            message_indexes: Raw message index records that followed the chunk
+            chunk_index: The chunk's index entry from the source file
+            channel_message_counts: Number of messages per channel in the chunk
+        """
+        self._finish_chunk()
+
+        chunk_start = self._stream.tell()
+        self._stream.write(chunk_record)
+        index_start = self._stream.tell()
+        self._stream.write(message_indexes)
+
+        source_index_start = chunk_index.chunk_start_offset + chunk_index.chunk_length
+        self._chunk_indexes.append(
+            ChunkIndex(
+                message_start_time=chunk_index.message_start_time,
+                message_end_time=chunk_index.message_end_time,
+                chunk_start_offset=chunk_start,
+                chunk_length=len(chunk_record),
+                message_index_offsets={
+                    channel_id: offset - source_index_start + index_start
+                    for channel_id, offset in chunk_index.message_index_offsets.items()
+                },
+                message_index_length=len(message_indexes),
+                compression=chunk_index.compression,
+                compressed_size=chunk_index.compressed_size,
+                uncompressed_size=chunk_index.uncompressed_size,
+            )
+        )
+        self._statistics.chunk_count += 1
+        self._count_messages(
+            chunk_index.message_start_time,
+            chunk_index.message_end_time,
+            channel_message_counts,
+        )
+
+    def add_message(self, message: Message) -> None:
+        """Buffer a message into the chunk being built."""
+        self.add_message_data(
+            message.channel_id,
+            message.log_time,
+            message.data,
+            message.publish_time,
+            message.sequence,
+        )
+
+    def add_message_data(
+        self,
+        channel_id: int,
+        log_time: int,
+        data: Union[bytes, bytearray, memoryview],
+        publish_time: Optional[int] = None,
+        sequence: int = 0,
+    ) -> None:
+        """Buffer an already serialized message into the chunk being built.
+
+        The message record is packed straight from its fields, without
+        building a ``Message``. ``data`` is copied into the chunk, so the
+        caller may reuse its buffer afterwards.
+
+        Args:
+            channel_id: Channel the message is on
+            log_time: Log time in nanoseconds
+            data: Serialized message
+            publish_time: Publish time in nanoseconds, by default the log time
+            sequence: Sequence number
+        """
+        if publish_time is None:
+            publish_time = log_time
+        if self._pending_count == 0:
+            self._pending_start_time = log_time
+            self._pending_end_time = log_time
+        elif log_time < self._pending_start_time:
+            self._pending_start_time = log_time
+        elif log_time > self._pending_end_time:
+            self._pending_end_time = log_time
+
+        index = self._pending_indexes.get(channel_id)
+        if index is None:
+            index = self._pending_indexes[channel_id] = MessageIndex(
+                channel_id=channel_id, records=[]
+            )
+        pending = self._pending
+        index.records.append((log_time, pending.count))
+        pending.write(
+            _MESSAGE_HEADER.pack(
+                Opcode.MESSAGE,
+                _MESSAGE_FIELDS_SIZE + len(data),
+                channel_id,
+                sequence,
+                log_time,
+                publish_time,
+            )
+        )
+        pending.write(data)
+        self._pending_count += 1
+
+        statistics = self._statistics
+        if statistics.message_count == 0 or log_time < statistics.message_start_time:
+            statistics.message_start_time = log_time
+        if log_time > statistics.message_end_time:
+            statistics.message_end_time = log_time
+        statistics.channel_message_counts[channel_id] += 1
+        statistics.message_count += 1
+
+        if pending.count >= self._chunk_size or (
+            self._max_chunk_messages is not None
+            and self._pending_count >= self._max_chunk_messages
+        ):
+            self._finish_chunk()
+
+    def add_metadata(self, name: str, data: Dict[str, str]) -> None:
+        """Write a metadata record."""
+        self._finish_chunk()
+        offset = self._stream.tell()
+        length = self._write_record(Metadata(name=name, metadata=data))
+        self._metadata_indexes.append(
+            MetadataIndex(offset=offset, length=length, name=name)
+        )
+        self._statistics.metadata_count += 1
+
+    def add_attachment(self, attachment: Attachment) -> None:
+        """Write an attachment record."""
+        self._finish_chunk()
+        offset = self._stream.tell()
+        length = self._write_record(attachment)
+        self._attachment_indexes.append(
+            AttachmentIndex(
+                offset=offset,
+                length=length,
+                log_time=attachment.log_time,
+                create_time=attachment.create_time,
+                data_size=len(attachment.data),
+                name=attachment.name,
+                media_type=attachment.media_type,
+            )
+        )
+        self._statistics.attachment_count += 1
+
+    def flush(self) -> None:
+        """Write out the chunk being built and flush the stream."""
+        self._finish_chunk()
+        self._stream.flush()
+
+    def finish(self) -> None:
+        """Write the summary section, footer and closing magic."""
+        self._finish_chunk()
+        self._write_record(DataEnd(data_section_crc=0))
+
+        summary_start = self._stream.tell()
+        summary = RecordBuilder()
+        offsets: List[SummaryOffset] = []
+
+        def write_group(opcode: Opcode, records) -> None:
+            group_start = summary.count
+            for record in records:
+                record.write(summary)
+            if summary.count > group_start:
+                offsets.append(
+                    SummaryOffset(
+                        group_opcode=opcode,
+                        group_start=summary_start + group_start,
+                        group_length=summary.count - group_start,
+                    )
+                )
+
+        write_group(Opcode.SCHEMA, self._schemas.values())
+        write_group(Opcode.CHANNEL, self._channels.values())
+        write_group(Opcode.STATISTICS, [self._statistics])
+        write_group(Opcode.CHUNK_INDEX, self._chunk_indexes)
+        write_group(Opcode.ATTACHMENT_INDEX, self._attachment_indexes)
+        write_group(Opcode.METADATA_INDEX, self._metadata_indexes)
+
+        summary_offset_start = summary_start + summary.count
+        for offset in offsets:
+            offset.write(summary)
+
+        summary_data = summary.end()
+        summary_crc = zlib.crc32(summary_data)
+        summary_crc = zlib.crc32(
+            struct.pack(
+                "<BQQQ", Opcode.FOOTER, 8 + 8 + 4, summary_start, summary_offset_start
+            ),
+            summary_crc,
+        )
+        self._stream.write(summary_data)
+        self._write_record(
+            Footer(
+                summary_start=summary_start,
+                summary_offset_start=summary_offset_start,
+                summary_crc=summary_crc,
+            )
+        )
+        self._stream.write(MCAP0_MAGIC)
+        self._stream.flush()
+
+    def _write_record(self, record) -> int:
+        builder = RecordBuilder()
+        record.write(builder)
+        data = builder.end()
+        self._stream.write(data)
+        return len(data)
+
+    def _count_messages(
+        self, start_time: int, end_time: int, channel_message_counts: Dict[int, int]
+    ) -> None:
+        statistics = self._statistics
+        if statistics.message_count == 0:
+            statistics.message_start_time = start_time
+        else:
+            statistics.message_start_time = min(
+                statistics.message_start_time, start_time
+            )
+        statistics.message_end_time = max(statistics.message_end_time, end_time)
+        for channel_id, count in channel_message_counts.items():
+            statistics.channel_message_counts[channel_id] += count
+            statistics.message_count += count
+
+    def _finish_chunk(self) -> None:
+        if self._pending_count == 0:
+            return
+
+        data = self._pending.end()
+        compression, compressed = _compress(data, self._compression)
+        chunk = Chunk(
+            compression=compression,
+            data=compressed,
+            message_start_time=self._pending_start_time,
+            message_end_time=self._pending_end_time,
+            uncompressed_crc=zlib.crc32(data),
+            uncompressed_size=len(data),
+        )
+
+        chunk_start = self._stream.tell()
+        chunk_length = self._write_record(chunk)
+        index_start = self._stream.tell()
+        index_offsets = {}
+        index_builder = RecordBuilder()
+        for channel_id, index in self._pending_indexes.items():
+            index_offsets[channel_id] = index_start + index_builder.count
+            index.write(index_builder)
+        index_data = index_builder.end()
+        self._stream.write(index_data)
+
+        self._chunk_indexes.append(
+            ChunkIndex(
+                message_start_time=chunk.message_start_time,
+                message_end_time=chunk.message_end_time,
+                chunk_start_offset=chunk_start,
+                chunk_length=chunk_length,
+                message_index_offsets=index_offsets,
+                message_index_length=len(index_data),
+                compression=compression,
+                compressed_size=len(compressed),
+                uncompressed_size=len(data),
+            )
+        )
+        self._statistics.chunk_count += 1
+
+        self._pending_indexes = {}
+        self._pending_count = 0
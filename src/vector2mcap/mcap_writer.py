@@ -1,32 +1,373 @@
 """MCAP writer with protobuf support."""
 
+import gc
+import time
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Iterator, Tuple, Dict, Any
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
 
-from mcap_protobuf.writer import Writer
+from mcap.records import Attachment, Channel, Schema
+from mcap.well_known import MessageEncoding, SchemaEncoding
+from mcap.writer import LIBRARY_IDENTIFIER, CompressionType
 from rich.console import Console
 from rich.progress import Progress, TaskID
 
-from . import event_pb2
-from .file_reader import read_jsonl_files
+from . import compact_pb2, event_pb2
+from .compact import (
+    COMPACT_VALUE_TYPES,
+    EVENT_TOPIC,
+    SAMPLE_TOPIC,
+    SERIES_TOPIC,
+    metric_to_sample,
+    series_definition,
+)
+from .file_reader import ReadPosition, read_jsonl_files
+from .filters import EventFilter
 from .json_to_protobuf import json_to_event_wrapper
+from .mcap_chunks import ChunkCopyWriter
+from .memory import CHECK_INTERVAL, MIN_FLUSH_SIZE, MemoryBudget, peak_rss
+from .recovery import CHECKPOINT_METADATA_NAME, Checkpoint
+from .rollup import ROLLUP_TAG, Rollup
+from .sampling import RangeSampling, Sampler
+from .schema import schema_data
+from .series import (
+    SERIES_INDEX_MEDIA_TYPE,
+    SERIES_INDEX_NAME,
+    SERIES_SUMMARY_METADATA_NAME,
+    Deduplicator,
+    SeriesKey,
+    SeriesTable,
+)
 
 
 console = Console()
 
+TOPIC = EVENT_TOPIC
 
-def write_mcap(input_files: list[str], output_file: str, verbose: bool = False) -> None:
+ROLLUP_TOPIC = "vector_rollup"
+
+LIBRARY = f"vector2mcap; {LIBRARY_IDENTIFIER}"
+
+# Messages between checkpoints. Each checkpoint closes the open chunk early,
+# so this is kept well above the number of messages in a full chunk.
+DEFAULT_CHECKPOINT_INTERVAL = 100_000
+
+
+class EventWriter:
+    """Write EventWrapper messages to an MCAP file.
+
+    Unlike the generic protobuf writer, this can flush the open chunk at any
+    point and record a checkpoint after it, so that a truncated file can be
+    recovered up to the last checkpoint.
+
+    Per-series statistics are accumulated while writing and stored on
+    ``finish`` as a series index attachment plus a summary metadata record,
+    both of which are listed in the summary section.
+
+    Args:
+        stream: Binary stream to write to
+        chunk_size: Uncompressed size at which a new chunk is started
+        compression: Chunk compression
+        compact: Use the compact series-dictionary encoding (see
+            ``vector2mcap.compact``) instead of full EventWrapper messages;
+            metric types without a compact form are still written in full
+        deduplicator: Suppress absolute samples that repeat the previous
+            value of their series
+        max_chunk_messages: Also start a new chunk after this many messages
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        chunk_size: int = 1024 * 1024,
+        compression: CompressionType = CompressionType.ZSTD,
+        compact: bool = False,
+        deduplicator: Optional[Deduplicator] = None,
+        max_chunk_messages: Optional[int] = None,
+    ):
+        self._stream = stream
+        self._writer = ChunkCopyWriter(
+            stream, chunk_size, compression, max_chunk_messages=max_chunk_messages
+        )
+        self._finished = False
+        self._compact = compact
+        self.deduplicator = deduplicator
+        self.series = SeriesTable()
+        self.event_count = 0
+        self._schema_ids: Dict[str, int] = {}
+        # Topic to (channel id, schema name)
+        self._channels: Dict[str, Tuple[int, str]] = {}
+
+        self._writer.start(library=LIBRARY)
+        if compact:
+            self._series_channel = self._add_channel(
+                SERIES_TOPIC, compact_pb2.SeriesDefinition
+            )
+            self._sample_channel = self._add_channel(SAMPLE_TOPIC, compact_pb2.Sample)
+        else:
+            self._event_channel = self._add_channel(TOPIC, event_pb2.EventWrapper)
+
+    def _add_channel(self, topic: str, message_class: Any) -> int:
+        """Register a channel, and its protobuf schema if not yet registered.
+
+        The schema is the trimmed descriptor set from ``vector2mcap.schema``,
+        serialized once per process and shared by every writer.
+        """
+        schema_name = message_class.DESCRIPTOR.full_name
+        schema_id = self._schema_ids.get(schema_name)
+        if schema_id is None:
+            schema_id = self._schema_ids[schema_name] = len(self._schema_ids) + 1
+            self._writer.add_schema(
+                Schema(
+                    id=schema_id,
+                    name=schema_name,
+                    encoding=SchemaEncoding.Protobuf,
+                    data=schema_data(message_class),
+                )
+            )
+
+        channel_id = self._writer.statistics.channel_count + 1
+        self._writer.add_channel(
+            Channel(
+                id=channel_id,
+                topic=topic,
+                message_encoding=MessageEncoding.Protobuf,
+                metadata={},
+                schema_id=schema_id,
+            )
+        )
+        self._channels[topic] = (channel_id, schema_name)
+        return channel_id
+
+    def _channel_for(self, topic: str, message_class: Any) -> int:
+        """Return the channel of a topic, registering it on first use.
+
+        Raises:
+            ValueError: If the topic already carries another message type
+        """
+        channel = self._channels.get(topic)
+        if channel is None:
+            return self._add_channel(topic, message_class)
+        channel_id, schema_name = channel
+        if schema_name != message_class.DESCRIPTOR.full_name:
+            raise ValueError(f"Topic {topic} already carries {schema_name} messages")
+        return channel_id
+
+    def _add_message(self, channel_id: int, data: bytes, log_time: int) -> None:
+        self._writer.add_message_data(channel_id, log_time, data)
+
+    def write_serialized(
+        self,
+        topic: str,
+        data: Union[bytes, bytearray, memoryview],
+        log_time: int,
+        message_class: Any = event_pb2.EventWrapper,
+    ) -> None:
+        """Buffer an already serialized protobuf message into the open chunk.
+
+        This is the path for producers that encode wire bytes themselves: no
+        message object is built or parsed, and ``data`` is copied into the
+        chunk, so its buffer may be reused. The topic's channel and schema
+        are registered on first use.
+
+        Unlike ``write_event``, the message is not deduplicated, recorded in
+        the series index or counted in ``event_count``.
+
+        Args:
+            topic: Topic to write on
+            data: Serialized ``message_class`` message
+            log_time: Log time in nanoseconds
+            message_class: Generated protobuf class whose schema describes
+                the topic
+
+        Raises:
+            ValueError: If the topic already carries another message type
+        """
+        self._writer.add_message_data(
+            self._channel_for(topic, message_class), log_time, data
+        )
+
+    def write_serialized_event(
+        self,
+        data: bytes,
+        log_time: int,
+        key: SeriesKey,
+        value_type: str,
+        value: Optional[float],
+    ) -> None:
+        """Buffer an already serialized EventWrapper on the event topic.
+
+        The caller supplies what the series index needs, so the message is
+        neither parsed nor serialized again. Unlike ``write_event``, it is not
+        deduplicated. In compact mode the event has to be re-encoded, so it is
+        parsed and passed to ``write_event``.
+
+        Args:
+            data: Serialized EventWrapper
+            log_time: The event's timestamp in nanoseconds
+            key: Series key of the event's metric
+            value_type: Name of the metric's value field
+            value: The metric's scalar value, or None if it has none
+        """
+        if self._compact:
+            self.write_event(event_pb2.EventWrapper.FromString(data), log_time)
+            return
+        self.series.record(self.series.key_id(key, value_type), log_time, value)
+        self.event_count += 1
+        self._add_message(self._event_channel, data, log_time)
+
+    def write_event(self, event_wrapper: event_pb2.EventWrapper, log_time: int) -> bool:
+        """Buffer an event into the open chunk.
+
+        Returns:
+            False if the event was suppressed as an unchanged sample
+        """
+        metric = event_wrapper.metric
+        compact = self._compact and metric.WhichOneof("value") in COMPACT_VALUE_TYPES
+
+        series_count = len(self.series)
+        series_id = self.series.series_id(metric)
+        if self.deduplicator is not None and not self.deduplicator.should_write(
+            series_id, metric, log_time
+        ):
+            return False
+        self.series.observe(metric, log_time, series_id)
+        self.event_count += 1
+
+        if not compact:
+            channel_id = (
+                self._channel_for(TOPIC, event_pb2.EventWrapper)
+                if self._compact
+                else self._event_channel
+            )
+            self._add_message(channel_id, event_wrapper.SerializeToString(), log_time)
+            return True
+
+        stable_id = self.series.stable_ids[series_id]
+        sample = metric_to_sample(metric, stable_id)
+        if len(self.series) > series_count:
+            definition = series_definition(self.series.keys[series_id], stable_id)
+            self._add_message(
+                self._series_channel, definition.SerializeToString(), log_time
+            )
+        self._add_message(self._sample_channel, sample.SerializeToString(), log_time)
+        return True
+
+    def write_rollup(self, metric: event_pb2.Metric) -> None:
+        """Buffer a rollup into the open chunk, on the rollup topic.
+
+        Rollups are always full EventWrapper messages and are never
+        deduplicated.
+        """
+        channel_id = self._channel_for(ROLLUP_TOPIC, event_pb2.EventWrapper)
+        log_time = metric.timestamp.ToNanoseconds()
+        self.series.observe(metric, log_time)
+        event_wrapper = event_pb2.EventWrapper(metric=metric)
+        self._add_message(channel_id, event_wrapper.SerializeToString(), log_time)
+
+    @property
+    def pending_size(self) -> int:
+        """Uncompressed bytes buffered in the open chunk."""
+        return self._writer.pending_size
+
+    def flush(self) -> None:
+        """Write out the open chunk early, releasing its buffer."""
+        self._writer.flush()
+
+    def checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Write out the open chunk, then record a checkpoint after it."""
+        self._writer.add_metadata(CHECKPOINT_METADATA_NAME, checkpoint.to_metadata())
+        self._writer.flush()
+
+    def finish(self) -> None:
+        """Write the series index, summary section and footer."""
+        if not self._finished:
+            self._write_series_index()
+            self._writer.finish()
+        self._finished = True
+
+    def _write_series_index(self) -> None:
+        summary = self.series.summary_metadata()
+        self._writer.add_metadata(SERIES_SUMMARY_METADATA_NAME, summary)
+        self._writer.add_attachment(
+            Attachment(
+                create_time=time.time_ns(),
+                log_time=int(summary["end_time"]),
+                name=SERIES_INDEX_NAME,
+                media_type=SERIES_INDEX_MEDIA_TYPE,
+                data=self.series.index_data(),
+            )
+        )
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.finish()
+
+
+def write_mcap(
+    input_files: list[str],
+    output_file: str,
+    *,
+    verbose: bool = False,
+    event_filter: Optional[EventFilter] = None,
+    sorted_input: bool = False,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    resume_from: Optional[Checkpoint] = None,
+    compact: bool = False,
+    dedupe: bool = False,
+    heartbeat: Optional[int] = None,
+    rollup: Optional[Rollup] = None,
+    keep_raw: bool = True,
+    partition_by: Optional[str] = None,
+    max_open_files: int = 64,
+    sampler: Optional[Sampler] = None,
+    range_sampling: Optional[RangeSampling] = None,
+    memory_budget: Optional[MemoryBudget] = None,
+) -> None:
     """Write JSONL files to MCAP format using protobuf serialization.
 
     Args:
         input_files: List of input JSONL file paths
-        output_file: Output MCAP file path
+        output_file: Output MCAP file path, or the output directory when
+            partitioning
         verbose: Enable verbose output
+        event_filter: Optional filter selecting which events to convert
+        sorted_input: Each input file is sorted by timestamp
+        checkpoint_interval: Record a checkpoint every this many messages, or
+            never if 0
+        resume_from: Checkpoint of an interrupted conversion of the same
+            inputs. Only input after it is converted.
+        compact: Write the compact series-dictionary encoding
+        dedupe: Skip absolute counter and gauge samples whose value is
+            unchanged since the series was last written
+        heartbeat: With dedupe, write unchanged samples anyway once this many
+            nanoseconds have passed since the series was last written
+        rollup: Aggregate events into windows written to the vector_rollup
+            topic. Window state is not checkpointed, so checkpoints are not
+            written when rolling up.
+        keep_raw: With rollup, also write the raw events
+        partition_by: Write one file per value of this tag into the output
+            directory. Checkpoints are not written when partitioning.
+        max_open_files: When partitioning, the most partition files kept open
+        sampler: Only write the events this per-series sampler keeps.
+            Checkpoints are not written when sampling.
+        range_sampling: Only read evenly spaced byte ranges of each input.
+            Checkpoints are not written when sampling.
+        memory_budget: Size chunk buffers to fit this budget, and write out
+            open chunks early (closing idle partition files if needed)
+            whenever memory use nears it
     """
+    from .partition import PartitionedWriter
+
     output_path = Path(output_file)
 
     # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if partition_by is not None:
+        output_path.mkdir(parents=True, exist_ok=True)
+    else:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
     total_lines = 0
     processed_lines = 0
@@ -37,72 +378,224 @@ def write_mcap(input_files: list[str], output_file: str, verbose: bool = False)
         console.print("[blue]Counting input lines...[/blue]")
         for file_path in input_files:
             try:
-                with open(file_path, "r") as f:
+                with open(file_path, "rb") as f:
                     total_lines += sum(1 for line in f if line.strip())
             except Exception as e:
                 console.print(
                     f"[yellow]Warning: Could not count lines in {file_path}: {e}[/yellow]"
                 )
 
-    with open(output_path, "wb") as f, Writer(f) as writer:
-        # Progress tracking
-        if verbose and total_lines > 0:
-            with Progress() as progress:
-                task = progress.add_task("Converting files...", total=total_lines)
-
-                for file_path, json_obj in read_jsonl_files(input_files):
-                    processed_lines += 1
-
-                    # Convert JSON to protobuf
-                    event_wrapper = json_to_event_wrapper(json_obj)
-                    if event_wrapper is None:
-                        error_count += 1
-                        progress.advance(task)
-                        continue
-
-                    # Write to MCAP
-                    try:
-                        writer.write_message(
-                            topic="vector_event",
-                            message=event_wrapper,
-                            log_time=event_wrapper.metric.timestamp.ToNanoseconds(),
-                            publish_time=event_wrapper.metric.timestamp.ToNanoseconds(),
-                        )
-                    except Exception as e:
-                        console.print(f"[red]Error writing message: {e}[/red]")
-                        error_count += 1
-
-                    progress.advance(task)
+    if (
+        rollup is not None
+        or partition_by is not None
+        or sampler is not None
+        or range_sampling is not None
+    ):
+        checkpoint_interval = 0
+
+    position = ReadPosition()
+    resume_position = None
+    if resume_from is not None:
+        resume_position = ReadPosition(
+            resume_from.file_path, resume_from.offset, resume_from.line_number
+        )
+
+    chunk_size = 1024 * 1024
+    max_chunk_messages = None
+    if memory_budget is not None:
+        chunk_size = memory_budget.chunk_size(
+            max_open_files if partition_by is not None else 1
+        )
+        max_chunk_messages = memory_budget.max_chunk_messages(chunk_size)
+
+    def make_writer(stream: BinaryIO) -> EventWriter:
+        return EventWriter(
+            stream,
+            chunk_size,
+            compact=compact,
+            deduplicator=Deduplicator(heartbeat) if dedupe else None,
+            max_chunk_messages=max_chunk_messages,
+        )
+
+    suppressed = 0
+    events = 0
+    partitions = None
+    with ExitStack() as stack:
+        if partition_by is not None:
+            partitions = stack.enter_context(
+                PartitionedWriter(
+                    output_path, partition_by, make_writer, max_open_files
+                )
+            )
+            writer_for = partitions.writer_for
         else:
-            # Process without progress bar
-            for file_path, json_obj in read_jsonl_files(input_files):
-                processed_lines += 1
-
-                # Convert JSON to protobuf
-                event_wrapper = json_to_event_wrapper(json_obj)
-                if event_wrapper is None:
-                    error_count += 1
-                    continue
+            f = stack.enter_context(open(output_path, "wb"))
+            single_writer = stack.enter_context(make_writer(f))
+            writer_for = lambda metric: single_writer
+
+        def relieve_memory_pressure() -> None:
+            if memory_budget is None or not memory_budget.under_pressure():
+                return
+            memory_budget.pressure_checks += 1
+            if partitions is not None:
+                writers = partitions.open_writers
+            else:
+                writers = [single_writer]
+            for open_writer in writers:
+                if open_writer.pending_size >= MIN_FLUSH_SIZE:
+                    open_writer.flush()
+                    memory_budget.early_flushes += 1
+            gc.collect()
+            # Open partitions each hold per-series state as well as a chunk
+            while (
+                partitions is not None
+                and memory_budget.under_pressure()
+                and partitions.shrink()
+            ):
+                gc.collect()
+            if memory_budget.over_limit():
+                memory_budget.exceeded = True
+
+        progress = stack.enter_context(
+            Progress(disable=not (verbose and total_lines > 0))
+        )
+        task = progress.add_task("Converting files...", total=total_lines)
+
+        def write(event_wrapper: event_pb2.EventWrapper) -> None:
+            nonlocal suppressed, error_count, events
+            events += 1
+            if memory_budget is not None and events % CHECK_INTERVAL == 0:
+                relieve_memory_pressure()
+            log_time = event_wrapper.metric.timestamp.ToNanoseconds()
+            writer = writer_for(event_wrapper.metric)
+            try:
+                if not writer.write_event(event_wrapper, log_time):
+                    suppressed += 1
+                    return
+            except Exception as e:
+                console.print(f"[red]Error writing message: {e}[/red]")
+                error_count += 1
+                return
 
-                # Write to MCAP
-                try:
-                    writer.write_message(
-                        topic="vector_event",
-                        message=event_wrapper,
-                        log_time=event_wrapper.metric.timestamp.ToNanoseconds(),
-                        publish_time=event_wrapper.metric.timestamp.ToNanoseconds(),
+            if checkpoint_interval and writer.event_count % checkpoint_interval == 0:
+                writer.checkpoint(
+                    Checkpoint(
+                        file_path=position.file_path,
+                        offset=position.offset,
+                        line_number=position.line_number,
+                        log_time=log_time,
+                        message_count=writer.event_count,
                     )
-                except Exception as e:
-                    console.print(f"[red]Error writing message: {e}[/red]")
-                    error_count += 1
+                )
+
+        for file_path, json_obj in read_jsonl_files(
+            input_files,
+            event_filter,
+            sorted_input,
+            position,
+            resume_position,
+            range_sampling,
+        ):
+            processed_lines += 1
+            if event_filter is None:
+                progress.advance(task)
+            else:
+                # Filtered lines never reach us, so track lines read instead
+                progress.update(task, completed=event_filter.stats.lines_read)
+
+            # Convert JSON to protobuf
+            event_wrapper = json_to_event_wrapper(json_obj)
+            if event_wrapper is None:
+                error_count += 1
+                continue
+
+            if rollup is not None:
+                for metric in rollup.add(event_wrapper.metric):
+                    writer_for(metric).write_rollup(metric)
+                if not keep_raw:
+                    continue
+
+            if sampler is not None:
+                for sampled in sampler.add(event_wrapper):
+                    write(sampled)
+            else:
+                write(event_wrapper)
+
+        if sampler is not None:
+            for sampled in sampler.flush():
+                write(sampled)
+
+        if rollup is not None:
+            for metric in rollup.flush():
+                writer_for(metric).write_rollup(metric)
+
+        progress.update(task, completed=total_lines)
+
+    if memory_budget is not None and memory_budget.exceeded:
+        console.print(
+            "[yellow]Warning: memory use exceeded --max-memory even after "
+            "writing out open chunks; per-series state or a sampling "
+            "reservoir may need more memory than the budget allows[/yellow]"
+        )
+    if rollup is not None and rollup.stats.late_samples:
+        console.print(
+            f"[yellow]Warning: dropped {rollup.stats.late_samples} samples that "
+            "arrived after their window closed; raise --rollup-lateness to "
+            "keep them[/yellow]"
+        )
+    if rollup is not None and rollup.stats.tagged_samples:
+        console.print(
+            f"[yellow]Warning: did not roll up {rollup.stats.tagged_samples} "
+            f"samples that already carry the '{ROLLUP_TAG}' tag[/yellow]"
+        )
 
     # Summary
-    successful_lines = processed_lines - error_count
+    sampled_out = 0 if sampler is None else sampler.stats.seen - sampler.stats.kept
+    successful_lines = processed_lines - error_count - suppressed - sampled_out
     if verbose:
+        if event_filter is not None and not event_filter.is_empty:
+            stats = event_filter.stats
+            console.print(f"[green]Read {stats.lines_read} lines[/green]")
+            console.print(
+                f"[blue]Rejected {stats.prefilter_rejected} lines by prefilter, "
+                f"{stats.filter_rejected} after parsing[/blue]"
+            )
+            if stats.bytes_skipped:
+                console.print(
+                    f"[blue]Skipped {stats.bytes_skipped} bytes by seeking[/blue]"
+                )
         console.print(f"[green]Processed {processed_lines} lines[/green]")
         console.print(
             f"[green]Successfully converted {successful_lines} messages[/green]"
         )
+        if dedupe:
+            console.print(f"[blue]Suppressed {suppressed} unchanged samples[/blue]")
+        if sampler is not None:
+            console.print(
+                f"[blue]Sampled {sampler.stats.kept} of {sampler.stats.seen} "
+                "events[/blue]"
+            )
+        if rollup is not None:
+            console.print(
+                f"[green]Wrote {rollup.stats.rollups} rollups for "
+                f"{rollup.stats.windows_closed} windows[/green]"
+            )
+        if partitions is not None:
+            console.print(
+                f"[green]Wrote {len(partitions.outputs)} partitions by "
+                f"'{partition_by}'[/green]"
+            )
+            if partitions.evictions:
+                console.print(
+                    f"[blue]Closed {partitions.evictions} idle partition files "
+                    "to stay within the open file limit[/blue]"
+                )
+        if memory_budget is not None:
+            console.print(
+                f"[blue]Peak memory {peak_rss() // 1024**2} MiB of "
+                f"{memory_budget.limit // 1024**2} MiB budget; "
+                f"{memory_budget.early_flushes} chunks written early[/blue]"
+            )
         if error_count > 0:
             console.print(f"[yellow]Encountered {error_count} errors[/yellow]")
         console.print(f"[green]Output written to: {output_file}[/green]")
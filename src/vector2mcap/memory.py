@@ -0,0 +1,141 @@
+"""Keep a conversion within a memory budget.
+
+Most of the memory a conversion holds beyond the interpreter itself is the
+open chunk of each output writer: its uncompressed buffer, the compressed
+copy made when it is finished, and one message index entry per message.
+With ``--partition-by`` there is one such chunk per open partition file.
+Per-series state (the series index, deduplication and rollup windows) grows
+with the number of series, not with the size of the input.
+
+A ``MemoryBudget`` sizes chunk buffers so that all open writers fit in a
+share of the budget, and caps the messages per chunk so that small messages
+cannot grow the message indexes past that size. While converting, the
+resident set size is sampled every few thousand events; above the high
+watermark, open chunks are written out early and, if that is not enough,
+fewer partition files are kept open.
+"""
+
+import re
+import resource
+import sys
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Smallest chunk buffer a budget will size, to keep chunk indexes few
+MIN_CHUNK_SIZE = 64 * 1024
+
+# Open chunks smaller than this are not flushed early under pressure
+MIN_FLUSH_SIZE = 16 * 1024
+
+# Smallest average message size the per-chunk message cap allows for
+MIN_MESSAGE_SIZE = 32
+
+# Least memory a budget must leave above the starting RSS
+MIN_HEADROOM = 16 * 1024 * 1024
+
+# Share of the budget above the starting RSS given to open chunk buffers
+CHUNK_BUFFER_SHARE = 0.25
+
+# Copies of a chunk's data alive while it is being finished
+CHUNK_COPIES = 3
+
+# Fraction of the budget above which pressure relief starts
+HIGH_WATERMARK = 0.9
+
+# Events between RSS samples
+CHECK_INTERVAL = 4096
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(i?b)?\s*$", re.IGNORECASE)
+
+_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as "512M", "2G", "1.5GiB" or "1048576" into bytes.
+
+    Units are binary: "1K" is 1024 bytes.
+
+    Raises:
+        ValueError: If the size cannot be parsed
+    """
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    number, unit, _ = match.groups()
+    return int(float(number) * _UNITS[unit.lower()])
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if it can be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * resource.getpagesize()
+
+
+def peak_rss() -> int:
+    """Highest resident set size of this process so far, in bytes."""
+    # The high-water mark of the address space, which unlike ru_maxrss does
+    # not carry over the parent's memory across fork and exec
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class MemoryBudget:
+    """A limit on the resident memory of a conversion.
+
+    Attributes:
+        limit: Resident set size to stay under, in bytes
+        baseline: Resident set size before converting, taken when the
+            budget is created
+        pressure_checks: Times the RSS was found above the high watermark
+        early_flushes: Open chunks written out early to release memory
+        exceeded: Whether the RSS stayed over the limit after relief
+    """
+
+    limit: int
+    baseline: int = field(default_factory=lambda: current_rss() or 0)
+    pressure_checks: int = 0
+    early_flushes: int = 0
+    exceeded: bool = False
+
+    def __post_init__(self) -> None:
+        if self.limit < self.baseline + MIN_HEADROOM:
+            raise ValueError(
+                f"A memory budget of {self.limit // 1024**2} MiB is too small: "
+                f"{self.baseline // 1024**2} MiB is in use before converting"
+            )
+
+    def chunk_size(self, open_writers: int = 1) -> int:
+        """Chunk buffer size that fits this many open writers in the budget."""
+        share = (self.limit - self.baseline) * CHUNK_BUFFER_SHARE
+        size = int(share / (CHUNK_COPIES * max(open_writers, 1)))
+        return max(MIN_CHUNK_SIZE, min(DEFAULT_CHUNK_SIZE, size))
+
+    def max_chunk_messages(self, chunk_size: int) -> int:
+        """Most messages a chunk of the given size may index."""
+        return max(chunk_size // MIN_MESSAGE_SIZE, 1)
+
+    def under_pressure(self) -> bool:
+        """Whether the RSS is above the high watermark of the limit."""
+        rss = current_rss()
+        return rss is not None and rss > self.limit * HIGH_WATERMARK
+
+    def over_limit(self) -> bool:
+        """Whether the RSS is above the limit itself."""
+        rss = current_rss()
+        return rss is not None and rss > self.limit
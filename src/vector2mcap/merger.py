@@ -0,0 +1,258 @@
+"""Merge existing MCAP files without re-converting their source JSONL.
+
+Chunks are copied verbatim whenever that keeps the output valid. A chunk is
+only decompressed and rebuilt when its channel ids have to be remapped, or when
+its time range overlaps another chunk that is still pending and time
+interleaving is requested.
+"""
+
+import heapq
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, List
+
+from mcap.reader import SeekingReader
+from mcap.records import Channel, ChunkIndex, Message, Schema
+from mcap.summary import Summary
+from rich.console import Console
+
+from .mcap_chunks import (
+    ChunkCopyWriter,
+    chunk_messages,
+    message_index_counts,
+    read_chunk,
+    read_chunk_bytes,
+)
+
+
+console = Console()
+
+LIBRARY = "vector2mcap merge"
+
+
+@dataclass
+class MergeStats:
+    """Counters describing how a merge was carried out."""
+
+    chunks_copied: int = 0
+    chunks_rebuilt: int = 0
+    messages: int = 0
+
+
+@dataclass
+class _Source:
+    """An input file with its ids mapped onto the output's."""
+
+    stream: BinaryIO
+    reader: SeekingReader
+    summary: Summary
+    channel_map: Dict[int, int] = field(default_factory=dict)
+    identity: bool = True
+
+
+def _open_sources(input_files: list[str], stack: ExitStack) -> List[_Source]:
+    """Open the inputs and read their summary sections."""
+    sources = []
+    for input_file in input_files:
+        stream = stack.enter_context(open(input_file, "rb"))
+        reader = SeekingReader(stream)
+        summary = reader.get_summary()
+        if summary is None:
+            raise ValueError(
+                f"{input_file} has no summary section; "
+                "run 'vector2mcap recover' on it first"
+            )
+        sources.append(_Source(stream, reader, summary))
+    return sources
+
+
+def _register_sources(sources: List[_Source], writer: ChunkCopyWriter) -> None:
+    """Unify the inputs' schemas and channels and register them on the output.
+
+    Identical schemas and channels share one output id. Ids are assigned in
+    input order, so inputs written by this tool usually keep their own ids.
+    """
+    schema_ids: Dict[tuple, int] = {}
+    channel_ids: Dict[tuple, int] = {}
+
+    for source in sources:
+        schema_map = {}
+        for schema in source.summary.schemas.values():
+            key = (schema.name, schema.encoding, schema.data)
+            if key not in schema_ids:
+                schema_ids[key] = len(schema_ids) + 1
+                writer.add_schema(
+                    Schema(
+                        id=schema_ids[key],
+                        name=schema.name,
+                        encoding=schema.encoding,
+                        data=schema.data,
+                    )
+                )
+            schema_map[schema.id] = schema_ids[key]
+
+        for channel in source.summary.channels.values():
+            schema_id = schema_map.get(channel.schema_id, 0)
+            key = (
+                channel.topic,
+                channel.message_encoding,
+                schema_id,
+                tuple(sorted(channel.metadata.items())),
+            )
+            if key not in channel_ids:
+                channel_ids[key] = len(channel_ids) + 1
+                writer.add_channel(
+                    Channel(
+                        id=channel_ids[key],
+                        topic=channel.topic,
+                        message_encoding=channel.message_encoding,
+                        metadata=dict(channel.metadata),
+                        schema_id=schema_id,
+                    )
+                )
+            source.channel_map[channel.id] = channel_ids[key]
+
+        # Copied chunks embed the source's own schema and channel records, so
+        # they are only valid if every id is unchanged
+        source.identity = all(old == new for old, new in schema_map.items()) and all(
+            old == new for old, new in source.channel_map.items()
+        )
+
+
+def _rebuild_chunk(source: _Source, chunk_index: ChunkIndex) -> List[Message]:
+    """Decompress a chunk and remap its messages onto output channel ids."""
+    messages = chunk_messages(read_chunk(source.stream, chunk_index))
+    for message in messages:
+        message.channel_id = source.channel_map[message.channel_id]
+    return messages
+
+
+def _copy_or_rebuild(
+    writer: ChunkCopyWriter,
+    source: _Source,
+    chunk_index: ChunkIndex,
+    stats: MergeStats,
+) -> None:
+    """Copy a chunk verbatim if possible, otherwise rebuild it."""
+    if source.identity:
+        chunk_record, message_indexes = read_chunk_bytes(source.stream, chunk_index)
+        counts = message_index_counts(message_indexes)
+        if counts is not None:
+            writer.copy_chunk(chunk_record, message_indexes, chunk_index, counts)
+            stats.chunks_copied += 1
+            stats.messages += sum(counts.values())
+            return
+
+    for message in _rebuild_chunk(source, chunk_index):
+        writer.add_message(message)
+        stats.messages += 1
+    stats.chunks_rebuilt += 1
+
+
+def _merge_concatenated(
+    writer: ChunkCopyWriter, sources: List[_Source], stats: MergeStats
+) -> None:
+    for source in sources:
+        for chunk_index in source.summary.chunk_indexes:
+            _copy_or_rebuild(writer, source, chunk_index, stats)
+
+
+def _merge_interleaved(
+    writer: ChunkCopyWriter, sources: List[_Source], stats: MergeStats
+) -> None:
+    # The heap holds chunks keyed by their start time and decoded messages
+    # keyed by their log time. A chunk popped off the heap can be copied whole
+    # when nothing left in the heap starts before it ends.
+    heap: list = []
+    for source_index, source in enumerate(sources):
+        for chunk_order, chunk_index in enumerate(source.summary.chunk_indexes):
+            heapq.heappush(
+                heap,
+                (
+                    chunk_index.message_start_time,
+                    0,
+                    source_index,
+                    chunk_order,
+                    chunk_index,
+                ),
+            )
+
+    while heap:
+        time, kind, source_index, order, item = heapq.heappop(heap)
+        if kind == 1:
+            writer.add_message(item)
+            stats.messages += 1
+            continue
+
+        source = sources[source_index]
+        if not heap or heap[0][0] >= item.message_end_time:
+            _copy_or_rebuild(writer, source, item, stats)
+            continue
+
+        for message_order, message in enumerate(_rebuild_chunk(source, item)):
+            heapq.heappush(
+                heap,
+                (message.log_time, 1, source_index, (order, message_order), message),
+            )
+        stats.chunks_rebuilt += 1
+
+
+def merge_mcap(
+    input_files: list[str],
+    output_file: str,
+    interleave: bool = True,
+    verbose: bool = False,
+) -> MergeStats:
+    """Merge MCAP files produced by this tool into one file.
+
+    Args:
+        input_files: MCAP files to merge
+        output_file: Output MCAP file path
+        interleave: Order messages by log time across inputs. If False, the
+            inputs are concatenated in the order given.
+        verbose: Enable verbose output
+
+    Returns:
+        Counts of copied and rebuilt chunks
+
+    Raises:
+        ValueError: If an input has no summary section
+    """
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    stats = MergeStats()
+
+    with ExitStack() as stack:
+        sources = _open_sources(input_files, stack)
+        profile = sources[0].reader.get_header().profile if sources else ""
+
+        output = stack.enter_context(open(output_path, "wb"))
+        writer = ChunkCopyWriter(output)
+        writer.start(profile=profile, library=LIBRARY)
+        _register_sources(sources, writer)
+
+        if interleave:
+            _merge_interleaved(writer, sources, stats)
+        else:
+            _merge_concatenated(writer, sources, stats)
+
+        for source in sources:
+            for metadata in source.reader.iter_metadata():
+                writer.add_metadata(metadata.name, metadata.metadata)
+            for attachment in source.reader.iter_attachments():
+                writer.add_attachment(attachment)
+
+        writer.finish()
+
+    if verbose:
+        console.print(
+            f"[green]Merged {stats.messages} messages from {len(input_files)} files[/green]"
+        )
+        console.print(
+            f"[blue]Copied {stats.chunks_copied} chunks verbatim, "
+            f"rebuilt {stats.chunks_rebuilt}[/blue]"
+        )
+        console.print(f"[green]Output written to: {output_file}[/green]")
+
+    return stats
@@ -0,0 +1,74 @@
+"""Process-pool helpers for per-chunk work.
+
+Reading an MCAP file chunk by chunk parallelizes well: each chunk can be
+decompressed and decoded on its own. These helpers run such work in a
+process pool while keeping results in submission order and only a bounded
+number of chunks in flight, so memory use does not grow with the file.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class InProcessExecutor(Executor):
+    """Run tasks immediately in the calling process."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def make_executor(
+    workers: Optional[int],
+    task_count: int,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: tuple = (),
+) -> tuple[Executor, int]:
+    """Create an executor for the given number of tasks.
+
+    With a single worker or at most one task, a process pool would only add
+    start-up cost, so tasks run in this process instead.
+
+    Args:
+        workers: Number of processes, by default one per CPU
+        task_count: Number of tasks that will be submitted
+        initializer: Called once in each worker before any task
+        initargs: Arguments for the initializer
+
+    Returns:
+        (executor, workers), where workers is the resolved process count
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or task_count <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return InProcessExecutor(), 1
+    return (
+        ProcessPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        ),
+        workers,
+    )
+
+
+def ordered_map(
+    executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int
+) -> Iterator[R]:
+    """Map fn over items with at most ``window`` in flight, yielding in order."""
+    pending: Deque["Future[Any]"] = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
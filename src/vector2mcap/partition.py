@@ -0,0 +1,177 @@
+"""Route events to one MCAP file per tag value.
+
+Only a bounded number of partition files are kept open. When the pool is
+full, the least recently used writer is finished, and if that partition shows
+up again it continues in a new segment file. On close, the segments of each
+partition are merged into one file; merging copies chunks verbatim, so this
+costs little more than the disk I/O.
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from . import event_pb2
+from .mcap_writer import EventWriter
+from .merger import merge_mcap
+from .series import Deduplicator
+
+
+# File name for events that do not carry the partition tag
+UNTAGGED_PARTITION = "_untagged"
+
+DEFAULT_MAX_OPEN_WRITERS = 64
+
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9._-]")
+
+_HASH_SUFFIX = re.compile(r"-[0-9a-f]{8}$")
+
+
+def partition_file_name(partition: Optional[str]) -> str:
+    """Turn a tag value into a file name, without the extension.
+
+    Values that are not safe file names, or that could be mistaken for the
+    untagged partition or a hashed name, are sanitized and suffixed with a
+    short hash so that distinct values never share a file.
+
+    Args:
+        partition: The tag value, or None for events without the tag
+    """
+    if partition is None:
+        return UNTAGGED_PARTITION
+    safe = _UNSAFE_CHARACTERS.sub("_", partition)
+    if (
+        safe == partition
+        and not safe.startswith(".")
+        and safe != UNTAGGED_PARTITION
+        and not _HASH_SUFFIX.search(safe)
+    ):
+        return safe
+    digest = hashlib.blake2b(partition.encode(), digest_size=4).hexdigest()
+    return f"{safe.lstrip('.')}-{digest}"
+
+
+class PartitionedWriter:
+    """Keep an LRU pool of EventWriters, one per partition.
+
+    With deduplication, the state of a partition's deduplicator is carried
+    over to the writer of its next segment, so samples are suppressed the
+    same way whether or not the partition was evicted in between.
+
+    Args:
+        output_dir: Directory for the partition files
+        tag: Tag whose value selects the partition
+        make_writer: Creates an EventWriter for an open output stream
+        max_open: Maximum number of partition files open at once
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        tag: str,
+        make_writer: Callable[[BinaryIO], EventWriter],
+        max_open: int = DEFAULT_MAX_OPEN_WRITERS,
+    ):
+        if max_open < 1:
+            raise ValueError("At least one writer must be allowed open")
+        self.output_dir = output_dir
+        self.tag = tag
+        self.max_open = max_open
+        self.evictions = 0
+        self.outputs: Dict[Optional[str], Path] = {}
+        self._make_writer = make_writer
+        self._open: "OrderedDict[Optional[str], tuple[BinaryIO, EventWriter]]" = (
+            OrderedDict()
+        )
+        self._segments: Dict[Optional[str], List[Path]] = {}
+        # Deduplicators of evicted partitions, for their next segment
+        self._deduplicators: Dict[Optional[str], Deduplicator] = {}
+        self._closed = False
+
+    def writer_for(self, metric: event_pb2.Metric) -> EventWriter:
+        """Return the writer for a metric's partition, opening it if needed."""
+        partition = metric.tags_v1.get(self.tag)
+        entry = self._open.get(partition)
+        if entry is not None:
+            self._open.move_to_end(partition)
+            return entry[1]
+
+        if len(self._open) >= self.max_open:
+            self._evict()
+
+        segments = self._segments.setdefault(partition, [])
+        path = self.output_dir / (
+            f"{partition_file_name(partition)}.segment-{len(segments)}.mcap"
+        )
+        segments.append(path)
+        stream = open(path, "wb")
+        writer = self._make_writer(stream)
+        deduplicator = self._deduplicators.pop(partition, None)
+        if deduplicator is not None:
+            writer.deduplicator = deduplicator
+        self._open[partition] = (stream, writer)
+        return writer
+
+    @property
+    def open_writers(self) -> List[EventWriter]:
+        """Writers of the partitions currently open."""
+        return [writer for _, writer in self._open.values()]
+
+    def shrink(self) -> bool:
+        """Halve the number of open writers, finishing the least recently used.
+
+        Returns:
+            False if only one writer was allowed open already
+        """
+        if self.max_open == 1:
+            return False
+        self.max_open = max(self.max_open // 2, 1)
+        while len(self._open) > self.max_open:
+            self._evict()
+        return True
+
+    def close(self) -> Dict[Optional[str], Path]:
+        """Finish every partition, merging segments where there are several.
+
+        Returns:
+            The output file of each partition, also kept in ``outputs``
+        """
+        if self._closed:
+            return self.outputs
+        self._closed = True
+        while self._open:
+            self._close_writer(*self._open.popitem(last=False)[1])
+
+        for partition, segments in self._segments.items():
+            output = self.output_dir / f"{partition_file_name(partition)}.mcap"
+            if len(segments) == 1:
+                segments[0].replace(output)
+            else:
+                merge_mcap([str(segment) for segment in segments], str(output))
+                for segment in segments:
+                    segment.unlink()
+            self.outputs[partition] = output
+        return self.outputs
+
+    def _evict(self) -> None:
+        """Finish the least recently used writer, keeping its dedupe state."""
+        partition, (stream, writer) = self._open.popitem(last=False)
+        if writer.deduplicator is not None:
+            self._deduplicators[partition] = writer.deduplicator.resume(
+                writer.series.keys
+            )
+        self._close_writer(stream, writer)
+        self.evictions += 1
+
+    @staticmethod
+    def _close_writer(stream: BinaryIO, writer: EventWriter) -> None:
+        writer.finish()
+        stream.close()
+
+    def __enter__(self) -> "PartitionedWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
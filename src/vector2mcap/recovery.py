@@ -0,0 +1,355 @@
+"""Checkpoints and recovery of truncated MCAP output.
+
+While converting, the writer periodically finishes the open chunk and writes a
+checkpoint metadata record recording how far into the input it got. If the
+run is killed, ``recover_mcap`` salvages every complete chunk of the truncated
+file up to the last checkpoint, rebuilds the summary section, and returns the
+checkpoint so that conversion can resume from that input position.
+"""
+
+import os
+import struct
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+from mcap.data_stream import ReadDataStream
+from mcap.exceptions import McapError
+from mcap.opcode import Opcode
+from mcap.reader import make_reader
+from mcap.records import (
+    Attachment,
+    Channel,
+    Chunk,
+    ChunkIndex,
+    Header,
+    Message,
+    MessageIndex,
+    Metadata,
+    Schema,
+)
+from mcap.stream_reader import breakup_chunk
+from mcap.writer import MCAP0_MAGIC
+from rich.console import Console
+
+from .mcap_chunks import (
+    RECORD_PREFIX_SIZE,
+    ChunkCopyWriter,
+    chunk_messages,
+    read_chunk,
+    read_chunk_bytes,
+)
+
+
+console = Console()
+
+CHECKPOINT_METADATA_NAME = "vector2mcap.checkpoint"
+
+LIBRARY = "vector2mcap recover"
+
+
+@dataclass
+class Checkpoint:
+    """A point in the input up to which all output has been written."""
+
+    file_path: str
+    offset: int
+    line_number: Optional[int]
+    log_time: int
+    message_count: int
+
+    def to_metadata(self) -> Dict[str, str]:
+        """Encode as an MCAP metadata map."""
+        return {
+            "file_path": self.file_path,
+            "offset": str(self.offset),
+            "line_number": "" if self.line_number is None else str(self.line_number),
+            "log_time": str(self.log_time),
+            "message_count": str(self.message_count),
+        }
+
+    @classmethod
+    def from_metadata(cls, data: Dict[str, str]) -> "Checkpoint":
+        """Decode from an MCAP metadata map."""
+        return cls(
+            file_path=data["file_path"],
+            offset=int(data["offset"]),
+            line_number=int(data["line_number"]) if data.get("line_number") else None,
+            log_time=int(data["log_time"]),
+            message_count=int(data["message_count"]),
+        )
+
+
+@dataclass
+class RecoveryResult:
+    """Outcome of recovering a truncated MCAP file."""
+
+    chunks_recovered: int = 0
+    messages_recovered: int = 0
+    chunks_dropped: int = 0
+    last_log_time: Optional[int] = None
+    checkpoint: Optional[Checkpoint] = None
+    truncated: bool = True
+
+
+@dataclass
+class _ChunkEntry:
+    """Location of a complete chunk in the damaged file."""
+
+    chunk_index: ChunkIndex
+    channel_message_counts: Optional[Dict[int, int]]
+
+
+def read_checkpoint(mcap_file: str) -> Optional[Checkpoint]:
+    """Read the last checkpoint recorded in a complete MCAP file.
+
+    Args:
+        mcap_file: MCAP file, e.g. the output of ``recover_mcap``
+
+    Returns:
+        The last checkpoint, or None if the file has none
+    """
+    checkpoint = None
+    with open(mcap_file, "rb") as f:
+        for metadata in make_reader(f).iter_metadata():
+            if metadata.name == CHECKPOINT_METADATA_NAME:
+                checkpoint = Checkpoint.from_metadata(metadata.metadata)
+    return checkpoint
+
+
+def _read_records(stream: BinaryIO):
+    """Yield (offset, opcode, body) for each complete record in the stream."""
+    while True:
+        offset = stream.tell()
+        prefix = stream.read(RECORD_PREFIX_SIZE)
+        if len(prefix) < RECORD_PREFIX_SIZE:
+            return
+        opcode, length = struct.unpack("<BQ", prefix)
+        body = stream.read(length)
+        if len(body) < length:
+            return
+        yield offset, opcode, body
+
+
+def _body_stream(body: bytes) -> ReadDataStream:
+    return ReadDataStream(BytesIO(body))
+
+
+class _Scan:
+    """Everything salvageable from a damaged file, found in a single pass."""
+
+    def __init__(self) -> None:
+        self.header: Optional[Header] = None
+        self.schemas: Dict[int, Schema] = {}
+        self.channels: Dict[int, Channel] = {}
+        self.chunks: List[_ChunkEntry] = []
+        self.messages: List[Message] = []
+        self.metadata: List[tuple[int, Metadata]] = []
+        self.attachments: List[tuple[int, Attachment]] = []
+        # (number of chunks before it, checkpoint) for each checkpoint record
+        self.checkpoints: List[tuple[int, Checkpoint]] = []
+        self.complete = False
+
+    def add_chunk(
+        self,
+        offset: int,
+        length: int,
+        chunk: Chunk,
+        indexes: List[tuple[int, int, MessageIndex]],
+    ) -> None:
+        chunk_index = ChunkIndex(
+            message_start_time=chunk.message_start_time,
+            message_end_time=chunk.message_end_time,
+            chunk_start_offset=offset,
+            chunk_length=length,
+            message_index_offsets={
+                index.channel_id: index_offset for index_offset, _, index in indexes
+            },
+            message_index_length=sum(index_length for _, index_length, _ in indexes),
+            compression=chunk.compression,
+            compressed_size=len(chunk.data),
+            uncompressed_size=chunk.uncompressed_size,
+        )
+        counts = {index.channel_id: len(index.records) for _, _, index in indexes}
+        if not counts or any(channel_id not in self.channels for channel_id in counts):
+            # Either the indexes are missing or the chunk defines channels we
+            # have not seen yet: look inside it
+            for record in breakup_chunk(chunk):
+                if isinstance(record, Schema):
+                    self.schemas[record.id] = record
+                elif isinstance(record, Channel):
+                    self.channels[record.id] = record
+        self.chunks.append(_ChunkEntry(chunk_index, counts or None))
+
+
+def _scan(stream: BinaryIO) -> _Scan:
+    scan = _Scan()
+    pending: Optional[tuple[int, int, Chunk]] = None
+    pending_indexes: List[tuple[int, int, MessageIndex]] = []
+
+    def finish_pending(indexes_complete: bool) -> None:
+        nonlocal pending, pending_indexes
+        if pending is not None:
+            offset, length, chunk = pending
+            scan.add_chunk(
+                offset, length, chunk, pending_indexes if indexes_complete else []
+            )
+        pending = None
+        pending_indexes = []
+
+    for offset, opcode, body in _read_records(stream):
+        if opcode == Opcode.MESSAGE_INDEX and pending is not None:
+            pending_indexes.append(
+                (
+                    offset,
+                    RECORD_PREFIX_SIZE + len(body),
+                    MessageIndex.read(_body_stream(body)),
+                )
+            )
+            continue
+        finish_pending(indexes_complete=True)
+
+        if opcode == Opcode.HEADER:
+            scan.header = Header.read(_body_stream(body))
+        elif opcode == Opcode.SCHEMA:
+            schema = Schema.read(_body_stream(body))
+            scan.schemas[schema.id] = schema
+        elif opcode == Opcode.CHANNEL:
+            channel = Channel.read(_body_stream(body))
+            scan.channels[channel.id] = channel
+        elif opcode == Opcode.CHUNK:
+            pending = (
+                offset,
+                RECORD_PREFIX_SIZE + len(body),
+                Chunk.read(_body_stream(body)),
+            )
+        elif opcode == Opcode.MESSAGE:
+            scan.messages.append(Message.read(_body_stream(body), len(body)))
+        elif opcode == Opcode.METADATA:
+            metadata = Metadata.read(_body_stream(body))
+            if metadata.name == CHECKPOINT_METADATA_NAME:
+                scan.checkpoints.append(
+                    (len(scan.chunks), Checkpoint.from_metadata(metadata.metadata))
+                )
+            scan.metadata.append((len(scan.chunks), metadata))
+        elif opcode == Opcode.ATTACHMENT:
+            scan.attachments.append(
+                (len(scan.chunks), Attachment.read(_body_stream(body)))
+            )
+        elif opcode == Opcode.DATA_END:
+            scan.complete = True
+            break
+
+    # At EOF a trailing chunk's message indexes may have been cut short
+    finish_pending(indexes_complete=scan.complete)
+    return scan
+
+
+def recover_mcap(
+    input_file: str, output_file: str, verbose: bool = False
+) -> RecoveryResult:
+    """Rebuild a readable MCAP file from a truncated one.
+
+    Complete chunks are copied verbatim. If the file is truncated and contains
+    checkpoints, everything after the last checkpoint is dropped so that
+    resuming the conversion from it neither loses nor duplicates messages.
+
+    Args:
+        input_file: Truncated MCAP file
+        output_file: Path for the recovered MCAP file
+        verbose: Enable verbose output
+
+    Returns:
+        What was recovered, including the checkpoint to resume from
+
+    Raises:
+        McapError: If the input does not start with the MCAP magic
+        ValueError: If output_file is the input file
+    """
+    if os.path.abspath(input_file) == os.path.abspath(output_file):
+        raise ValueError("Recovered output must not overwrite the input file")
+
+    with open(input_file, "rb") as source:
+        if source.read(len(MCAP0_MAGIC)) != MCAP0_MAGIC:
+            raise McapError(f"{input_file} is not an MCAP file")
+        scan = _scan(source)
+
+        result = RecoveryResult(truncated=not scan.complete)
+        keep_chunks = len(scan.chunks)
+        if scan.checkpoints and not scan.complete:
+            keep_chunks, result.checkpoint = scan.checkpoints[-1]
+        result.chunks_dropped = len(scan.chunks) - keep_chunks
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "wb") as output:
+            writer = ChunkCopyWriter(output)
+            writer.start(
+                profile=scan.header.profile if scan.header else "", library=LIBRARY
+            )
+            for schema in scan.schemas.values():
+                writer.add_schema(schema)
+            for channel in scan.channels.values():
+                writer.add_channel(channel)
+
+            metadata = iter(scan.metadata)
+            attachments = iter(scan.attachments)
+            next_metadata = next(metadata, None)
+            next_attachment = next(attachments, None)
+            for position, entry in enumerate(scan.chunks[:keep_chunks] + [None]):
+                # Keep metadata and attachments in their original place
+                while next_metadata is not None and next_metadata[0] <= position:
+                    if position <= keep_chunks:
+                        writer.add_metadata(
+                            next_metadata[1].name, next_metadata[1].metadata
+                        )
+                    next_metadata = next(metadata, None)
+                while next_attachment is not None and next_attachment[0] <= position:
+                    if position <= keep_chunks:
+                        writer.add_attachment(next_attachment[1])
+                    next_attachment = next(attachments, None)
+                if entry is None:
+                    break
+
+                if entry.channel_message_counts is not None:
+                    chunk_record, message_indexes = read_chunk_bytes(
+                        source, entry.chunk_index
+                    )
+                    writer.copy_chunk(
+                        chunk_record,
+                        message_indexes,
+                        entry.chunk_index,
+                        entry.channel_message_counts,
+                    )
+                else:
+                    # The message indexes were cut off: rebuild them
+                    for message in chunk_messages(
+                        read_chunk(source, entry.chunk_index)
+                    ):
+                        writer.add_message(message)
+                result.chunks_recovered += 1
+
+            if result.checkpoint is None:
+                for message in scan.messages:
+                    writer.add_message(message)
+            writer.finish()
+
+        statistics = writer.statistics
+        result.messages_recovered = statistics.message_count
+        if statistics.message_count:
+            result.last_log_time = statistics.message_end_time
+
+    if verbose:
+        console.print(
+            f"[green]Recovered {result.messages_recovered} messages in "
+            f"{result.chunks_recovered} chunks[/green]"
+        )
+        if result.chunks_dropped:
+            console.print(
+                f"[yellow]Dropped {result.chunks_dropped} chunks written after "
+                "the last checkpoint[/yellow]"
+            )
+        console.print(f"[green]Output written to: {output_file}[/green]")
+
+    return result
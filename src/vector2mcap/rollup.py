@@ -0,0 +1,264 @@
+"""Streaming rollup of metrics into fixed time windows.
+
+Each series is aggregated into windows aligned to multiples of the window
+length. A window is closed, and its rollups emitted, once the series'
+watermark (the latest timestamp seen in that series minus the allowed
+lateness) passes its end, so only the windows that can still receive samples
+are held in memory. Watermarks are kept per series so that inputs read one
+after another, such as one file per host covering the same hours, do not
+close each other's windows.
+
+Rollups are ordinary metrics tagged with ``vector2mcap.rollup`` naming the
+aggregate, with their timestamp at the window start and ``interval_ms`` set to
+the window:
+
+- gauges: ``last``, ``min``, ``max`` and ``mean``
+- absolute counters and histograms: ``last``
+- incremental counters and histograms: ``sum`` (the delta over the window,
+  histogram buckets merged by upper limit)
+- sets: ``union``
+
+The tag is namespaced to stay clear of input tags. Samples that already carry
+it are not rolled up, since their rollups would replace it.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from . import event_pb2
+from .series import SeriesKey, series_key
+
+
+ROLLUP_TAG = "vector2mcap.rollup"
+
+
+@dataclass
+class RollupStats:
+    """Counters describing a rollup run."""
+
+    samples: int = 0
+    late_samples: int = 0
+    tagged_samples: int = 0
+    windows_closed: int = 0
+    rollups: int = 0
+
+
+class _WindowState:
+    """Aggregates of one series within one window."""
+
+    __slots__ = (
+        "kind",
+        "value_type",
+        "count",
+        "last_time",
+        "last",
+        "min",
+        "max",
+        "sum",
+        "set_values",
+        "buckets",
+        "histogram_count",
+        "last_histogram",
+    )
+
+    def __init__(self, kind: int, value_type: str) -> None:
+        self.kind = kind
+        self.value_type = value_type
+        self.count = 0
+        self.last_time = 0
+        self.last = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self.sum = 0.0
+        self.set_values: Dict[str, None] = {}
+        self.buckets: Dict[float, int] = {}
+        self.histogram_count = 0
+        self.last_histogram: Optional[event_pb2.AggregatedHistogram3] = None
+
+    def add(self, metric: event_pb2.Metric, log_time: int) -> None:
+        is_last = self.count == 0 or log_time >= self.last_time
+        if is_last:
+            self.last_time = log_time
+
+        if self.value_type in ("counter", "gauge"):
+            value = getattr(metric, self.value_type).value
+            if self.count == 0:
+                self.min = self.max = value
+            else:
+                self.min = min(self.min, value)
+                self.max = max(self.max, value)
+            self.sum += value
+            if is_last:
+                self.last = value
+        elif self.value_type == "set":
+            self.set_values.update(dict.fromkeys(metric.set.values))
+        elif self.value_type == "aggregated_histogram3":
+            self._add_histogram(metric.aggregated_histogram3, is_last)
+        self.count += 1
+
+    def _add_histogram(
+        self, histogram: event_pb2.AggregatedHistogram3, is_last: bool
+    ) -> None:
+        if self.kind == event_pb2.Metric.Kind.Absolute:
+            if is_last:
+                self.last_histogram = histogram
+            return
+        for bucket in histogram.buckets:
+            self.buckets[bucket.upper_limit] = (
+                self.buckets.get(bucket.upper_limit, 0) + bucket.count
+            )
+        self.histogram_count += histogram.count
+        self.sum += histogram.sum
+
+    def merged_histogram(self) -> event_pb2.AggregatedHistogram3:
+        """The window's histogram: the last one if absolute, else the sum."""
+        histogram = event_pb2.AggregatedHistogram3()
+        if self.kind == event_pb2.Metric.Kind.Absolute:
+            histogram.CopyFrom(self.last_histogram)
+            return histogram
+        for upper_limit in sorted(self.buckets):
+            histogram.buckets.add(
+                upper_limit=upper_limit, count=self.buckets[upper_limit]
+            )
+        histogram.count = self.histogram_count
+        histogram.sum = self.sum
+        return histogram
+
+
+class _SeriesWindows:
+    """Open windows of one series and how far the series has progressed."""
+
+    __slots__ = ("watermark", "windows")
+
+    def __init__(self) -> None:
+        self.watermark: Optional[int] = None
+        self.windows: Dict[int, _WindowState] = {}
+
+
+class Rollup:
+    """Aggregate metrics per series into fixed windows.
+
+    Args:
+        window: Window length in nanoseconds
+        lateness: How far behind the latest timestamp seen in its series a
+            sample may be and still be counted in its window, in nanoseconds.
+            Later samples are dropped and counted in ``stats.late_samples``.
+
+    Samples that already carry ``ROLLUP_TAG`` are dropped and counted in
+    ``stats.tagged_samples``.
+    """
+
+    def __init__(self, window: int, lateness: int = 0) -> None:
+        if window <= 0:
+            raise ValueError("Rollup window must be positive")
+        self.window = window
+        self.lateness = lateness
+        self.stats = RollupStats()
+        # (series key, value type, kind) to that series' open windows
+        self._series: Dict[tuple, _SeriesWindows] = {}
+
+    def add(self, metric: event_pb2.Metric) -> List[event_pb2.Metric]:
+        """Add a sample.
+
+        Returns:
+            Rollups of any windows the sample's timestamp closed
+        """
+        log_time = metric.timestamp.ToNanoseconds()
+        self.stats.samples += 1
+        if ROLLUP_TAG in metric.tags_v1:
+            self.stats.tagged_samples += 1
+            return []
+        value_type = metric.WhichOneof("value") or ""
+        key = (series_key(metric), value_type, metric.kind)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _SeriesWindows()
+
+        window_start = log_time - log_time % self.window
+        if (
+            series.watermark is not None
+            and window_start + self.window <= series.watermark
+        ):
+            self.stats.late_samples += 1
+            return []
+
+        state = series.windows.get(window_start)
+        if state is None:
+            state = series.windows[window_start] = _WindowState(metric.kind, value_type)
+        state.add(metric, log_time)
+
+        watermark = log_time - self.lateness
+        if series.watermark is None or watermark > series.watermark:
+            series.watermark = watermark
+        return self._close(key[0], series, series.watermark)
+
+    def flush(self) -> List[event_pb2.Metric]:
+        """Close every open window.
+
+        Returns:
+            Rollups of the closed windows
+        """
+        rollups: List[event_pb2.Metric] = []
+        for (key, _, _), series in self._series.items():
+            rollups.extend(self._close(key, series, None))
+        return rollups
+
+    def _close(
+        self, key: SeriesKey, series: _SeriesWindows, watermark: Optional[int]
+    ) -> List[event_pb2.Metric]:
+        """Emit the windows of a series that end at or before the watermark."""
+        rollups: List[event_pb2.Metric] = []
+        # A series has only the windows within the lateness open, so this is
+        # a handful of entries at most
+        for window_start in sorted(series.windows):
+            if watermark is not None and window_start + self.window > watermark:
+                break
+            state = series.windows.pop(window_start)
+            rollups.extend(self._emit(key, state, window_start))
+            self.stats.windows_closed += 1
+        self.stats.rollups += len(rollups)
+        return rollups
+
+    def _emit(
+        self, key: SeriesKey, state: _WindowState, window_start: int
+    ) -> List[event_pb2.Metric]:
+        name, namespace, tags = key
+
+        def rollup(aggregate: str) -> event_pb2.Metric:
+            metric = event_pb2.Metric(
+                name=name,
+                namespace=namespace,
+                kind=state.kind,
+                interval_ms=self.window // 1_000_000,
+            )
+            metric.tags_v1.update(tags)
+            metric.tags_v1[ROLLUP_TAG] = aggregate
+            metric.timestamp.FromNanoseconds(window_start)
+            return metric
+
+        incremental = state.kind == event_pb2.Metric.Kind.Incremental
+        if state.value_type == "gauge":
+            rollups = []
+            for aggregate, value in (
+                ("last", state.last),
+                ("min", state.min),
+                ("max", state.max),
+                ("mean", state.sum / state.count),
+            ):
+                metric = rollup(aggregate)
+                metric.gauge.value = value
+                rollups.append(metric)
+            return rollups
+        if state.value_type == "counter":
+            metric = rollup("sum" if incremental else "last")
+            metric.counter.value = state.sum if incremental else state.last
+            return [metric]
+        if state.value_type == "aggregated_histogram3":
+            metric = rollup("sum" if incremental else "last")
+            metric.aggregated_histogram3.CopyFrom(state.merged_histogram())
+            return [metric]
+        if state.value_type == "set":
+            metric = rollup("union")
+            metric.set.values.extend(state.set_values)
+            return [metric]
+        return []
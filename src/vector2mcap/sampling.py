@@ -0,0 +1,143 @@
+"""Sampling for quick previews of large captures.
+
+Two per-series samplers thin out the events of every series:
+
+- ``EveryNthSampler`` keeps the first sample of each series and every Nth
+  after it, streaming them straight through.
+- ``ReservoirSampler`` keeps a uniform random sample of up to K events per
+  series and writes them all, in time order, at the end.
+
+Independently, ``RangeSampling`` picks byte ranges spread evenly across each
+input file, so that only those parts of a large file are read at all.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from . import event_pb2
+from .series import SeriesKey, series_key
+
+
+DEFAULT_RANGE_SIZE = 1024 * 1024
+
+
+@dataclass
+class SamplingStats:
+    """Counters describing a sampling run."""
+
+    seen: int = 0
+    kept: int = 0
+
+
+class EveryNthSampler:
+    """Keep the first event of each series and every Nth one after it.
+
+    Args:
+        n: Keep one event in every n
+    """
+
+    def __init__(self, n: int) -> None:
+        if n < 1:
+            raise ValueError("Sampling interval must be at least 1")
+        self.n = n
+        self.stats = SamplingStats()
+        self._counts: Dict[SeriesKey, int] = {}
+
+    def add(self, event: event_pb2.EventWrapper) -> List[event_pb2.EventWrapper]:
+        """Return the event if it is kept, otherwise nothing."""
+        self.stats.seen += 1
+        key = series_key(event.metric)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.n:
+            return []
+        self.stats.kept += 1
+        return [event]
+
+    def flush(self) -> List[event_pb2.EventWrapper]:
+        """Nothing is held back."""
+        return []
+
+
+class ReservoirSampler:
+    """Keep a uniform random sample of up to ``size`` events per series.
+
+    Uses reservoir sampling (Algorithm R), so every event of a series is
+    equally likely to be kept however many there are. Samples are held in
+    memory until ``flush``.
+
+    Args:
+        size: Events kept per series
+        seed: Seed for the random choices, random by default
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None) -> None:
+        if size < 1:
+            raise ValueError("Reservoir size must be at least 1")
+        self.size = size
+        self.stats = SamplingStats()
+        self._random = random.Random(seed)
+        self._reservoirs: Dict[SeriesKey, Tuple[int, List[event_pb2.EventWrapper]]] = {}
+
+    def add(self, event: event_pb2.EventWrapper) -> List[event_pb2.EventWrapper]:
+        """Consider an event for its series' reservoir; nothing is emitted yet."""
+        self.stats.seen += 1
+        key = series_key(event.metric)
+        seen, reservoir = self._reservoirs.get(key, (0, []))
+        if seen < self.size:
+            reservoir.append(event)
+        else:
+            slot = self._random.randrange(seen + 1)
+            if slot < self.size:
+                reservoir[slot] = event
+        self._reservoirs[key] = (seen + 1, reservoir)
+        return []
+
+    def flush(self) -> List[event_pb2.EventWrapper]:
+        """Return every kept event, in timestamp order."""
+        events = [
+            event for _, reservoir in self._reservoirs.values() for event in reservoir
+        ]
+        self._reservoirs.clear()
+        events.sort(key=lambda event: event.metric.timestamp.ToNanoseconds())
+        self.stats.kept += len(events)
+        return events
+
+
+Sampler = Union[EveryNthSampler, ReservoirSampler]
+
+
+@dataclass
+class RangeSampling:
+    """Read only evenly spaced byte ranges of each input file.
+
+    Lines are read from the first line start in each range up to the first
+    line ending past it, so every line read is whole.
+
+    Attributes:
+        count: Number of ranges per file
+        range_size: Bytes per range
+    """
+
+    count: int
+    range_size: int = DEFAULT_RANGE_SIZE
+
+    def __post_init__(self) -> None:
+        if self.count < 1 or self.range_size < 1:
+            raise ValueError("Range count and size must be at least 1")
+
+    def ranges(self, file_size: int) -> List[Tuple[int, int]]:
+        """Choose the byte ranges to read in a file of the given size.
+
+        Returns:
+            Sorted, non-overlapping (start, end) ranges. The whole file is
+            one range if the ranges would cover it anyway.
+        """
+        if self.count * self.range_size >= file_size:
+            return [(0, file_size)]
+        stride = file_size / self.count
+        return [
+            (int(index * stride), int(index * stride) + self.range_size)
+            for index in range(self.count)
+        ]
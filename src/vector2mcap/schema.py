@@ -0,0 +1,172 @@
+"""Minimal protobuf schemas for the messages written to MCAP files.
+
+An MCAP protobuf schema is a serialized ``FileDescriptorSet`` that readers
+such as Foxglove parse before decoding a channel. The full Vector
+``event.proto`` describes logs, traces and every metric value type, most of
+which this tool never writes. The schema stored for a message is therefore
+trimmed to the fields that are actually emitted and the types they still
+reach; messages encoded with the full definition decode unchanged, since
+only unused fields are left out.
+
+The serialized schema is built once per message type and shared by every
+writer in the process.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Set
+
+from google.protobuf import descriptor_pb2
+
+from . import event_pb2
+
+
+# Fields kept in messages that are trimmed, by full message name. Messages
+# not listed keep all their fields.
+EMITTED_FIELDS: Dict[str, FrozenSet[str]] = {
+    event_pb2.EventWrapper.DESCRIPTOR.full_name: frozenset({"metric"}),
+    event_pb2.Metric.DESCRIPTOR.full_name: frozenset(
+        {
+            "name",
+            "timestamp",
+            "tags_v1",
+            "kind",
+            "counter",
+            "gauge",
+            "set",
+            "aggregated_histogram3",
+            "namespace",
+            "interval_ms",
+        }
+    ),
+}
+
+
+def _trim_fields(message: descriptor_pb2.DescriptorProto, keep: FrozenSet[str]) -> None:
+    """Drop fields not in ``keep``, and any oneof left without fields."""
+    fields = [field for field in message.field if field.name in keep]
+    used_oneofs = sorted(
+        {field.oneof_index for field in fields if field.HasField("oneof_index")}
+    )
+    oneofs = [message.oneof_decl[index] for index in used_oneofs]
+    renumbered = {old: new for new, old in enumerate(used_oneofs)}
+    for field in fields:
+        if field.HasField("oneof_index"):
+            field.oneof_index = renumbered[field.oneof_index]
+
+    del message.field[:]
+    message.field.extend(fields)
+    del message.oneof_decl[:]
+    message.oneof_decl.extend(oneofs)
+
+
+def _collect_types(
+    prefix: str,
+    messages: Any,
+    enums: Any,
+    found: Dict[str, Any],
+) -> None:
+    """Index message and enum descriptors, nested ones included, by type name."""
+    for enum in enums:
+        found[f"{prefix}.{enum.name}"] = enum
+    for message in messages:
+        name = f"{prefix}.{message.name}"
+        found[name] = message
+        _collect_types(name, message.nested_type, message.enum_type, found)
+
+
+def _prune_types(prefix: str, container: Any, reachable: Set[str]) -> None:
+    """Remove message and enum types that are not reachable."""
+    if isinstance(container, descriptor_pb2.FileDescriptorProto):
+        messages = container.message_type
+    else:
+        messages = container.nested_type
+    kept = [m for m in messages if f"{prefix}.{m.name}" in reachable]
+    del messages[:]
+    messages.extend(kept)
+    enums = [e for e in container.enum_type if f"{prefix}.{e.name}" in reachable]
+    del container.enum_type[:]
+    container.enum_type.extend(enums)
+    for message in messages:
+        _prune_types(f"{prefix}.{message.name}", message, reachable)
+
+
+def trimmed_file_descriptor_set(message_class: Any) -> descriptor_pb2.FileDescriptorSet:
+    """Build a ``FileDescriptorSet`` holding only what a message type uses.
+
+    Fields listed in ``EMITTED_FIELDS`` are kept in their messages, and types
+    no longer referenced from ``message_class`` are removed, as are imported
+    files that are no longer needed.
+
+    Args:
+        message_class: Generated protobuf message class to describe
+
+    Returns:
+        The descriptor set, with dependencies before the files using them
+    """
+    descriptor = message_class.DESCRIPTOR
+    file_proto = descriptor_pb2.FileDescriptorProto()
+    descriptor.file.CopyToProto(file_proto)
+
+    package = f".{file_proto.package}" if file_proto.package else ""
+    types: Dict[str, Any] = {}
+    _collect_types(package, file_proto.message_type, file_proto.enum_type, types)
+    for name, message in types.items():
+        keep = EMITTED_FIELDS.get(name.lstrip("."))
+        if keep is not None:
+            _trim_fields(message, keep)
+
+    # Walk the references from the root message
+    reachable: Set[str] = set()
+    external: Set[str] = set()
+    pending = [f".{descriptor.full_name}"]
+    while pending:
+        name = pending.pop()
+        if name in reachable:
+            continue
+        reachable.add(name)
+        type_proto = types[name]
+        if isinstance(type_proto, descriptor_pb2.EnumDescriptorProto):
+            continue
+        # Map fields refer to their generated entry types, so those are kept
+        for field in type_proto.field:
+            if not field.type_name:
+                continue
+            if field.type_name in types:
+                pending.append(field.type_name)
+            else:
+                external.add(field.type_name)
+
+    _prune_types(package, file_proto, reachable)
+
+    # Keep only the imported files that define externally referenced types
+    needed_files: List[Any] = []
+    for dependency in descriptor.file.dependencies:
+        dependency_package = f".{dependency.package}." if dependency.package else "."
+        if any(name.startswith(dependency_package) for name in external):
+            needed_files.append(dependency)
+    del file_proto.dependency[:]
+    file_proto.dependency.extend(dependency.name for dependency in needed_files)
+    del file_proto.public_dependency[:]
+    del file_proto.weak_dependency[:]
+
+    descriptor_set = descriptor_pb2.FileDescriptorSet()
+    seen: Set[str] = set()
+
+    def add_file(file_descriptor: Any) -> None:
+        if file_descriptor.name in seen:
+            return
+        seen.add(file_descriptor.name)
+        for dependency in file_descriptor.dependencies:
+            add_file(dependency)
+        file_descriptor.CopyToProto(descriptor_set.file.add())
+
+    for dependency in needed_files:
+        add_file(dependency)
+    descriptor_set.file.append(file_proto)
+    return descriptor_set
+
+
+@lru_cache(maxsize=None)
+def schema_data(message_class: Any) -> bytes:
+    """Serialized trimmed schema of a message type, built once and cached."""
+    return trimmed_file_descriptor_set(message_class).SerializeToString()
@@ -0,0 +1,309 @@
+"""Per-series state and the series index written alongside converted events.
+
+A series is a metric name, namespace and tag set. ``SeriesTable`` assigns each
+series a dense integer id and keeps its running statistics in flat arrays, so
+that the per-message cost stays constant and memory stays small even with
+hundreds of thousands of series.
+"""
+
+import hashlib
+import json
+import math
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from mcap.reader import make_reader
+
+from . import event_pb2
+
+
+SERIES_INDEX_NAME = "vector2mcap.series_index.ndjson"
+
+SERIES_INDEX_MEDIA_TYPE = "application/x-ndjson"
+
+SERIES_SUMMARY_METADATA_NAME = "vector2mcap.series_summary"
+
+# (name, namespace, sorted tag items)
+SeriesKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+def series_key(metric: event_pb2.Metric) -> SeriesKey:
+    """Identify the series a metric belongs to."""
+    return (metric.name, metric.namespace, tuple(sorted(metric.tags_v1.items())))
+
+
+def stable_series_id(key: SeriesKey) -> int:
+    """Hash a series key to a 64-bit id that is the same in every file."""
+    name, namespace, tags = key
+    digest = hashlib.blake2b(
+        json.dumps([name, namespace, tags], separators=(",", ":")).encode(),
+        digest_size=8,
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def metric_value(metric: event_pb2.Metric) -> Optional[float]:
+    """Return the scalar value of a counter or gauge, or None for other types."""
+    value_type = metric.WhichOneof("value")
+    if value_type == "counter":
+        return metric.counter.value
+    if value_type == "gauge":
+        return metric.gauge.value
+    return None
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class SeriesTable:
+    """Dense ids and running statistics for every series seen.
+
+    Statistics are stored column-wise in typed arrays indexed by series id.
+    Min, max and last value are NaN for series without a scalar value.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[SeriesKey, int] = {}
+        self.keys: List[SeriesKey] = []
+        self.value_types: List[str] = []
+        self.stable_ids = array("Q")
+        self.counts = array("q")
+        self.first_times = array("q")
+        self.last_times = array("q")
+        self.min_values = array("d")
+        self.max_values = array("d")
+        self.last_values = array("d")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def series_id(self, metric: event_pb2.Metric) -> int:
+        """Return the id of a metric's series, adding the series if it is new."""
+        return self.key_id(series_key(metric), metric.WhichOneof("value") or "")
+
+    def key_id(self, key: SeriesKey, value_type: str) -> int:
+        """Return the id of a series by key, adding the series if it is new.
+
+        Args:
+            key: The series key
+            value_type: Value type recorded if the series is new
+        """
+        series_id = self._ids.get(key)
+        if series_id is None:
+            series_id = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.value_types.append(value_type)
+            self.stable_ids.append(stable_series_id(key))
+            self.counts.append(0)
+            self.first_times.append(0)
+            self.last_times.append(0)
+            self.min_values.append(math.nan)
+            self.max_values.append(math.nan)
+            self.last_values.append(math.nan)
+        return series_id
+
+    def observe(
+        self,
+        metric: event_pb2.Metric,
+        log_time: int,
+        series_id: Optional[int] = None,
+    ) -> int:
+        """Update the statistics of a metric's series.
+
+        Args:
+            metric: The metric
+            log_time: The metric's timestamp in nanoseconds
+            series_id: The metric's series id, if already looked up
+
+        Returns:
+            The series id
+        """
+        if series_id is None:
+            series_id = self.series_id(metric)
+        self.record(series_id, log_time, metric_value(metric))
+        return series_id
+
+    def record(self, series_id: int, log_time: int, value: Optional[float]) -> None:
+        """Update the statistics of a series with one sample.
+
+        Args:
+            series_id: The series id
+            log_time: The sample's timestamp in nanoseconds
+            value: The sample's scalar value, or None if it has none
+        """
+        if self.counts[series_id] == 0:
+            self.first_times[series_id] = log_time
+            self.last_times[series_id] = log_time
+        else:
+            self.first_times[series_id] = min(self.first_times[series_id], log_time)
+            self.last_times[series_id] = max(self.last_times[series_id], log_time)
+        self.counts[series_id] += 1
+
+        if value is not None:
+            # Comparisons with the initial NaN are false, so the first value
+            # always replaces it
+            if not value >= self.min_values[series_id]:
+                self.min_values[series_id] = value
+            if not value <= self.max_values[series_id]:
+                self.max_values[series_id] = value
+            self.last_values[series_id] = value
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Yield one JSON-serializable row per series, in id order."""
+        for series_id, (name, namespace, tags) in enumerate(self.keys):
+            yield {
+                "name": name,
+                "namespace": namespace,
+                "tags": dict(tags),
+                "type": self.value_types[series_id],
+                "count": self.counts[series_id],
+                "first_time": self.first_times[series_id],
+                "last_time": self.last_times[series_id],
+                "min": _finite_or_none(self.min_values[series_id]),
+                "max": _finite_or_none(self.max_values[series_id]),
+                "last": _finite_or_none(self.last_values[series_id]),
+            }
+
+    def index_data(self) -> bytes:
+        """Serialize the series index as newline-delimited JSON."""
+        return b"".join(
+            json.dumps(row, separators=(",", ":")).encode() + b"\n"
+            for row in self.rows()
+        )
+
+    def summary_metadata(self) -> Dict[str, str]:
+        """Totals across all series, as an MCAP metadata map."""
+        message_count = sum(self.counts)
+        return {
+            "series_count": str(len(self)),
+            "message_count": str(message_count),
+            "start_time": str(min(self.first_times) if message_count else 0),
+            "end_time": str(max(self.last_times) if message_count else 0),
+        }
+
+
+class Deduplicator:
+    """Detect absolute samples that repeat the last written value of a series.
+
+    Vector re-emits absolute counters and gauges every scrape interval even
+    when they have not changed. The last written value and time of each
+    series are kept in typed arrays indexed by ``SeriesTable`` id.
+
+    Args:
+        heartbeat: Write an unchanged sample anyway once this many nanoseconds
+            have passed since its series was last written, or never if None
+    """
+
+    def __init__(self, heartbeat: Optional[int] = None) -> None:
+        self.heartbeat = heartbeat
+        self.written_times = array("q")
+        self.written_values = array("d")
+        self.suppressed = 0
+        # Last written (time, value) of series from a previous writer
+        self._carried: Dict[SeriesKey, Tuple[int, float]] = {}
+
+    def should_write(
+        self, series_id: int, metric: event_pb2.Metric, log_time: int
+    ) -> bool:
+        """Decide whether to write a sample, recording it if so.
+
+        Args:
+            series_id: The sample's ``SeriesTable`` id
+            metric: The sample
+            log_time: The sample's timestamp in nanoseconds
+
+        Returns:
+            False if the sample only repeats the previous value
+        """
+        missing = series_id + 1 - len(self.written_times)
+        if missing > 0:
+            # NaN never compares equal, so a series' first sample is written
+            # unless a previous writer already wrote its value
+            self.written_times.extend([0] * missing)
+            self.written_values.extend([math.nan] * missing)
+            if self._carried:
+                carried = self._carried.pop(series_key(metric), None)
+                if carried is not None:
+                    self.written_times[series_id] = carried[0]
+                    self.written_values[series_id] = carried[1]
+
+        value = metric_value(metric)
+        if (
+            value is not None
+            and metric.kind == event_pb2.Metric.Kind.Absolute
+            and value == self.written_values[series_id]
+            and (
+                self.heartbeat is None
+                or log_time - self.written_times[series_id] < self.heartbeat
+            )
+        ):
+            self.suppressed += 1
+            return False
+
+        self.written_values[series_id] = math.nan if value is None else value
+        self.written_times[series_id] = log_time
+        return True
+
+    def resume(self, keys: Sequence[SeriesKey]) -> "Deduplicator":
+        """Continue deduplicating in a writer with a new ``SeriesTable``.
+
+        Args:
+            keys: Series keys of the table this deduplicator was used with,
+                indexed by series id
+
+        Returns:
+            A deduplicator that looks up each series' last written sample by
+            key the first time the new table assigns it an id
+        """
+        resumed = Deduplicator(self.heartbeat)
+        resumed._carried = dict(self._carried)
+        for series_id, key in enumerate(keys[: len(self.written_times)]):
+            resumed._carried[key] = (
+                self.written_times[series_id],
+                self.written_values[series_id],
+            )
+        return resumed
+
+
+def _merge_rows(existing: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Fold a row for the same series from another file into an existing one."""
+    if row["last_time"] >= existing["last_time"]:
+        existing["last"] = row["last"]
+    existing["count"] += row["count"]
+    existing["first_time"] = min(existing["first_time"], row["first_time"])
+    existing["last_time"] = max(existing["last_time"], row["last_time"])
+    for field, pick in (("min", min), ("max", max)):
+        values = [v for v in (existing[field], row[field]) if v is not None]
+        existing[field] = pick(values) if values else None
+
+
+def read_series_index(mcap_file: str) -> List[Dict[str, Any]]:
+    """Read the series index of an MCAP file without decoding any message.
+
+    Files produced by merging carry one index per input; rows for the same
+    series are combined.
+
+    Args:
+        mcap_file: MCAP file written by vector2mcap
+
+    Returns:
+        One row per series, as written by ``SeriesTable.rows``
+    """
+    rows: Dict[tuple, Dict[str, Any]] = {}
+    with open(mcap_file, "rb") as f:
+        for attachment in make_reader(f).iter_attachments():
+            if attachment.name != SERIES_INDEX_NAME:
+                continue
+            for line in attachment.data.splitlines():
+                row = json.loads(line)
+                key = (
+                    row["name"],
+                    row["namespace"],
+                    tuple(sorted(row["tags"].items())),
+                )
+                if key in rows:
+                    _merge_rows(rows[key], row)
+                else:
+                    rows[key] = row
+    return list(rows.values())
@@ -0,0 +1,464 @@
+"""Receive events from Vector's ``http`` sink and write rolling MCAP files.
+
+Request handler threads decompress and parse each POSTed batch with the same
+converter as file input, then hand it to a bounded queue. A single writer
+thread drains the queue into the current output file and starts a new file
+once the current one is old or large enough.
+
+Each request takes one of ``max_queued_batches`` slots before its body is
+read, and the writer gives the slot back when it takes the batch off the
+queue. When the writer falls behind, handlers wait for a slot, which slows
+down responses. If there is still none after the backpressure timeout, the
+batch is refused with ``429 Too Many Requests`` without reading its body, and
+Vector retries it later. Memory for received batches is therefore bounded by
+the number of slots, however many clients are connected.
+
+Files are written as ``<name>.mcap.partial`` and renamed to ``<name>.mcap``
+once finished, so every ``.mcap`` file in the output directory is complete.
+A batch is acknowledged once it is queued; batches still queued when the
+process is killed are lost, while a clean shutdown drains the queue first.
+SIGTERM, as sent by ``docker stop`` and systemd, shuts down cleanly like an
+interrupt.
+"""
+
+import gzip
+import json
+import queue
+import signal
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from rich.console import Console
+
+from . import event_pb2
+from .json_to_protobuf import json_to_event_wrapper
+from .mcap_writer import EventWriter
+from .series import SeriesKey
+
+
+console = Console()
+
+DEFAULT_PORT = 8080
+
+DEFAULT_ROLL_INTERVAL = 3600.0
+
+DEFAULT_ROLL_MESSAGES = 10_000_000
+
+DEFAULT_MAX_QUEUED_BATCHES = 64
+
+# Seconds a request waits for room in the queue before it is refused
+DEFAULT_BACKPRESSURE_TIMEOUT = 5.0
+
+DEFAULT_MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# Sent with 429 responses
+RETRY_AFTER_SECONDS = 1
+
+PARTIAL_SUFFIX = ".partial"
+
+
+@contextmanager
+def stop_on_sigterm(stop: Callable[[], None]) -> Iterator[None]:
+    """Call ``stop`` when SIGTERM arrives within the block.
+
+    Python only runs signal handlers in the main thread, so elsewhere this
+    does nothing. The previous handler is restored afterwards.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def parse_listen_address(value: str) -> Tuple[str, int]:
+    """Parse a ``host:port``, ``:port`` or ``port`` listen address.
+
+    Raises:
+        ValueError: If the port is not a number between 0 and 65535
+    """
+    host, _, port = value.rpartition(":")
+    try:
+        port_number = int(port)
+    except ValueError:
+        raise ValueError(f"Invalid listen address '{value}'") from None
+    if not 0 <= port_number <= 65535:
+        raise ValueError(f"Invalid port in listen address '{value}'")
+    return host, port_number
+
+
+def parse_batch(
+    body: bytes, content_encoding: str = ""
+) -> Tuple[List[event_pb2.EventWrapper], int]:
+    """Decode a batch POSTed by Vector's http sink.
+
+    Both newline-delimited JSON and a JSON array of events are accepted.
+
+    Args:
+        body: Request body
+        content_encoding: Value of the Content-Encoding header
+
+    Returns:
+        (events, rejected), where rejected counts lines that could not be
+        parsed or converted
+
+    Raises:
+        ValueError: If the content encoding is unsupported or the body cannot
+            be decompressed
+    """
+    encoding = content_encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Invalid gzip body: {e}") from None
+    elif encoding not in ("", "identity"):
+        raise ValueError(f"Unsupported content encoding '{content_encoding}'")
+
+    rejected = 0
+    if body.lstrip().startswith(b"["):
+        try:
+            objects = json.loads(body)
+        except ValueError:
+            return [], 1
+    else:
+        objects = []
+        for line in body.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                objects.append(json.loads(line))
+            except ValueError:
+                rejected += 1
+
+    events = []
+    for json_obj in objects:
+        event = json_to_event_wrapper(json_obj) if isinstance(json_obj, dict) else None
+        if event is None:
+            rejected += 1
+        else:
+            events.append(event)
+    return events, rejected
+
+
+@dataclass
+class ServeStats:
+    """Counters describing what the server has received and written."""
+
+    batches: int = 0
+    events: int = 0
+    rejected_events: int = 0
+    refused_batches: int = 0
+    written: int = 0
+    write_errors: int = 0
+
+
+class RollingWriter:
+    """Write events to a sequence of MCAP files, starting a new one on demand."""
+
+    def __init__(self, output_dir: Path, compact: bool, verbose: bool):
+        self.output_dir = output_dir
+        self.outputs: List[Path] = []
+        self._compact = compact
+        self._verbose = verbose
+        self._stream: Optional[BinaryIO] = None
+        self._writer: Optional[EventWriter] = None
+        self._path: Optional[Path] = None
+        self.opened_at = 0.0
+        self.message_count = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def write(self, event: event_pb2.EventWrapper) -> None:
+        if self._writer is None:
+            self._open()
+        self._writer.write_event(event, event.metric.timestamp.ToNanoseconds())
+        self.message_count += 1
+
+    def write_serialized(
+        self,
+        data: bytes,
+        log_time: int,
+        key: SeriesKey,
+        value_type: str,
+        value: Optional[float],
+    ) -> None:
+        """Write a serialized event, see ``EventWriter.write_serialized_event``."""
+        if self._writer is None:
+            self._open()
+        self._writer.write_serialized_event(data, log_time, key, value_type, value)
+        self.message_count += 1
+
+    def _open(self) -> None:
+        now = datetime.now(timezone.utc)
+        name = f"vector-{now:%Y%m%dT%H%M%S}Z-{len(self.outputs):04d}.mcap"
+        self._path = self.output_dir / name
+        self._stream = open(self._path.with_name(name + PARTIAL_SUFFIX), "wb")
+        self._writer = EventWriter(self._stream, compact=self._compact)
+        self.opened_at = time.monotonic()
+        self.message_count = 0
+
+    def close(self) -> None:
+        """Finish the current file, if any, and move it into place."""
+        if self._writer is None:
+            return
+        self._writer.finish()
+        self._stream.close()
+        partial = self._path.with_name(self._path.name + PARTIAL_SUFFIX)
+        partial.replace(self._path)
+        self.outputs.append(self._path)
+        if self._verbose:
+            console.print(
+                f"[green]Wrote {self.message_count} messages to {self._path}[/green]"
+            )
+        self._writer = None
+        self._stream = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+
+    def do_POST(self) -> None:
+        ingest = self.server.ingest
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            self._respond(HTTPStatus.LENGTH_REQUIRED)
+            return
+        if length > ingest.max_body_size:
+            self._respond(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+        if not ingest.reserve():
+            # The unread body would be taken for the next request
+            self.close_connection = True
+            self._respond(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                "Writer is behind, retry later",
+                {"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+            return
+
+        try:
+            body = self.rfile.read(length)
+            events, rejected = parse_batch(
+                body, self.headers.get("Content-Encoding", "")
+            )
+        except ValueError as e:
+            ingest.release()
+            self._respond(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except BaseException:
+            ingest.release()
+            raise
+
+        ingest.enqueue(events, rejected)
+        self._respond(HTTPStatus.OK)
+
+    def do_GET(self) -> None:
+        # Vector's health check
+        if self.path.rstrip("/") in ("", "/health"):
+            self._respond(HTTPStatus.OK)
+        else:
+            self._respond(HTTPStatus.NOT_FOUND)
+
+    def _respond(
+        self, status: HTTPStatus, message: str = "", headers: Optional[dict] = None
+    ) -> None:
+        body = (message or status.phrase).encode() + b"\n"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.ingest.verbose:
+            super().log_message(format, *args)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    ingest: "IngestServer"
+
+
+class IngestServer:
+    """HTTP server that writes POSTed Vector events to rolling MCAP files.
+
+    Args:
+        output_dir: Directory for the MCAP files
+        address: (host, port) to listen on; port 0 picks a free port
+        roll_interval: Seconds after which a new output file is started
+        roll_messages: Messages after which a new output file is started
+        max_queued_batches: Batches received but not yet taken by the writer
+            before requests are slowed down and then refused
+        backpressure_timeout: Seconds a request waits for room in the queue
+            before it is refused with 429
+        max_body_size: Largest request body accepted, in bytes
+        compact: Write the compact series-dictionary encoding
+        verbose: Log requests and finished files
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        address: Tuple[str, int] = ("", DEFAULT_PORT),
+        roll_interval: float = DEFAULT_ROLL_INTERVAL,
+        roll_messages: int = DEFAULT_ROLL_MESSAGES,
+        max_queued_batches: int = DEFAULT_MAX_QUEUED_BATCHES,
+        backpressure_timeout: float = DEFAULT_BACKPRESSURE_TIMEOUT,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        compact: bool = False,
+        verbose: bool = False,
+    ):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.roll_interval = roll_interval
+        self.roll_messages = roll_messages
+        self.backpressure_timeout = backpressure_timeout
+        self.max_body_size = max_body_size
+        self.verbose = verbose
+        self.stats = ServeStats()
+
+        self._queue: "queue.Queue[Optional[List[event_pb2.EventWrapper]]]" = (
+            queue.Queue(maxsize=max_queued_batches)
+        )
+        self._slots = threading.Semaphore(max_queued_batches)
+        self._stats_lock = threading.Lock()
+        self._output = RollingWriter(self.output_dir, compact, verbose)
+        self._writer_thread = threading.Thread(
+            target=self._write_loop, name="vector2mcap-writer", daemon=True
+        )
+        self._server_thread: Optional[threading.Thread] = None
+        self._httpd = _HTTPServer(address, _Handler)
+        self._httpd.ingest = self
+        self._stopping = threading.Event()
+        self._closed = False
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        """The (host, port) the server is listening on."""
+        return self._httpd.server_address[:2]
+
+    @property
+    def outputs(self) -> List[Path]:
+        """Finished output files."""
+        return list(self._output.outputs)
+
+    def reserve(self) -> bool:
+        """Wait for a queue slot for a batch, before its body is read.
+
+        Returns:
+            False if no slot became free within the backpressure timeout
+        """
+        if self._slots.acquire(timeout=self.backpressure_timeout):
+            return True
+        with self._stats_lock:
+            self.stats.refused_batches += 1
+        return False
+
+    def release(self) -> None:
+        """Give back a slot taken with ``reserve`` without queueing a batch."""
+        self._slots.release()
+
+    def enqueue(self, events: List[event_pb2.EventWrapper], rejected: int) -> None:
+        """Queue a parsed batch for writing, in a slot taken with ``reserve``."""
+        with self._stats_lock:
+            self.stats.batches += 1
+            self.stats.events += len(events)
+            self.stats.rejected_events += rejected
+        if events:
+            self._queue.put(events)
+        else:
+            self.release()
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                events = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._maybe_roll()
+                continue
+            if events is None:
+                break
+            self.release()
+            for event in events:
+                try:
+                    self._output.write(event)
+                    self.stats.written += 1
+                except Exception as e:
+                    console.print(f"[red]Error writing message: {e}[/red]")
+                    self.stats.write_errors += 1
+            self._maybe_roll()
+        self._output.close()
+
+    def _maybe_roll(self) -> None:
+        output = self._output
+        if output.is_open and (
+            output.message_count >= self.roll_messages
+            or time.monotonic() - output.opened_at >= self.roll_interval
+        ):
+            output.close()
+
+    def start(self) -> None:
+        """Start the writer and serve requests in background threads."""
+        self._writer_thread.start()
+        self._server_thread = threading.Thread(
+            target=self._httpd.serve_forever, name="vector2mcap-http", daemon=True
+        )
+        self._server_thread.start()
+
+    def serve_forever(self) -> None:
+        """Serve requests until interrupted or terminated, then shut down cleanly."""
+        self.start()
+        try:
+            with stop_on_sigterm(self.stop):
+                while self._server_thread.is_alive() and not self._stopping.wait(1.0):
+                    pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        """Make ``serve_forever`` return, from another thread or a signal handler."""
+        self._stopping.set()
+
+    def close(self) -> List[Path]:
+        """Stop accepting requests, write everything queued and finish the file.
+
+        Returns:
+            All finished output files
+        """
+        if self._closed:
+            return self.outputs
+        self._closed = True
+        if self._server_thread is not None:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._writer_thread.is_alive():
+            self._queue.put(None)
+            self._writer_thread.join()
+        return self.outputs
+
+    def __enter__(self) -> "IngestServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
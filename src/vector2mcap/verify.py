@@ -0,0 +1,521 @@
+"""Verify converted MCAP files without decoding every message.
+
+Verification works mostly from the summary section and the chunk indexes:
+
+* The summary section CRC is checked, and the statistics are checked against
+  the chunk indexes.
+* Every chunk is read in a worker process, where its CRC is validated and its
+  message counts and time range are compared with its chunk index, message
+  indexes and the statistics. Message payloads are not decoded.
+* Given the input files, the number of events and their time range are
+  compared with the statistics. Each line goes through the same filter and
+  converter as in a conversion, so lines the converter rejects (unsupported
+  metric types, missing fields, malformed JSON) are not expected in the
+  output. Inputs are split into ranges by ``discovery.plan_work`` and
+  converted in the same worker processes.
+* Optionally, a random fraction of input events is converted and looked up in
+  the output by log time, then compared field by field.
+
+Outputs written with ``--dedupe`` or ``--rollup-only`` hold fewer events than
+their inputs, so comparing them with their inputs reports missing events.
+"""
+
+import bisect
+import json
+import os
+import random
+import struct
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import BinaryIO, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from mcap.data_stream import ReadDataStream
+from mcap.opcode import Opcode
+from mcap.reader import SeekingReader
+from mcap.records import Chunk, ChunkIndex
+from mcap.stream_reader import MAGIC_SIZE
+from mcap.summary import Summary
+from rich.console import Console
+
+from . import event_pb2
+from .compact import SAMPLE_TOPIC, SERIES_TOPIC, CompactDecoder
+from .discovery import InputFile, WorkUnit, plan_work
+from .export import format_timestamp
+from .file_reader import iter_range_lines
+from .filters import EventFilter
+from .json_to_protobuf import json_to_event_wrapper
+from .mcap_chunks import (
+    RECORD_PREFIX_SIZE,
+    chunk_messages,
+    message_index_counts,
+    read_chunk_bytes,
+)
+from .mcap_writer import TOPIC
+from .parallel import make_executor, ordered_map
+
+
+console = Console()
+
+# Topics whose messages correspond one to one with input events
+EVENT_TOPICS = (TOPIC, SAMPLE_TOPIC)
+
+# Footer record: opcode, length, summary start, summary offset start, CRC
+_FOOTER_RECORD_SIZE = RECORD_PREFIX_SIZE + 8 + 8 + 4
+
+
+@dataclass
+class VerifyReport:
+    """Outcome of verifying an MCAP file.
+
+    Problems mean the file is damaged or does not match its inputs. Warnings
+    are checks that could not be made.
+    """
+
+    chunks_checked: int = 0
+    messages: int = 0
+    input_events: Optional[int] = None
+    samples_checked: int = 0
+    problems: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if no problems were found."""
+        return not self.problems
+
+
+@dataclass
+class _ChunkCheck:
+    """A chunk for a worker to check."""
+
+    mcap_file: str
+    chunk_index: ChunkIndex
+    event_channels: FrozenSet[int]
+    wanted_times: FrozenSet[int]
+
+
+@dataclass
+class _ChunkResult:
+    """What a worker found in a chunk."""
+
+    counts: Dict[int, int] = field(default_factory=dict)
+    time_ranges: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+    # (log_time, channel_id, data) of event messages at the wanted times
+    matches: List[Tuple[int, int, bytes]] = field(default_factory=list)
+    problems: List[str] = field(default_factory=list)
+
+
+def _check_chunk(task: _ChunkCheck) -> _ChunkResult:
+    """Validate one chunk against its indexes."""
+    result = _ChunkResult()
+    index = task.chunk_index
+    where = f"Chunk at byte {index.chunk_start_offset}"
+    try:
+        with open(task.mcap_file, "rb") as f:
+            chunk_record, message_indexes = read_chunk_bytes(f, index)
+        if len(chunk_record) != index.chunk_length or chunk_record[0] != Opcode.CHUNK:
+            result.problems.append(f"{where}: no chunk record at the indexed offset")
+            return result
+        chunk = Chunk.read(ReadDataStream(BytesIO(chunk_record[RECORD_PREFIX_SIZE:])))
+        messages = chunk_messages(chunk, validate_crc=True)
+    except Exception as e:
+        # CRC mismatches, bad compressed data and truncated records
+        result.problems.append(f"{where}: {e}")
+        return result
+
+    if len(chunk.data) != index.compressed_size:
+        result.problems.append(
+            f"{where}: {len(chunk.data)} compressed bytes, "
+            f"chunk index says {index.compressed_size}"
+        )
+
+    for message in messages:
+        channel_id = message.channel_id
+        result.counts[channel_id] = result.counts.get(channel_id, 0) + 1
+        start, end = result.time_ranges.get(
+            channel_id, (message.log_time, message.log_time)
+        )
+        result.time_ranges[channel_id] = (
+            min(start, message.log_time),
+            max(end, message.log_time),
+        )
+        if channel_id in task.event_channels and message.log_time in task.wanted_times:
+            result.matches.append((message.log_time, channel_id, message.data))
+
+    if messages:
+        start = min(start for start, _ in result.time_ranges.values())
+        end = max(end for _, end in result.time_ranges.values())
+        if (start, end) != (index.message_start_time, index.message_end_time):
+            result.problems.append(
+                f"{where}: messages span {start}-{end}, chunk index says "
+                f"{index.message_start_time}-{index.message_end_time}"
+            )
+
+    indexed = message_index_counts(message_indexes)
+    if indexed is not None and indexed != result.counts:
+        result.problems.append(
+            f"{where}: message indexes list {sum(indexed.values())} messages, "
+            f"chunk holds {len(messages)}"
+        )
+    return result
+
+
+def _check_summary_crc(f: BinaryIO, summary_start: int, summary_crc: int) -> bool:
+    """Check the footer's CRC over the summary section and footer fields."""
+    if summary_crc == 0:
+        # The writer did not record one
+        return True
+    f.seek(-MAGIC_SIZE - 4, 2)
+    end = f.tell()
+    f.seek(summary_start)
+    return zlib.crc32(f.read(end - summary_start)) == summary_crc
+
+
+def _check_statistics(summary: Summary, report: VerifyReport) -> None:
+    """Check the statistics against the channels and chunk indexes."""
+    statistics = summary.statistics
+    counted = sum(statistics.channel_message_counts.values())
+    if counted != statistics.message_count:
+        report.problems.append(
+            f"Statistics count {statistics.message_count} messages but "
+            f"{counted} across channels"
+        )
+    if statistics.chunk_count != len(summary.chunk_indexes):
+        report.problems.append(
+            f"Statistics count {statistics.chunk_count} chunks but the summary "
+            f"indexes {len(summary.chunk_indexes)}"
+        )
+    if summary.chunk_indexes:
+        start = min(index.message_start_time for index in summary.chunk_indexes)
+        end = max(index.message_end_time for index in summary.chunk_indexes)
+        if (start, end) != (statistics.message_start_time, statistics.message_end_time):
+            report.problems.append(
+                f"Statistics time range {statistics.message_start_time}-"
+                f"{statistics.message_end_time} differs from the chunk indexes "
+                f"{start}-{end}"
+            )
+
+
+@dataclass
+class _InputScan:
+    """Counts, time range and sampled events of the input files."""
+
+    events: int = 0
+    start_time: Optional[int] = None
+    end_time: Optional[int] = None
+    # Log time to (file, byte offset, event) of each sampled event
+    samples: Dict[int, List[Tuple[str, int, event_pb2.EventWrapper]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+    def observe(self, timestamp: int) -> None:
+        self.events += 1
+        if self.start_time is None or timestamp < self.start_time:
+            self.start_time = timestamp
+        if self.end_time is None or timestamp > self.end_time:
+            self.end_time = timestamp
+
+    def merge(self, other: "_InputScan") -> None:
+        """Add the counts and samples of another range."""
+        self.events += other.events
+        if other.start_time is not None and (
+            self.start_time is None or other.start_time < self.start_time
+        ):
+            self.start_time = other.start_time
+        if other.end_time is not None and (
+            self.end_time is None or other.end_time > self.end_time
+        ):
+            self.end_time = other.end_time
+        for timestamp, samples in other.samples.items():
+            self.samples[timestamp].extend(samples)
+
+
+@dataclass
+class _InputCheck:
+    """A range of an input file for a worker to count."""
+
+    unit: WorkUnit
+    event_filter: Optional[EventFilter]
+    sample_rate: float
+    seed: Optional[int]
+
+
+def _scan_input_range(task: _InputCheck) -> _InputScan:
+    """Count the events a range of an input should have produced.
+
+    A line is counted only if the converter would write it: it passes the
+    filter and ``json_to_event_wrapper`` accepts it.
+    """
+    unit, event_filter = task.unit, task.event_filter
+    # Each range draws its own samples, reproducibly when seeded
+    rng = random.Random(
+        None if task.seed is None else f"{task.seed}:{unit.path}:{unit.start}"
+    )
+    scan = _InputScan()
+    with open(unit.path, "rb") as f:
+        for offset, line in iter_range_lines(f, unit.start, unit.end):
+            line = line.strip()
+            if not line:
+                continue
+            if event_filter is not None and not event_filter.accept_line(line):
+                continue
+
+            json_obj = _parse_line(line)
+            if json_obj is None:
+                continue
+            if event_filter is not None and not event_filter.accept_event(json_obj):
+                continue
+            event = json_to_event_wrapper(json_obj)
+            if event is None:
+                continue
+
+            timestamp = event.metric.timestamp.ToNanoseconds()
+            scan.observe(timestamp)
+            if task.sample_rate > 0 and rng.random() < task.sample_rate:
+                scan.samples[timestamp].append((unit.path, offset, event))
+    return scan
+
+
+def _input_checks(
+    input_files: Sequence[str],
+    event_filter: Optional[EventFilter],
+    sample_rate: float,
+    seed: Optional[int],
+    workers: int,
+) -> List[_InputCheck]:
+    """Split the inputs into ranges to count in parallel, largest first."""
+    if event_filter is not None and event_filter.is_empty:
+        event_filter = None
+    files = [
+        InputFile(file_path, os.path.getsize(file_path), 0) for file_path in input_files
+    ]
+    return [
+        _InputCheck(unit, event_filter, sample_rate, seed)
+        for unit in plan_work(files, workers).units
+    ]
+
+
+def _parse_line(line: bytes) -> Optional[dict]:
+    try:
+        json_obj = json.loads(line)
+    except ValueError:
+        return None
+    return json_obj if isinstance(json_obj, dict) else None
+
+
+def _compare_with_inputs(
+    summary: Summary,
+    scan: _InputScan,
+    event_channels: Dict[int, str],
+    event_range: Optional[Tuple[int, int]],
+    report: VerifyReport,
+) -> None:
+    """Compare the output's event counts and time range with the inputs."""
+    report.input_events = scan.events
+    if not event_channels:
+        report.warnings.append(
+            "Output has no vector_event or vector_sample messages to compare "
+            "with the inputs"
+        )
+        return
+    written = sum(
+        summary.statistics.channel_message_counts.get(channel_id, 0)
+        for channel_id in event_channels
+    )
+    if written != scan.events:
+        report.problems.append(
+            f"Inputs hold {scan.events} events, output holds {written}"
+        )
+    input_range = None if scan.start_time is None else (scan.start_time, scan.end_time)
+    if event_range != input_range:
+        report.problems.append(
+            f"Inputs span {_describe_range(input_range)}, "
+            f"output spans {_describe_range(event_range)}"
+        )
+
+
+def _describe_range(time_range: Optional[Tuple[int, int]]) -> str:
+    if time_range is None:
+        return "nothing"
+    return f"{format_timestamp(time_range[0])} to {format_timestamp(time_range[1])}"
+
+
+def _compare_samples(
+    scan: _InputScan,
+    found: Dict[int, List[Tuple[str, bytes]]],
+    decoder: CompactDecoder,
+    report: VerifyReport,
+) -> None:
+    """Check that every sampled input event is in the output unchanged."""
+    for log_time, samples in scan.samples.items():
+        candidates = []
+        for topic, data in found.get(log_time, []):
+            if topic == SAMPLE_TOPIC:
+                try:
+                    candidates.append((topic, decoder.decode(data, log_time)))
+                except KeyError:
+                    report.problems.append(
+                        f"Sample at {format_timestamp(log_time)} has no series "
+                        "definition"
+                    )
+            else:
+                event = event_pb2.EventWrapper()
+                event.ParseFromString(data)
+                candidates.append((topic, event.metric))
+
+        for file_path, offset, event in samples:
+            report.samples_checked += 1
+            if not any(metric == event.metric for _, metric in candidates):
+                report.problems.append(
+                    f"Event '{event.metric.name}' from {file_path} at byte "
+                    f"{offset} is missing from the output or differs"
+                )
+
+
+def verify_mcap(
+    mcap_file: str,
+    input_files: Sequence[str] = (),
+    event_filter: Optional[EventFilter] = None,
+    sample_rate: float = 0.0,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    verbose: bool = False,
+) -> VerifyReport:
+    """Verify an MCAP file, optionally against the inputs it was converted from.
+
+    Args:
+        mcap_file: MCAP file written by vector2mcap
+        input_files: JSONL files the MCAP file was converted from, in any order
+        event_filter: Filter the conversion was run with
+        sample_rate: Fraction of input events to look up in the output and
+            compare in full; requires input files
+        workers: Number of processes checking input ranges and chunks, by
+            default one per CPU
+        seed: Seed for choosing sampled events, random by default
+        verbose: Enable verbose output
+
+    Returns:
+        The problems found, if any
+
+    Raises:
+        ValueError: If sample_rate is outside [0, 1] or given without inputs
+    """
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("Sample rate must be between 0 and 1")
+    if sample_rate and not input_files:
+        raise ValueError("Sampling events requires the input files")
+
+    report = VerifyReport()
+    with open(mcap_file, "rb") as f:
+        reader = SeekingReader(f)
+        try:
+            summary = reader.get_summary()
+        except Exception as e:
+            report.problems.append(f"Cannot read the summary section: {e}")
+            return report
+        if summary is None:
+            report.problems.append(
+                "No summary section; run 'vector2mcap recover' on the file"
+            )
+            return report
+
+        f.seek(-(_FOOTER_RECORD_SIZE + MAGIC_SIZE), 2)
+        _, _, summary_start, _, summary_crc = struct.unpack(
+            "<BQQQI", f.read(_FOOTER_RECORD_SIZE)
+        )
+        if not _check_summary_crc(f, summary_start, summary_crc):
+            report.problems.append("Summary section CRC does not match")
+
+        decoder = CompactDecoder()
+        event_channels = {
+            channel.id: channel.topic
+            for channel in summary.channels.values()
+            if channel.topic in EVENT_TOPICS
+        }
+        if input_files and sample_rate and SAMPLE_TOPIC in event_channels.values():
+            for _, _, message in reader.iter_messages(topics=[SERIES_TOPIC]):
+                decoder.add_definition(message.data)
+
+    report.messages = summary.statistics.message_count
+    _check_statistics(summary, report)
+
+    input_checks = []
+    if input_files:
+        input_checks = _input_checks(
+            input_files,
+            event_filter,
+            sample_rate,
+            seed,
+            workers or os.cpu_count() or 1,
+        )
+
+    counts: Dict[int, int] = defaultdict(int)
+    event_range: Optional[Tuple[int, int]] = None
+    found: Dict[int, List[Tuple[str, bytes]]] = defaultdict(list)
+    scan = None
+    executor, workers = make_executor(
+        workers, max(len(input_checks), len(summary.chunk_indexes))
+    )
+    with executor:
+        # The sampled input events decide which messages the chunk checks
+        # bring back, so the inputs are counted first
+        if input_files:
+            if verbose:
+                console.print(
+                    f"[blue]Scanning {len(input_files)} input files...[/blue]"
+                )
+            scan = _InputScan()
+            for range_scan in ordered_map(
+                executor, _scan_input_range, input_checks, workers * 2
+            ):
+                scan.merge(range_scan)
+
+        sample_times = sorted(scan.samples) if scan is not None else []
+        tasks = []
+        for index in summary.chunk_indexes:
+            low = bisect.bisect_left(sample_times, index.message_start_time)
+            high = bisect.bisect_right(sample_times, index.message_end_time)
+            tasks.append(
+                _ChunkCheck(
+                    mcap_file,
+                    index,
+                    frozenset(event_channels),
+                    frozenset(sample_times[low:high]),
+                )
+            )
+
+        for result in ordered_map(executor, _check_chunk, tasks, workers * 2):
+            report.chunks_checked += 1
+            report.problems.extend(result.problems)
+            for channel_id, count in result.counts.items():
+                counts[channel_id] += count
+            for channel_id, (start, end) in result.time_ranges.items():
+                if channel_id in event_channels:
+                    event_range = (
+                        (start, end)
+                        if event_range is None
+                        else (min(event_range[0], start), max(event_range[1], end))
+                    )
+            for log_time, channel_id, data in result.matches:
+                found[log_time].append((event_channels[channel_id], data))
+
+    expected = summary.statistics.channel_message_counts
+    for channel_id in sorted(set(counts) | set(expected)):
+        if counts.get(channel_id, 0) != expected.get(channel_id, 0):
+            report.problems.append(
+                f"Channel {channel_id}: statistics count {expected.get(channel_id, 0)} "
+                f"messages, chunks hold {counts.get(channel_id, 0)}"
+            )
+
+    if scan is not None:
+        _compare_with_inputs(summary, scan, event_channels, event_range, report)
+        _compare_samples(scan, found, decoder, report)
+
+    if verbose:
+        console.print(
+            f"[blue]Checked {report.chunks_checked} chunks, {report.messages} "
+            f"messages, {report.samples_checked} sampled events[/blue]"
+        )
+    return report
@@ -0,0 +1,910 @@
+"""Watch directories and convert files as Vector finishes or rotates them.
+
+Each pass lists the watched directories and stats the files in them. A
+directory is only listed again when its modification time changes, which is
+what adding, removing or renaming an entry does, so a pass over an idle tree
+costs one ``stat`` per directory and per file. On Linux, inotify (used
+through libc, with no extra dependency) wakes the watcher as soon as an entry
+is added or renamed or a file is closed after writing, and the tree is only
+rescanned for settled files and every minute as a safety net. Elsewhere the
+tree is polled every ``poll_interval`` seconds.
+
+A file is converted once it has been closed after writing or renamed, which
+is how logrotate-style rotation shows up, or once it has not changed for
+``settle`` seconds. The default matches the 30 second idle timeout after
+which Vector's file sink closes a file. Only complete lines are converted; a
+last line still being written waits for the next pass. If a file grows after
+it was converted, the new lines are converted into another output.
+
+Progress is recorded per file, by device and inode, in a JSON state file in
+the output directory, so a rotated file keeps its progress when it is renamed
+and a restarted watcher resumes where it stopped. Each entry also holds a
+checksum of the start of the file, so that a new file reusing the inode of a
+deleted one is converted in full.
+
+By default each file is converted to its own MCAP file by a pool of worker
+processes. Outputs are written as ``<name>.mcap.partial`` and renamed once
+finished, like the server's. With a roll interval, the events of all files go
+into rolling files instead: workers parse ranges of lines and the watcher
+writes them, and a file's progress is only recorded once the rolling file
+holding its events is finished.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from rich.console import Console
+
+from . import event_pb2
+from .discovery import InputFile, order_inputs
+from .file_reader import iter_range_lines
+from .json_to_protobuf import json_to_event_wrapper
+from .mcap_writer import EventWriter
+from .parallel import make_executor
+from .series import SeriesKey, metric_value, series_key
+from .serve import (
+    DEFAULT_ROLL_MESSAGES,
+    PARTIAL_SUFFIX,
+    RollingWriter,
+    stop_on_sigterm,
+)
+
+
+console = Console()
+
+# Vector's file sink closes a file after 30 seconds without events
+DEFAULT_SETTLE = 30.0
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+STATE_FILE_NAME = ".vector2mcap-watch.json"
+
+STATE_VERSION = 1
+
+# Seconds between full rescans when inotify reports changes
+RESCAN_INTERVAL = 60.0
+
+# Seconds between checks for finished conversions
+RESULT_POLL_INTERVAL = 0.1
+
+# Bytes at the start of a file checksummed to recognise it
+FINGERPRINT_SIZE = 4096
+
+# Largest range of a file parsed by one task in rolling mode
+ROLL_PIECE_SIZE = 8 * 1024 * 1024
+
+# Directory listings are cached only once their modification time is this
+# old, since coarse timestamps can hide a change made within the same tick
+LISTING_CACHE_MARGIN_NS = 2 * 10**9
+
+# Bytes read at a time when looking for the end of the last complete line
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_IGNORED = 0x8000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+FileKey = Tuple[int, int]
+
+
+@dataclass
+class FileRecord:
+    """Conversion progress of one input file.
+
+    Attributes:
+        path: Path the file was last seen at
+        device: Device number of the file
+        inode: Inode number of the file
+        offset: Bytes converted, always at the end of a line
+        fingerprint: CRC-32 of the first ``fingerprint_size`` bytes
+        fingerprint_size: Bytes covered by the fingerprint
+    """
+
+    path: str
+    device: int
+    inode: int
+    offset: int = 0
+    fingerprint: int = 0
+    fingerprint_size: int = 0
+
+    @property
+    def key(self) -> FileKey:
+        return (self.device, self.inode)
+
+
+@dataclass
+class RangeResult:
+    """Outcome of converting or parsing a range of an input file.
+
+    Attributes:
+        events: Events converted
+        invalid_lines: Lines that could not be parsed or converted
+        output: Finished output file, if any events were written to one
+        serialized: When parsing for a rolling file, each event as
+            (serialized EventWrapper, timestamp in nanoseconds, index into
+            ``series``, scalar value or None)
+        series: Series key and value type of the parsed events' series
+        fingerprint: CRC-32 of the first ``fingerprint_size`` bytes of the
+            file that was read
+        fingerprint_size: Bytes covered by the fingerprint
+    """
+
+    events: int = 0
+    invalid_lines: int = 0
+    output: Optional[str] = None
+    serialized: List[Tuple[bytes, int, int, Optional[float]]] = field(
+        default_factory=list
+    )
+    series: List[Tuple[SeriesKey, str]] = field(default_factory=list)
+    fingerprint: int = 0
+    fingerprint_size: int = 0
+
+
+@dataclass
+class WatchStats:
+    """Counters describing what the watcher has converted."""
+
+    conversions: int = 0
+    events: int = 0
+    invalid_lines: int = 0
+    failures: int = 0
+
+
+class InputMovedError(OSError):
+    """Raised when the file at a path is no longer the one scheduled."""
+
+
+def load_state(path: Path) -> Dict[FileKey, FileRecord]:
+    """Read the progress records of a state file, if it exists.
+
+    Raises:
+        ValueError: If the file exists but is not a valid state file
+    """
+    try:
+        with open(path, "rb") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise ValueError(f"Invalid watch state file {path}: {e}") from None
+    if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+        raise ValueError(f"Unsupported watch state file {path}")
+    records = (FileRecord(**entry) for entry in data.get("files", []))
+    return {record.key: record for record in records}
+
+
+def save_state(path: Path, records: Sequence[FileRecord]) -> None:
+    """Replace a state file with the given progress records."""
+    data = {"version": STATE_VERSION, "files": [asdict(r) for r in records]}
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(temporary, path)
+
+
+def fingerprint(path: str, size: int) -> int:
+    """CRC-32 of the first ``size`` bytes of a file."""
+    with open(path, "rb") as f:
+        return zlib.crc32(f.read(size))
+
+
+def complete_end(path: str, start: int, size: int) -> int:
+    """Offset just past the last newline between start and size.
+
+    Returns:
+        start if there is no complete line in the range
+    """
+    with open(path, "rb") as f:
+        end = size
+        while end > start:
+            block_start = max(start, end - _TAIL_BLOCK_SIZE)
+            f.seek(block_start)
+            block = f.read(end - block_start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            end = block_start
+    return start
+
+
+def _open_input(path: str, key: FileKey) -> BinaryIO:
+    """Open an input file, checking it is still the file that was scheduled.
+
+    Raises:
+        InputMovedError: If another file has taken its place at the path
+    """
+    f = open(path, "rb")
+    stat = os.fstat(f.fileno())
+    if (stat.st_dev, stat.st_ino) != tuple(key):
+        f.close()
+        raise InputMovedError(f"{path} was replaced before it was read")
+    return f
+
+
+def _parse_range(
+    path: str, key: FileKey, start: int, end: int, result: RangeResult
+) -> Iterator[event_pb2.EventWrapper]:
+    """Yield the events of the lines starting within a byte range.
+
+    The fingerprint of the result is taken from the same open file.
+    """
+    with _open_input(path, key) as f:
+        result.fingerprint_size = min(end, FINGERPRINT_SIZE)
+        result.fingerprint = zlib.crc32(f.read(result.fingerprint_size))
+        for offset, line in iter_range_lines(f, start, end):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                json_obj = json.loads(line)
+            except ValueError as e:
+                console.print(
+                    f"[yellow]Warning: Invalid JSON at byte {offset} in {path}: "
+                    f"{e}[/yellow]"
+                )
+                result.invalid_lines += 1
+                continue
+            event = (
+                json_to_event_wrapper(json_obj) if isinstance(json_obj, dict) else None
+            )
+            if event is None:
+                result.invalid_lines += 1
+                continue
+            yield event
+
+
+def convert_range(
+    path: str,
+    key: FileKey,
+    start: int,
+    end: int,
+    output: str,
+    compact: bool = False,
+) -> RangeResult:
+    """Convert a byte range of an input file to its own MCAP file.
+
+    Nothing is written if the range holds no events.
+    """
+    result = RangeResult()
+    partial = output + PARTIAL_SUFFIX
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(partial, "wb") as stream:
+        writer = EventWriter(stream, compact=compact)
+        for event in _parse_range(path, key, start, end, result):
+            try:
+                writer.write_event(event, event.metric.timestamp.ToNanoseconds())
+            except ValueError as e:
+                console.print(f"[yellow]Warning: Skipped event in {path}: {e}[/yellow]")
+                result.invalid_lines += 1
+                continue
+            result.events += 1
+        writer.finish()
+    if result.events:
+        os.replace(partial, output)
+        result.output = output
+    else:
+        os.remove(partial)
+    return result
+
+
+def parse_range(path: str, key: FileKey, start: int, end: int) -> RangeResult:
+    """Parse a byte range of an input file into serialized events.
+
+    Each event comes with what the series index needs, so the watcher can
+    write it without parsing it again.
+    """
+    result = RangeResult()
+    series_indexes: Dict[Tuple[SeriesKey, str], int] = {}
+    for event in _parse_range(path, key, start, end, result):
+        metric = event.metric
+        series = (series_key(metric), metric.WhichOneof("value") or "")
+        index = series_indexes.get(series)
+        if index is None:
+            index = series_indexes[series] = len(result.series)
+            result.series.append(series)
+        result.serialized.append(
+            (
+                event.SerializeToString(),
+                metric.timestamp.ToNanoseconds(),
+                index,
+                metric_value(metric),
+            )
+        )
+    result.events = len(result.serialized)
+    return result
+
+
+class _Inotify:
+    """Directory change notifications from Linux inotify, through libc."""
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wake_read, self._wake_write = os.pipe()
+        self._directories: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+
+    def watch(self, directory: str) -> None:
+        if directory in self._watches:
+            return
+        descriptor = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), _WATCH_MASK
+        )
+        if descriptor >= 0:
+            self._watches[directory] = descriptor
+            self._directories[descriptor] = directory
+
+    def wake(self) -> None:
+        """Make a pending ``wait`` return."""
+        os.write(self._wake_write, b"\0")
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Wait for changes and return the files closed or renamed into place."""
+        readable, _, _ = select.select([self.fd, self._wake_read], [], [], timeout)
+        if self._wake_read in readable:
+            os.read(self._wake_read, 4096)
+        finished: Set[str] = set()
+        if self.fd not in readable:
+            return finished
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            position = 0
+            while position < len(data):
+                descriptor, mask, _, length = _INOTIFY_EVENT.unpack_from(data, position)
+                position += _INOTIFY_EVENT.size
+                name = data[position : position + length].rstrip(b"\0")
+                position += length
+                directory = self._directories.get(descriptor)
+                if directory is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    # The directory was removed
+                    del self._directories[descriptor]
+                    self._watches.pop(directory, None)
+                elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and name:
+                    finished.add(os.path.join(directory, os.fsdecode(name)))
+        return finished
+
+    def close(self) -> None:
+        for fd in (self.fd, self._wake_read, self._wake_write):
+            os.close(fd)
+
+
+def _open_inotify() -> Optional[_Inotify]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+@dataclass
+class _Listing:
+    mtime_ns: int
+    files: List[str]
+    directories: List[str]
+
+
+@dataclass
+class _Observed:
+    """What a pass last saw at a path."""
+
+    signature: Tuple[int, int, int]
+    changed_at: float
+    finished: bool = False
+    failed: bool = False
+
+
+@dataclass
+class _Task:
+    key: FileKey
+    path: str
+    end: int
+    future: Future
+
+
+class Watcher:
+    """Convert files in watched directories as they are finished.
+
+    Args:
+        directories: Directories to watch, including their subdirectories
+        output_dir: Directory for the MCAP files and, by default, the state
+        pattern: Only files whose names match this glob are converted
+        settle: Seconds a file must be unchanged before it is converted,
+            unless it was seen being closed or renamed
+        poll_interval: Seconds between passes when inotify is unavailable
+        workers: Worker processes, by default one per CPU
+        roll_interval: Write rolling files started this many seconds apart
+            instead of one file per input
+        roll_messages: Messages after which a new rolling file is started,
+            checked after each range so its events stay in one file
+        compact: Write the compact series-dictionary encoding
+        state_file: Where to record progress
+        use_inotify: Use inotify where available instead of polling only
+        verbose: Report each conversion
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[str],
+        output_dir: str,
+        pattern: str = "*",
+        settle: float = DEFAULT_SETTLE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        workers: Optional[int] = None,
+        roll_interval: Optional[float] = None,
+        roll_messages: int = DEFAULT_ROLL_MESSAGES,
+        compact: bool = False,
+        state_file: Optional[str] = None,
+        use_inotify: bool = True,
+        verbose: bool = False,
+    ):
+        self.directories = [os.path.normpath(d) for d in directories]
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.pattern = pattern
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.roll_interval = roll_interval
+        self.roll_messages = roll_messages
+        self.compact = compact
+        self.verbose = verbose
+        self.state_file = (
+            Path(state_file) if state_file else self.output_dir / STATE_FILE_NAME
+        )
+        self.stats = WatchStats()
+        self.outputs: List[Path] = []
+
+        self._records = load_state(self.state_file)
+        self._output_real = os.path.realpath(self.output_dir)
+        self._listings: Dict[str, _Listing] = {}
+        self._observed: Dict[str, _Observed] = {}
+        self._last_path: Dict[FileKey, str] = {}
+        self._finished_paths: Set[str] = set()
+        # End of the bytes handed to workers, ahead of the records in
+        # rolling mode until the rolling file is finished
+        self._scheduled: Dict[FileKey, int] = {}
+        self._in_flight: Dict[FileKey, int] = {}
+        self._tasks: Deque[_Task] = deque()
+        self._reserved_outputs: Set[str] = set()
+        self._abandoned: Set[FileKey] = set()
+        self._roll_progress: Dict[FileKey, Tuple[int, RangeResult]] = {}
+        self._rolling = (
+            RollingWriter(self.output_dir, compact, verbose)
+            if roll_interval is not None
+            else None
+        )
+        self._next_settle: Optional[float] = None
+        self._executor, self.workers = make_executor(workers, task_count=sys.maxsize)
+        self._inotify = _open_inotify() if use_inotify else None
+        self._stop = threading.Event()
+        self._closed = False
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    @property
+    def records(self) -> List[FileRecord]:
+        """Progress records of the files seen so far."""
+        return list(self._records.values())
+
+    def _list(self, directory: str) -> Optional[_Listing]:
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        listing = self._listings.get(directory)
+        if (
+            listing is not None
+            and listing.mtime_ns == mtime_ns
+            and time.time_ns() - mtime_ns > LISTING_CACHE_MARGIN_NS
+        ):
+            return listing
+
+        listing = _Listing(mtime_ns, [], [])
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        if os.path.realpath(entry.path) != self._output_real:
+                            listing.directories.append(entry.path)
+                    elif entry.is_file() and fnmatchcase(entry.name, self.pattern):
+                        listing.files.append(entry.path)
+        except OSError:
+            return None
+        if self._inotify is not None:
+            self._inotify.watch(directory)
+        return listing
+
+    def _iter_files(self) -> Iterator[Tuple[str, str]]:
+        """Yield (root, path) for every matching file, caching listings."""
+        listings: Dict[str, _Listing] = {}
+        for root in self.directories:
+            pending = [root]
+            while pending:
+                directory = pending.pop()
+                listing = self._list(directory)
+                if listing is None:
+                    continue
+                listings[directory] = listing
+                pending.extend(listing.directories)
+                for path in listing.files:
+                    yield root, path
+        self._listings = listings
+
+    def _is_same_file(self, record: FileRecord, path: str, size: int) -> bool:
+        if size < record.offset:
+            return False
+        try:
+            return fingerprint(path, record.fingerprint_size) == record.fingerprint
+        except OSError:
+            return False
+
+    def _forget(self, key: FileKey) -> None:
+        self._records.pop(key, None)
+        self._scheduled.pop(key, None)
+        self._roll_progress.pop(key, None)
+
+    def _scan(
+        self, now: float, settle_all: bool
+    ) -> List[Tuple[str, str, os.stat_result]]:
+        """Stat every file and return (root, path, stat) for those ready."""
+        ready = []
+        seen_paths: Dict[str, _Observed] = {}
+        seen_keys: Set[FileKey] = set()
+        self._next_settle = None
+        finished, self._finished_paths = self._finished_paths, set()
+
+        for root, path in self._iter_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = (stat.st_dev, stat.st_ino)
+            seen_keys.add(key)
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            observed = self._observed.get(path)
+            if observed is None or observed.signature != signature:
+                observed = _Observed(signature, now)
+                # A known file showing up under a new name has been rotated
+                if self._last_path.get(key, path) != path:
+                    observed.finished = True
+                record = self._records.get(key)
+                if record is not None and not self._is_same_file(
+                    record, path, stat.st_size
+                ):
+                    if self.verbose:
+                        console.print(f"[blue]{path} was replaced or truncated[/blue]")
+                    self._forget(key)
+            if path in finished:
+                observed.finished = True
+            seen_paths[path] = observed
+            self._last_path[key] = path
+            record = self._records.get(key)
+            if record is not None:
+                record.path = path
+
+            if key in self._in_flight or observed.failed:
+                continue
+            record = self._records.get(key)
+            converted = self._scheduled.get(key, record.offset if record else 0)
+            if stat.st_size <= converted:
+                continue
+            settled_at = observed.changed_at + self.settle
+            if settle_all or observed.finished or now >= settled_at:
+                ready.append((root, path, stat))
+            elif self._next_settle is None or settled_at < self._next_settle:
+                self._next_settle = settled_at
+
+        self._observed = seen_paths
+        for key in list(self._records):
+            if (
+                key not in seen_keys
+                and key not in self._in_flight
+                and key not in self._roll_progress
+            ):
+                self._forget(key)
+        self._last_path = {
+            key: path for key, path in self._last_path.items() if key in seen_keys
+        }
+        return ready
+
+    def _output_path(self, root: str, path: str, start: int) -> str:
+        """Pick an unused output path named after an input and its offset."""
+        relative = os.path.relpath(path, root)
+        if start:
+            relative += f".{start}"
+        base = os.path.join(self.output_dir, relative)
+        candidate, number = base + ".mcap", 1
+        while candidate in self._reserved_outputs or os.path.exists(candidate):
+            candidate = f"{base}-{number}.mcap"
+            number += 1
+        self._reserved_outputs.add(candidate)
+        return candidate
+
+    def _submit(
+        self,
+        key: FileKey,
+        path: str,
+        end: int,
+        fn: Callable[..., RangeResult],
+        *args: Any,
+    ) -> None:
+        future = self._executor.submit(fn, *args)
+        self._tasks.append(_Task(key, path, end, future))
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._scheduled[key] = end
+
+    def _schedule(self, ready: List[Tuple[str, str, os.stat_result]]) -> int:
+        by_path = {path: (root, stat) for root, path, stat in ready}
+        ordered = order_inputs(
+            [InputFile(path, stat.st_size, stat.st_mtime_ns) for _, path, stat in ready]
+        )
+        scheduled = 0
+        for input_file in ordered:
+            path = input_file.path
+            root, stat = by_path[path]
+            key = (stat.st_dev, stat.st_ino)
+            record = self._records.get(key)
+            start = self._scheduled.get(key, record.offset if record else 0)
+            try:
+                end = complete_end(path, start, stat.st_size)
+            except OSError:
+                continue
+            if end <= start:
+                continue
+            if self._rolling is None:
+                output = self._output_path(root, path, start)
+                self._submit(
+                    key,
+                    path,
+                    end,
+                    convert_range,
+                    path,
+                    key,
+                    start,
+                    end,
+                    output,
+                    self.compact,
+                )
+            else:
+                for piece_start in range(start, end, ROLL_PIECE_SIZE):
+                    piece_end = min(piece_start + ROLL_PIECE_SIZE, end)
+                    self._submit(
+                        key,
+                        path,
+                        piece_end,
+                        parse_range,
+                        path,
+                        key,
+                        piece_start,
+                        piece_end,
+                    )
+            self._observed[path].finished = False
+            scheduled += 1
+        return scheduled
+
+    def _record(self, key: FileKey, end: int, result: RangeResult) -> None:
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = FileRecord(self._last_path.get(key, ""), *key)
+        record.offset = end
+        # The worker fingerprinted the file it read, which the path may no
+        # longer lead to
+        if result.fingerprint_size >= record.fingerprint_size:
+            record.fingerprint = result.fingerprint
+            record.fingerprint_size = result.fingerprint_size
+
+    def _abandon(self, key: FileKey) -> None:
+        """Drop the rest of a file's tasks and schedule it again later."""
+        if key in self._in_flight:
+            self._abandoned.add(key)
+        progress = self._roll_progress.get(key)
+        if progress is not None:
+            self._scheduled[key] = progress[0]
+        else:
+            self._scheduled.pop(key, None)
+
+    def _save(self) -> None:
+        save_state(self.state_file, self.records)
+
+    def _collect(self, wait: bool = False) -> int:
+        """Handle finished tasks, in submission order.
+
+        Returns:
+            Number of tasks handled
+        """
+        handled = 0
+        while self._tasks and (wait or self._tasks[0].future.done()):
+            task = self._tasks.popleft()
+            handled += 1
+            self._in_flight[task.key] -= 1
+            if not self._in_flight[task.key]:
+                del self._in_flight[task.key]
+            if task.key in self._abandoned:
+                if task.key not in self._in_flight:
+                    self._abandoned.discard(task.key)
+                continue
+            try:
+                result = task.future.result()
+            except InputMovedError:
+                # Picked up again under its new name on the next pass
+                self._abandon(task.key)
+                continue
+            except Exception as e:
+                console.print(f"[red]Error converting {task.path}: {e}[/red]")
+                self.stats.failures += 1
+                observed = self._observed.get(task.path)
+                if observed is not None:
+                    observed.failed = True
+                self._abandon(task.key)
+                continue
+
+            self.stats.events += result.events
+            self.stats.invalid_lines += result.invalid_lines
+            if self._rolling is None:
+                self.stats.conversions += 1
+                if result.output is not None:
+                    self._reserved_outputs.discard(result.output)
+                    self.outputs.append(Path(result.output))
+                    if self.verbose:
+                        console.print(
+                            f"[green]Converted {result.events} events from "
+                            f"{task.path} to {result.output}[/green]"
+                        )
+                self._record(task.key, task.end, result)
+                self._save()
+            else:
+                for data, log_time, index, value in result.serialized:
+                    self._rolling.write_serialized(
+                        data, log_time, *result.series[index], value
+                    )
+                result.serialized = []
+                result.series = []
+                self._roll_progress[task.key] = (task.end, result)
+                if task.key not in self._in_flight:
+                    self.stats.conversions += 1
+                # Only between tasks, so that a finished rolling file holds
+                # whole ranges and their progress is recorded with it
+                if self._rolling.message_count >= self.roll_messages:
+                    self._roll()
+        return handled
+
+    def _roll(self) -> None:
+        """Finish the rolling file, then record the progress it holds."""
+        self._rolling.close()
+        self.outputs = list(self._rolling.outputs)
+        for key, (end, result) in self._roll_progress.items():
+            self._record(key, end, result)
+        self._roll_progress.clear()
+        self._save()
+
+    def _roll_due(self, now: float) -> bool:
+        return (
+            self._rolling is not None
+            and self._rolling.is_open
+            and now - self._rolling.opened_at >= self.roll_interval
+        )
+
+    def poll(self, settle_all: bool = False) -> int:
+        """Handle finished conversions and start those that are due.
+
+        Args:
+            settle_all: Convert files without waiting for them to settle
+
+        Returns:
+            Number of files whose conversion was started
+        """
+        self._collect()
+        now = time.monotonic()
+        if self._roll_due(now):
+            self._roll()
+        return self._schedule(self._scan(now, settle_all))
+
+    def _timeout(self) -> float:
+        now = time.monotonic()
+        timeout = RESCAN_INTERVAL if self._inotify is not None else self.poll_interval
+        if self._tasks:
+            timeout = min(timeout, RESULT_POLL_INTERVAL)
+        if self._next_settle is not None:
+            timeout = min(timeout, self._next_settle - now)
+        if self._rolling is not None and self._rolling.is_open:
+            timeout = min(timeout, self._rolling.opened_at + self.roll_interval - now)
+        return max(timeout, 0.0)
+
+    def _wait(self, timeout: float) -> None:
+        if self._inotify is not None:
+            self._finished_paths |= self._inotify.wait(timeout)
+        else:
+            self._stop.wait(timeout)
+
+    def run(self, once: bool = False) -> None:
+        """Convert files until stopped, then shut down cleanly.
+
+        ``stop``, an interrupt and SIGTERM all stop the watcher.
+
+        Args:
+            once: Convert the files there now without waiting for them to
+                settle, then return
+        """
+        try:
+            with stop_on_sigterm(self.stop):
+                if once:
+                    self.poll(settle_all=True)
+                while not once and not self._stop.is_set():
+                    self.poll()
+                    self._wait(self._timeout())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        """Make ``run`` return, from another thread or a signal handler."""
+        self._stop.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+
+    def close(self) -> List[Path]:
+        """Finish the conversions in progress and the rolling file.
+
+        Returns:
+            All finished output files
+        """
+        if self._closed:
+            return self.outputs
+        self._closed = True
+        self._collect(wait=True)
+        if self._rolling is not None:
+            self._roll()
+        self._save()
+        self._executor.shutdown()
+        if self._inotify is not None:
+            self._inotify.close()
+        return self.outputs
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
@@ -0,0 +1,95 @@
+"""Shared fixtures and input builders for the tests."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mcap.reader import make_reader
+
+from vector2mcap.mcap_chunks import ChunkCopyWriter
+
+
+START = datetime(2025, 7, 16, 14, 20, tzinfo=timezone.utc)
+
+
+def metric_event(
+    second,
+    name="cpu",
+    value=None,
+    *,
+    host="a",
+    tags=None,
+    value_type="gauge",
+    kind="absolute",
+    namespace="vector",
+):
+    """Build a Vector metric event at the given second past START.
+
+    Args:
+        second: Seconds past START, fractions included in the timestamp.
+        name: Metric name.
+        value: Metric value, the second itself by default.
+        host: Host tag, used when no tags are given.
+        tags: Tags of the metric, replacing the host tag.
+        value_type: Vector value type, such as "gauge", "counter" or "set".
+        kind: "absolute" or "incremental".
+        namespace: Metric namespace, left out when None.
+
+    Returns:
+        The event as a dictionary, in the shape Vector writes it.
+    """
+    value = second if value is None else value
+    time = START + timedelta(seconds=second)
+    fraction = f".{time.microsecond:06d}".rstrip("0") if time.microsecond else ""
+    metric = {"name": name}
+    if namespace is not None:
+        metric["namespace"] = namespace
+    metric["tags"] = {"host": host} if tags is None else tags
+    metric["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S") + fraction + "Z"
+    metric["kind"] = kind
+    if value_type == "set":
+        metric[value_type] = {"values": [str(value)]}
+    else:
+        metric[value_type] = {"value": value}
+    return {"metric": metric}
+
+
+def metric_line(second, name="cpu", value=None, **kwargs):
+    """Build a Vector metric line, taking the arguments of metric_event."""
+    event = metric_event(second, name, value, **kwargs)
+    return json.dumps(event, separators=(",", ":")) + "\n"
+
+
+def write_lines(path, seconds, mode="w", **kwargs):
+    """Write or append metric lines for the given seconds.
+
+    Args:
+        path: File to write, its directory is created if needed.
+        seconds: Seconds past START, one line each.
+        mode: "w" to write a new file or "a" to append.
+        **kwargs: Passed to metric_line for every line.
+
+    Returns:
+        The path as a string.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, mode) as f:
+        f.write("".join(metric_line(second, **kwargs) for second in seconds))
+    return str(path)
+
+
+def message_count(path):
+    """Return the message count of an MCAP file."""
+    with open(path, "rb") as f:
+        return make_reader(f).get_summary().statistics.message_count
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Make the writer start a new chunk every few messages."""
+    original = ChunkCopyWriter.__init__
+
+    def init(self, stream, chunk_size=1024 * 1024, compression=None, **kwargs):
+        original(self, stream, chunk_size=2048, **kwargs)
+
+    monkeypatch.setattr(ChunkCopyWriter, "__init__", init)
@@ -72,3 +72,67 @@ def test_cli_missing_output():
 
     assert result.exit_code != 0
     assert "Missing option" in result.output or "required" in result.output.lower()
+
+
+def test_cli_filter_options(sample_jsonl):
+    """Test CLI filtering options."""
+    runner = CliRunner()
+
+    with tempfile.NamedTemporaryFile(suffix=".mcap", delete=False) as output_file:
+        result = runner.invoke(
+            main,
+            [
+                sample_jsonl,
+                "-o",
+                output_file.name,
+                "--include-name",
+                "test_gauge",
+                "--tag",
+                "host=test-host",
+                "--since",
+                "2025-07-16T00:00:00Z",
+                "--verbose",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert "Rejected 1 lines by prefilter" in result.output
+        assert "Successfully converted 1 messages" in result.output
+
+
+def test_cli_invalid_tag_option(sample_jsonl):
+    """Test CLI rejects malformed --tag values."""
+    runner = CliRunner()
+    result = runner.invoke(main, [sample_jsonl, "-o", "out.mcap", "--tag", "host"])
+
+    assert result.exit_code != 0
+    assert "key=value" in result.output
+
+
+def test_cli_merge(sample_jsonl, tmp_path):
+    """Test merging converted files with the merge subcommand."""
+    runner = CliRunner()
+    first = str(tmp_path / "first.mcap")
+    second = str(tmp_path / "second.mcap")
+    merged = str(tmp_path / "merged.mcap")
+
+    assert runner.invoke(main, [sample_jsonl, "-o", first]).exit_code == 0
+    assert runner.invoke(main, ["convert", sample_jsonl, "-o", second]).exit_code == 0
+
+    result = runner.invoke(main, ["merge", first, second, "-o", merged])
+
+    assert result.exit_code == 0
+    assert "Successfully merged 2 files (4 messages)" in result.output
+    assert Path(merged).stat().st_size > 0
+
+
+def test_cli_merge_missing_input(tmp_path):
+    """Test merge reports missing inputs."""
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ["merge", str(tmp_path / "missing.mcap"), "-o", str(tmp_path / "out.mcap")],
+    )
+
+    assert result.exit_code != 0
+    assert "Input file not found" in result.output
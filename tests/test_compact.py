@@ -0,0 +1,168 @@
+"""Tests for the compact series-dictionary encoding."""
+
+import pytest
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import compact_pb2, event_pb2
+from vector2mcap.cli import main
+from vector2mcap.compact import (
+    SAMPLE_TOPIC,
+    SERIES_TOPIC,
+    CompactDecoder,
+    iter_compact_metrics,
+    metric_to_sample,
+    sample_to_metric,
+    series_definition,
+)
+from vector2mcap.mcap_writer import TOPIC, EventWriter, write_mcap
+from vector2mcap.merger import merge_mcap
+from vector2mcap.series import series_key, stable_series_id
+
+from .conftest import metric_line
+
+
+SERIES = [
+    ("component_received_events_total", "counter", {"component_kind": "sink"}),
+    ("component_sent_events_total", "counter", {"component_kind": "source"}),
+    ("utilization", "gauge", {"component_kind": "transform"}),
+]
+
+
+COMPONENT_TAGS = {
+    "component_id": "internal_metrics",
+    "component_type": "internal_metrics",
+    "host": "processor-v3-7",
+}
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    """Create a JSONL file with 200 samples of each series."""
+    path = tmp_path / "input.jsonl"
+    with open(path, "w") as f:
+        for second in range(200):
+            for name, value_type, tags in SERIES:
+                f.write(
+                    metric_line(
+                        second,
+                        name,
+                        tags={**COMPONENT_TAGS, **tags},
+                        value_type=value_type,
+                    )
+                )
+    return str(path)
+
+
+def read_default_metrics(path):
+    """Decode every metric of a file in the default encoding."""
+    with open(path, "rb") as f:
+        metrics = []
+        for _, _, message in make_reader(f).iter_messages():
+            event = event_pb2.EventWrapper()
+            event.ParseFromString(message.data)
+            metrics.append(event.metric)
+        return metrics
+
+
+def uncompressed_size(path):
+    """Total uncompressed size of a file's chunks."""
+    with open(path, "rb") as f:
+        summary = make_reader(f).get_summary()
+    return sum(index.uncompressed_size for index in summary.chunk_indexes)
+
+
+def test_sample_round_trip():
+    """Test a metric survives conversion to a sample and back."""
+    metric = event_pb2.Metric(name="requests", namespace="vector")
+    metric.tags_v1.update({"host": "a", "component_id": "b"})
+    metric.timestamp.FromNanoseconds(1_752_675_606_666_956_352)
+    metric.kind = event_pb2.Metric.Kind.Incremental
+    metric.counter.value = 3.5
+
+    key = series_key(metric)
+    series_id = stable_series_id(key)
+    definition = series_definition(key, series_id)
+    sample = metric_to_sample(metric, series_id)
+
+    assert sample_to_metric(definition, sample, 1_752_675_606_666_956_352) == metric
+
+
+def test_stable_ids_are_deterministic():
+    """Test ids depend only on the series key."""
+    key = ("cpu", "vector", (("host", "a"),))
+    assert stable_series_id(key) == stable_series_id(key)
+    assert stable_series_id(key) != stable_series_id(("cpu", "vector", ()))
+
+
+def test_decoder_rejects_undefined_series():
+    """Test samples of unknown series raise KeyError."""
+    sample = compact_pb2.Sample(series_id=1, gauge=1.0)
+    with pytest.raises(KeyError):
+        CompactDecoder().decode(sample.SerializeToString(), 0)
+
+
+def test_compact_output_matches_default(tmp_path, jsonl_file):
+    """Test the compact file decodes to the same metrics, in less space."""
+    default = str(tmp_path / "default.mcap")
+    compact = str(tmp_path / "compact.mcap")
+    write_mcap([jsonl_file], default)
+    write_mcap([jsonl_file], compact, compact=True)
+
+    assert list(iter_compact_metrics(compact)) == read_default_metrics(default)
+    assert uncompressed_size(compact) * 4 < uncompressed_size(default)
+
+    with open(compact, "rb") as f:
+        summary = make_reader(f).get_summary()
+    topics = {channel.id: channel.topic for channel in summary.channels.values()}
+    counts = {
+        topics[channel_id]: count
+        for channel_id, count in summary.statistics.channel_message_counts.items()
+    }
+    assert counts == {SERIES_TOPIC: len(SERIES), SAMPLE_TOPIC: 200 * len(SERIES)}
+
+
+def test_compact_histograms_intervals_and_fallback(tmp_path):
+    """Test histograms and intervals round-trip, other types are written in full."""
+    histogram = event_pb2.EventWrapper()
+    histogram.metric.name = "latency"
+    histogram.metric.timestamp.FromNanoseconds(10**18)
+    histogram.metric.interval_ms = 10_000
+    histogram.metric.aggregated_histogram3.count = 3
+    histogram.metric.aggregated_histogram3.sum = 1.5
+    histogram.metric.aggregated_histogram3.buckets.add(upper_limit=0.5, count=2)
+    summary = event_pb2.EventWrapper()
+    summary.metric.name = "latency_summary"
+    summary.metric.timestamp.FromNanoseconds(10**18 + 1)
+    summary.metric.aggregated_summary3.count = 3
+
+    path = tmp_path / "compact.mcap"
+    with open(path, "wb") as f, EventWriter(f, compact=True) as writer:
+        assert writer.write_event(histogram, 10**18)
+        assert writer.write_event(summary, 10**18 + 1)
+
+    assert list(iter_compact_metrics(str(path))) == [histogram.metric, summary.metric]
+    with open(path, "rb") as f:
+        topics = [channel.topic for _, channel, _ in make_reader(f).iter_messages()]
+    assert topics == [SERIES_TOPIC, SAMPLE_TOPIC, TOPIC]
+
+
+def test_compact_files_merge(tmp_path, jsonl_file):
+    """Test series ids agree across separately written files."""
+    first = str(tmp_path / "first.mcap")
+    second = str(tmp_path / "second.mcap")
+    write_mcap([jsonl_file], first, compact=True)
+    write_mcap([jsonl_file], second, compact=True)
+    merged = str(tmp_path / "merged.mcap")
+    merge_mcap([first, second], merged)
+
+    assert len(list(iter_compact_metrics(merged))) == 2 * 200 * len(SERIES)
+
+
+def test_compact_cli(tmp_path, jsonl_file):
+    """Test the --compact flag."""
+    output = str(tmp_path / "compact.mcap")
+    result = CliRunner().invoke(main, [jsonl_file, "-o", output, "--compact"])
+
+    assert result.exit_code == 0
+    assert len(list(iter_compact_metrics(output))) == 200 * len(SERIES)
@@ -0,0 +1,148 @@
+"""Tests for input discovery, ordering and work planning."""
+
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from vector2mcap import discovery
+from vector2mcap.cli import main
+from vector2mcap.discovery import InputFile, discover_inputs, order_inputs, plan_work
+from vector2mcap.scan import scan_file, scan_files
+
+from .conftest import metric_line
+
+
+def touch(path, size=1, mtime=None):
+    """Create a file of the given size and modification time."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_discover_directories_and_recursive_patterns(tmp_path):
+    """Test directories are walked and ** matches any depth, skipping hidden files."""
+    touch(tmp_path / "logs" / "a.jsonl", 3)
+    touch(tmp_path / "logs" / "day" / "b.jsonl", 5)
+    touch(tmp_path / "logs" / "day" / "deep" / "c.jsonl")
+    touch(tmp_path / "logs" / "day" / "notes.txt")
+    touch(tmp_path / "logs" / ".hidden" / "d.jsonl")
+
+    from_directory = discover_inputs([str(tmp_path / "logs")])
+    assert len(from_directory.files) == 4
+
+    found = discover_inputs(
+        [str(tmp_path / "logs" / "**" / "*.jsonl"), str(tmp_path / "missing*")]
+    )
+    names = [os.path.relpath(f.path, tmp_path) for f in found.files]
+    assert names == ["logs/a.jsonl", "logs/day/b.jsonl", "logs/day/deep/c.jsonl"]
+    assert [f.size for f in found.files] == [3, 5, 1]
+    assert found.total_size == 9
+    assert found.unmatched == [str(tmp_path / "missing*")]
+
+
+def test_rotated_files_are_ordered_oldest_first(tmp_path):
+    """Test logrotate-style suffixes sort by value, highest (oldest) first."""
+    for number, age in [(1, 10), (2, 20), (10, 100), (3, 30)]:
+        touch(tmp_path / f"metrics.out.{number}", mtime=1_752_000_000 - age)
+    touch(tmp_path / "metrics.out", mtime=1_752_000_000)
+    touch(tmp_path / "part-10.jsonl")
+    touch(tmp_path / "part-2.jsonl")
+
+    found = discover_inputs([str(tmp_path / "*")])
+
+    assert [os.path.basename(f.path) for f in found.files] == [
+        "metrics.out.10",
+        "metrics.out.3",
+        "metrics.out.2",
+        "metrics.out.1",
+        "metrics.out",
+        "part-2.jsonl",
+        "part-10.jsonl",
+    ]
+
+
+def test_rotation_direction_follows_modification_times():
+    """Test suffixes that count up as files are written sort ascending."""
+    files = [
+        InputFile("out.log.2", 1, 200),
+        InputFile("out.log", 1, 50),
+        InputFile("out.log.10", 1, 1000),
+        InputFile("out.log.1", 1, 100),
+    ]
+
+    assert [f.path for f in order_inputs(files)] == [
+        "out.log",
+        "out.log.1",
+        "out.log.2",
+        "out.log.10",
+    ]
+
+
+def test_plan_splits_large_files_largest_first(monkeypatch):
+    """Test a large file is split so that workers are evenly loaded."""
+    monkeypatch.setattr(discovery, "MIN_SPLIT_SIZE", 10)
+    files = [InputFile("big", 1000, 0), InputFile("small", 100, 0)]
+
+    plan = plan_work(files, workers=4, split_size=10_000)
+
+    assert [unit.size for unit in plan.units] == sorted(
+        (unit.size for unit in plan.units), reverse=True
+    )
+    big = sorted((u.start, u.end) for u in plan.units if u.path == "big")
+    assert len(big) == 4 and big[0][0] == 0 and big[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(big, big[1:]))
+    assert plan.split_files == 1
+    assert sum(plan.loads) == 1100
+    assert max(plan.loads) - min(plan.loads) <= 100
+    with pytest.raises(ValueError):
+        plan_work(files, workers=0)
+
+
+def test_split_scan_matches_whole_file_scan(tmp_path, monkeypatch):
+    """Test scanning a file in ranges counts every line exactly once."""
+    monkeypatch.setattr(discovery, "MIN_SPLIT_SIZE", 1)
+    path = tmp_path / "input.jsonl"
+    path.write_text(
+        "".join(metric_line(index, host=f"h{index % 7}") for index in range(3000))
+    )
+
+    whole = scan_file(str(path))
+    result = scan_files([str(path)], workers=2, split_size=20_000)
+
+    assert result.files[0].lines == whole.lines == 3000
+    assert result.files[0].files == 1
+    assert result.files[0].bytes == whole.bytes
+    assert result.total.end_time == whole.end_time
+    assert result.total.series.estimate() == 7
+
+
+def test_convert_dry_run(tmp_path, monkeypatch):
+    """Test --dry-run lists the inputs in order without converting."""
+    monkeypatch.chdir(tmp_path)
+    touch(tmp_path / "in" / "metrics.out.2", mtime=1_752_000_000)
+    touch(tmp_path / "in" / "metrics.out.10", mtime=1_751_000_000)
+
+    result = CliRunner().invoke(main, ["convert", "in", "--dry-run"])
+
+    assert result.exit_code == 0
+    assert result.output.index("metrics.out.10") < result.output.index("metrics.out.2")
+    assert "2 files, 2 bytes" in result.output
+    assert "converted one after another" in result.output
+    assert "workers" not in result.output
+    assert not list(tmp_path.glob("*.mcap"))
+
+
+def test_scan_dry_run_prints_work_plan(tmp_path, monkeypatch):
+    """Test scan --dry-run adds the work units to the input list."""
+    monkeypatch.chdir(tmp_path)
+    touch(tmp_path / "in" / "a.out", mtime=1_752_000_000)
+    touch(tmp_path / "in" / "b.out", mtime=1_752_000_000)
+
+    result = CliRunner().invoke(main, ["scan", "in", "--dry-run", "--workers", "2"])
+
+    assert result.exit_code == 0
+    assert "2 files, 2 bytes" in result.output
+    assert "2 units over 2 workers" in result.output
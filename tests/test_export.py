@@ -0,0 +1,155 @@
+"""Tests for exporting MCAP files."""
+
+import csv
+import importlib.util
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from vector2mcap.cli import main
+from vector2mcap.export import COLUMNS, export_mcap, format_timestamp
+from vector2mcap.filters import parse_time_bound
+from vector2mcap.mcap_writer import write_mcap
+
+from .conftest import metric_line
+
+
+LINE_COUNT = 600
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    """Create ten minutes of one-second samples of two series."""
+    path = tmp_path / "input.jsonl"
+    with open(path, "w") as f:
+        for i in range(LINE_COUNT):
+            name, value_type = ("cpu", "gauge") if i % 2 else ("requests", "counter")
+            f.write(metric_line(i + 0.5, name, float(i), value_type=value_type))
+    return str(path)
+
+
+def test_export_jsonl_round_trips(tmp_path, jsonl_file):
+    """Test JSONL export reproduces the input events."""
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+    exported = tmp_path / "exported.jsonl"
+
+    stats = export_mcap(mcap, str(exported), workers=1)
+
+    assert stats.rows == LINE_COUNT
+    original = [json.loads(line) for line in open(jsonl_file)]
+    lines = [json.loads(line) for line in exported.read_text().splitlines()]
+    for before, after in zip(original, lines):
+        assert after["metric"]["name"] == before["metric"]["name"]
+        assert after["metric"]["tags"] == before["metric"]["tags"]
+        assert parse_time_bound(after["metric"]["timestamp"]) == parse_time_bound(
+            before["metric"]["timestamp"]
+        )
+
+
+def test_export_csv_in_parallel_with_time_range(tmp_path, jsonl_file, small_chunks):
+    """Test worker processes decode only the chunks in the time range."""
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+    exported = tmp_path / "exported.csv"
+    since = parse_time_bound("2025-07-16T14:22:00Z")
+    until = parse_time_bound("2025-07-16T14:24:00Z")
+
+    stats = export_mcap(mcap, str(exported), "csv", since=since, until=until, workers=2)
+
+    assert stats.chunks_total > 10
+    assert stats.chunks_read < stats.chunks_total / 2
+    with open(exported, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == COLUMNS
+    assert len(rows) == stats.rows == 120
+    assert rows[0]["timestamp"] == "2025-07-16T14:22:00.500000000Z"
+    assert rows[0]["name"] == "requests" and rows[0]["value"] == "120.0"
+    assert json.loads(rows[0]["tags"]) == {"host": "a"}
+    times = [row["timestamp"] for row in rows]
+    assert times == sorted(times)
+
+
+def test_export_compact_file(tmp_path, jsonl_file):
+    """Test compact samples are expanded on export."""
+    mcap = str(tmp_path / "compact.mcap")
+    write_mcap([jsonl_file], mcap, compact=True)
+    exported = tmp_path / "exported.csv"
+
+    stats = export_mcap(mcap, str(exported), "csv", workers=1)
+
+    assert stats.rows == LINE_COUNT
+    with open(exported, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert {row["topic"] for row in rows} == {"vector_sample"}
+    assert {row["name"] for row in rows} == {"cpu", "requests"}
+
+
+def test_export_topic_filter(tmp_path, jsonl_file):
+    """Test unrequested topics are skipped."""
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+
+    stats = export_mcap(mcap, str(tmp_path / "out.jsonl"), topics=["other"])
+
+    assert stats.chunks_read == 0
+    assert stats.rows == 0
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pyarrow") is not None, reason="pyarrow is installed"
+)
+def test_export_parquet_requires_pyarrow(tmp_path, jsonl_file):
+    """Test a clear error when pyarrow is missing."""
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        export_mcap(mcap, str(tmp_path / "out.parquet"), "parquet")
+
+
+def test_export_parquet_round_trips(tmp_path, jsonl_file):
+    """Test Parquet rows keep nanosecond UTC timestamps and JSON tags."""
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+    exported = str(tmp_path / "out.parquet")
+
+    stats = export_mcap(mcap, exported, "parquet", workers=1)
+
+    table = pyarrow.parquet.read_table(exported)
+    assert table.column_names == list(COLUMNS)
+    assert table.schema.field("timestamp").type == pyarrow.timestamp("ns", tz="UTC")
+    assert table.schema.field("tags").type == pyarrow.string()
+    assert table.num_rows == stats.rows == LINE_COUNT
+    rows = table.to_pylist()
+    assert table.column("timestamp")[0].value == parse_time_bound(
+        "2025-07-16T14:20:00.5Z"
+    )
+    assert json.loads(rows[0]["tags"]) == {"host": "a"}
+    assert (rows[0]["name"], rows[0]["type"], rows[0]["value"]) == (
+        "requests",
+        "counter",
+        0.0,
+    )
+
+
+def test_format_timestamp():
+    """Test nanosecond precision is kept."""
+    assert format_timestamp(1_752_675_606_666_956_352) == (
+        "2025-07-16T14:20:06.666956352Z"
+    )
+
+
+def test_export_cli_infers_format(tmp_path, jsonl_file):
+    """Test the export command picks the format from the extension."""
+    mcap = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], mcap)
+    exported = tmp_path / "exported.csv"
+
+    result = CliRunner().invoke(main, ["export", mcap, "-o", str(exported)])
+
+    assert result.exit_code == 0
+    assert exported.read_text().startswith(",".join(COLUMNS))
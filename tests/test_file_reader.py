@@ -2,11 +2,19 @@
 
 import tempfile
 import json
+import os
+import threading
 from pathlib import Path
 
 import pytest
 
-from vector2mcap.file_reader import read_jsonl_file, read_jsonl_files
+from vector2mcap.file_reader import (
+    SEEK_SCAN_BYTES,
+    read_jsonl_file,
+    read_jsonl_files,
+    seek_to_time,
+)
+from vector2mcap.filters import EventFilter, parse_time_bound
 
 
 @pytest.fixture
@@ -89,3 +97,99 @@ def test_read_jsonl_files_with_missing_file(sample_jsonl_file):
     # Should continue with valid files
     assert len(results) == 3
     assert all(result[0] == sample_jsonl_file for result in results)
+
+
+@pytest.fixture
+def sorted_jsonl_file():
+    """Create a large time-sorted JSONL file, one metric per second."""
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+        for second in range(20_000):
+            timestamp = f"2025-07-16T{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}Z"
+            f.write(
+                json.dumps(
+                    {
+                        "metric": {
+                            "name": "utilization",
+                            "tags": {"host": "a"},
+                            "timestamp": timestamp,
+                            "gauge": {"value": second},
+                        }
+                    }
+                )
+                + "\n"
+            )
+        return f.name
+
+
+def test_seek_to_time(sorted_jsonl_file):
+    """Test binary search lands at or just before the wanted line."""
+    since = parse_time_bound("2025-07-16T03:00:00Z")
+
+    with open(sorted_jsonl_file, "rb") as f:
+        offset = seek_to_time(f, since)
+        assert offset > 0
+        lines = f.read(SEEK_SCAN_BYTES + 4096).split(b"\n")
+
+    timestamps = [json.loads(line)["metric"]["gauge"]["value"] for line in lines[:-1]]
+    assert timestamps[0] <= 3 * 3600
+    assert 3 * 3600 in timestamps
+
+
+def test_read_jsonl_file_sorted_time_range(sorted_jsonl_file):
+    """Test a sorted read returns the same window as a full scan."""
+    since = parse_time_bound("2025-07-16T03:00:00Z")
+    until = parse_time_bound("2025-07-16T03:00:10Z")
+
+    sorted_filter = EventFilter(since=since, until=until)
+    seeked = list(read_jsonl_file(sorted_jsonl_file, sorted_filter, sorted_input=True))
+    scanned = list(
+        read_jsonl_file(sorted_jsonl_file, EventFilter(since=since, until=until))
+    )
+
+    assert seeked == scanned
+    assert [r["metric"]["gauge"]["value"] for r in seeked] == list(
+        range(3 * 3600, 3 * 3600 + 10)
+    )
+    # Only the lines near the window are looked at
+    assert sorted_filter.stats.lines_read < 1000
+    assert (
+        sorted_filter.stats.bytes_skipped > 0.9 * Path(sorted_jsonl_file).stat().st_size
+    )
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_read_jsonl_file_sorted_from_fifo(sorted_jsonl_file, tmp_path):
+    """Test a sorted read from a FIFO falls back to scanning it."""
+    fifo = tmp_path / "input.jsonl"
+    os.mkfifo(fifo)
+
+    def feed():
+        try:
+            with open(fifo, "wb") as out:
+                out.write(Path(sorted_jsonl_file).read_bytes())
+        except BrokenPipeError:
+            # The reader stops once it is past the time range
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    event_filter = EventFilter(
+        since=parse_time_bound("2025-07-16T01:00:00Z"),
+        until=parse_time_bound("2025-07-16T01:00:03Z"),
+    )
+    results = list(read_jsonl_file(str(fifo), event_filter, sorted_input=True))
+    writer.join(10)
+
+    assert [r["metric"]["gauge"]["value"] for r in results] == [3600, 3601, 3602]
+    assert event_filter.stats.bytes_skipped == 0
+
+
+def test_read_jsonl_file_sorted_since_before_start(sorted_jsonl_file):
+    """Test seeking to a time before the first line reads from the start."""
+    event_filter = EventFilter(
+        since=parse_time_bound("2025-07-15"),
+        until=parse_time_bound("2025-07-16T00:00:02Z"),
+    )
+    results = list(read_jsonl_file(sorted_jsonl_file, event_filter, sorted_input=True))
+
+    assert [r["metric"]["gauge"]["value"] for r in results] == [0, 1]
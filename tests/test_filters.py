@@ -0,0 +1,183 @@
+"""Tests for ingest-time event filtering."""
+
+import json
+import tempfile
+
+import pytest
+
+from vector2mcap.file_reader import read_jsonl_file
+from vector2mcap.filters import EventFilter, parse_tag, parse_time_bound
+
+
+def make_line(name, host="test-host", timestamp="2025-07-16T14:20:06.666956352Z"):
+    """Build a raw Vector metric line."""
+    return json.dumps(
+        {
+            "metric": {
+                "name": name,
+                "namespace": "vector",
+                "tags": {"host": host, "component_id": "stream"},
+                "timestamp": timestamp,
+                "kind": "absolute",
+                "counter": {"value": 1.0},
+            }
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+@pytest.fixture
+def mixed_jsonl_file():
+    """Create a JSONL file with metrics from two hosts over three seconds."""
+    lines = [
+        make_line("component_received_events_total", "a", "2025-07-16T14:20:06Z"),
+        make_line("component_sent_events_total", "a", "2025-07-16T14:20:07.5Z"),
+        make_line("component_received_events_total", "b", "2025-07-16T14:20:08Z"),
+        make_line("utilization", "b", "2025-07-16T14:20:08.25Z"),
+    ]
+    with tempfile.NamedTemporaryFile(mode="wb", suffix=".jsonl", delete=False) as f:
+        f.write(b"\n".join(lines) + b"\n")
+        return f.name
+
+
+def test_parse_time_bound():
+    """Test parsing ISO 8601 and epoch time bounds."""
+    assert parse_time_bound("1970-01-01T00:00:01Z") == 1_000_000_000
+    assert parse_time_bound("1.5") == 1_500_000_000
+    assert parse_time_bound("1970-01-02") == 86_400 * 1_000_000_000
+    with pytest.raises(ValueError):
+        parse_time_bound("not a time")
+    for value in ("inf", "1e400", "nan"):
+        with pytest.raises(ValueError, match="finite"):
+            parse_time_bound(value)
+
+
+def test_parse_tag():
+    """Test splitting key=value tag filters."""
+    assert parse_tag("host=a") == ("host", "a")
+    assert parse_tag("url=http://x?a=b") == ("url", "http://x?a=b")
+    with pytest.raises(ValueError):
+        parse_tag("host")
+
+
+def test_empty_filter():
+    """Test a filter with no criteria accepts everything."""
+    event_filter = EventFilter()
+    assert event_filter.is_empty
+    assert event_filter.accept_line(make_line("anything"))
+
+
+def test_include_name_prefilter_rejects_without_parsing():
+    """Test lines without the wanted name are rejected on raw bytes."""
+    event_filter = EventFilter(include_names=["utilization"])
+
+    assert not event_filter.accept_line(make_line("component_sent_events_total"))
+    assert event_filter.accept_line(make_line("utilization"))
+    assert event_filter.stats.prefilter_rejected == 1
+
+
+def test_include_name_glob():
+    """Test metric name globs in both stages."""
+    event_filter = EventFilter(include_names=["component_*_total"])
+
+    assert event_filter.accept_line(make_line("component_sent_events_total"))
+    assert not event_filter.accept_line(make_line("utilization"))
+    assert event_filter.accept_event(json.loads(make_line("component_x_total")))
+
+
+def test_prefilter_keeps_every_glob_match():
+    """Test the byte prefilter never rejects a name the exact glob accepts."""
+    cases = {
+        "cpu_[ab]": ["cpu_a", "cpu_b"],
+        "cpu_[!x]": ["cpu_a", "cpu_é"],
+        "cpu_[a-c]?": ["cpu_b1", "cpu_cé"],
+        "[[]cpu]": ["[cpu]"],
+        "cpu[": ["cpu["],
+        'say_"*"': ['say_"hi"'],
+    }
+    for pattern, names in cases.items():
+        event_filter = EventFilter(include_names=[pattern])
+        for name in names:
+            line = make_line(name)
+            assert event_filter.accept_event(json.loads(line)), (pattern, name)
+            assert event_filter.accept_line(line), (pattern, name)
+
+    assert not EventFilter(include_names=["cpu_[ab]"]).accept_line(make_line("cpu_c"))
+
+
+def test_exact_confirmation_after_prefilter():
+    """Test lines that only look like a match are rejected after parsing."""
+    event_filter = EventFilter(tags={"host": "a"})
+    # A nested object carrying the same key/value fools the byte search
+    line = make_line("utilization", host="b").replace(
+        b'"component_id"', b'"note":{"host":"a"},"component_id"'
+    )
+
+    assert event_filter.accept_line(line)
+    assert not event_filter.accept_event(json.loads(line))
+    assert event_filter.stats.filter_rejected == 1
+
+
+def test_exclude_name():
+    """Test excluded names are dropped."""
+    event_filter = EventFilter(exclude_names=["utilization"])
+
+    assert not event_filter.accept_event(json.loads(make_line("utilization")))
+    assert event_filter.accept_event(json.loads(make_line("other")))
+
+
+def test_time_range_prefilter():
+    """Test the prefilter rejects lines outside the range by whole seconds."""
+    event_filter = EventFilter(
+        since=parse_time_bound("2025-07-16T14:20:07Z"),
+        until=parse_time_bound("2025-07-16T14:20:08Z"),
+    )
+
+    assert not event_filter.accept_line(
+        make_line("x", timestamp="2025-07-16T14:20:06.999Z")
+    )
+    assert not event_filter.accept_line(
+        make_line("x", timestamp="2025-07-16T14:20:09Z")
+    )
+    # Same second as the exclusive upper bound: only the exact check can tell
+    boundary = make_line("x", timestamp="2025-07-16T14:20:08Z")
+    assert event_filter.accept_line(boundary)
+    assert not event_filter.accept_event(json.loads(boundary))
+
+
+def test_time_range_non_utc_offset_is_parsed():
+    """Test timestamps with numeric offsets fall through to the exact check."""
+    event_filter = EventFilter(since=parse_time_bound("2025-07-16T14:20:07Z"))
+    line = make_line("x", timestamp="2025-07-16T16:20:06+02:00")
+
+    assert event_filter.accept_line(line)
+    assert not event_filter.accept_event(json.loads(line))
+
+
+def test_read_jsonl_file_with_filter(mixed_jsonl_file):
+    """Test filtering while reading a file."""
+    event_filter = EventFilter(
+        include_names=["component_received_events_total"],
+        tags={"host": "b"},
+    )
+    results = list(read_jsonl_file(mixed_jsonl_file, event_filter))
+
+    assert len(results) == 1
+    assert results[0]["metric"]["tags"]["host"] == "b"
+    assert event_filter.stats.lines_read == 4
+    assert event_filter.stats.prefilter_rejected == 3
+    assert event_filter.stats.accepted == 1
+
+
+def test_read_jsonl_file_time_range(mixed_jsonl_file):
+    """Test reading a time window from a file."""
+    event_filter = EventFilter(
+        since=parse_time_bound("2025-07-16T14:20:07Z"),
+        until=parse_time_bound("2025-07-16T14:20:08.1Z"),
+    )
+    results = list(read_jsonl_file(mixed_jsonl_file, event_filter))
+
+    assert [r["metric"]["timestamp"] for r in results] == [
+        "2025-07-16T14:20:07.5Z",
+        "2025-07-16T14:20:08Z",
+    ]
@@ -81,6 +81,34 @@ def test_json_to_metric_gauge():
     assert result.gauge.value == 100.5
 
 
+def test_json_to_metric_aggregated_histogram():
+    """Test aggregated histogram conversion."""
+    json_obj = {
+        "metric": {
+            "name": "request_duration_seconds",
+            "timestamp": "2025-07-16T14:20:06.666956352Z",
+            "kind": "incremental",
+            "aggregated_histogram": {
+                "buckets": [
+                    {"upper_limit": 0.1, "count": 2},
+                    {"upper_limit": 1.0, "count": 5},
+                ],
+                "count": 7,
+                "sum": 2.5,
+            },
+        }
+    }
+
+    result = json_to_metric(json_obj)
+
+    assert result is not None
+    assert result.WhichOneof("value") == "aggregated_histogram3"
+    histogram = result.aggregated_histogram3
+    assert [(b.upper_limit, b.count) for b in histogram.buckets] == [(0.1, 2), (1.0, 5)]
+    assert histogram.count == 7
+    assert histogram.sum == 2.5
+
+
 def test_json_to_metric_missing_required_field():
     """Test handling missing required fields."""
     json_data = {
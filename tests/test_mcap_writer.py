@@ -0,0 +1,119 @@
+"""Tests for the event writer's serialized write path."""
+
+import io
+
+import pytest
+from mcap.reader import make_reader
+from mcap.records import Message
+from mcap_protobuf.decoder import DecoderFactory
+
+from vector2mcap import compact_pb2, event_pb2
+from vector2mcap.mcap_chunks import ChunkCopyWriter
+from vector2mcap.converter import convert_files
+from vector2mcap.mcap_writer import TOPIC, EventWriter, write_mcap
+from vector2mcap.series import metric_value, series_key
+
+
+def gauge(value, second):
+    """Build a gauge event at the given second past 14:20."""
+    event = event_pb2.EventWrapper()
+    event.metric.name = "cpu"
+    event.metric.timestamp.FromNanoseconds((1_752_675_600 + second) * 10**9)
+    event.metric.gauge.value = value
+    return event
+
+
+def test_add_message_data_matches_message_records():
+    """Test packed message records are identical to mcap's own encoding."""
+    outputs = []
+    for packed in (False, True):
+        stream = io.BytesIO()
+        writer = ChunkCopyWriter(stream, chunk_size=256)
+        writer.start()
+        for index in range(50):
+            log_time, data = 1000 - index * 7, bytes([index]) * (index % 9)
+            if packed:
+                writer.add_message_data(1, log_time, data, log_time + 1, index)
+            else:
+                writer.add_message(
+                    Message(
+                        channel_id=1,
+                        sequence=index,
+                        log_time=log_time,
+                        publish_time=log_time + 1,
+                        data=data,
+                    )
+                )
+        writer.finish()
+        outputs.append(stream.getvalue())
+
+    assert outputs[0] == outputs[1]
+
+
+def test_write_serialized_registers_topics(tmp_path):
+    """Test raw bytes decode on their topics and buffers may be reused."""
+    path = tmp_path / "output.mcap"
+    buffer = bytearray()
+    with open(path, "wb") as f, EventWriter(f) as writer:
+        for second in range(3):
+            buffer[:] = gauge(float(second), second).SerializeToString()
+            writer.write_serialized(TOPIC, buffer, (1_752_675_600 + second) * 10**9)
+        sample = compact_pb2.Sample(series_id=7, gauge=1.5)
+        writer.write_serialized(
+            "samples", sample.SerializeToString(), 10**9, compact_pb2.Sample
+        )
+        assert writer.event_count == 0
+
+        with pytest.raises(ValueError):
+            writer.write_serialized("samples", b"", 10**9)
+
+    with open(path, "rb") as f:
+        reader = make_reader(f, decoder_factories=[DecoderFactory()])
+        decoded = [
+            (channel.topic, proto)
+            for _, channel, _, proto in reader.iter_decoded_messages()
+        ]
+        summary = reader.get_summary()
+
+    assert [topic for topic, _ in decoded] == ["samples", TOPIC, TOPIC, TOPIC]
+    assert [proto.metric.gauge.value for _, proto in decoded[1:]] == [0.0, 1.0, 2.0]
+    assert decoded[0][1].series_id == 7
+    assert summary.statistics.channel_count == 2
+    assert summary.statistics.schema_count == 2
+
+
+def test_write_serialized_event_matches_write_event():
+    """Test serialized events get the same messages and series index."""
+    events = [gauge(float(second % 3), second) for second in range(20)]
+    indexes, messages = [], []
+    for serialized in (False, True):
+        stream = io.BytesIO()
+        writer = EventWriter(stream)
+        for event in events:
+            log_time = event.metric.timestamp.ToNanoseconds()
+            if serialized:
+                writer.write_serialized_event(
+                    event.SerializeToString(),
+                    log_time,
+                    series_key(event.metric),
+                    "gauge",
+                    metric_value(event.metric),
+                )
+            else:
+                writer.write_event(event, log_time)
+        assert writer.event_count == 20
+        indexes.append(writer.series.index_data())
+        writer.finish()
+        stream.seek(0)
+        messages.append([m.data for _, _, m in make_reader(stream).iter_messages()])
+
+    assert indexes[0] == indexes[1]
+    assert messages[0] == messages[1]
+
+
+def test_conversion_options_are_keyword_only(tmp_path):
+    """Test options cannot be passed positionally and silently misbound."""
+    output = str(tmp_path / "out.mcap")
+    for convert in (convert_files, write_mcap):
+        with pytest.raises(TypeError):
+            convert([], output, False)
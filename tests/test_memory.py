@@ -0,0 +1,142 @@
+"""Tests for memory budgets."""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import vector2mcap
+from vector2mcap.cli import main
+from vector2mcap.memory import (
+    DEFAULT_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    MemoryBudget,
+    current_rss,
+    parse_size,
+)
+
+from .conftest import message_count
+
+
+# Bytes of synthetic input streamed through the bounded conversion. Set
+# VECTOR2MCAP_MEMORY_TEST_SIZE (e.g. to "4G") for a long multi-GB run.
+MEMORY_TEST_SIZE = os.environ.get("VECTOR2MCAP_MEMORY_TEST_SIZE", "16M")
+
+# Peak RSS the conversion must stay under, also passed as --max-memory.
+# Without the budget, the open chunks of 32 partitions alone exceed it.
+RSS_BOUND = "48M"
+
+# Prints the peak RSS of a conversion run in a fresh interpreter
+CONVERT_SCRIPT = """
+import json, sys
+from vector2mcap.cli import main
+from vector2mcap.memory import peak_rss
+main(sys.argv[1:], standalone_mode=False)
+print(json.dumps({"peak_rss": peak_rss()}))
+"""
+
+
+def set_line(index, hosts=32, values=100):
+    """Build a Vector set metric with many values, for one of several hosts."""
+    members = ",".join(f'"user-{index % 9973:04d}-{i:03d}"' for i in range(values))
+    return (
+        f'{{"metric":{{"name":"active_users","namespace":"app",'
+        f'"tags":{{"host":"host-{index % hosts}","region":"eu"}},'
+        f'"timestamp":"2025-07-16T{index // 3600 % 24:02d}:{index // 60 % 60:02d}:'
+        f'{index % 60:02d}Z","kind":"absolute","set":{{"values":[{members}]}}}}}}\n'
+    ).encode()
+
+
+def stream_input(path, size):
+    """Write synthetic lines into a FIFO until ``size`` bytes have been sent."""
+    try:
+        with open(path, "wb") as f:
+            written = index = 0
+            while written < size:
+                line = set_line(index)
+                f.write(line)
+                written += len(line)
+                index += 1
+    except BrokenPipeError:
+        pass
+
+
+def test_parse_size():
+    """Test sizes with binary units."""
+    assert parse_size("1048576") == 1024**2
+    assert parse_size("512M") == 512 * 1024**2
+    assert parse_size("1.5GiB") == 1536 * 1024**2
+    assert parse_size("64kb") == 64 * 1024
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_budget_sizes_chunks():
+    """Test chunk buffers shrink with the number of open writers."""
+    budget = MemoryBudget(512 * 1024**2, baseline=64 * 1024**2)
+    assert budget.chunk_size() == DEFAULT_CHUNK_SIZE
+    assert budget.chunk_size(64) < DEFAULT_CHUNK_SIZE
+    assert budget.chunk_size(100_000) == MIN_CHUNK_SIZE
+    assert budget.max_chunk_messages(MIN_CHUNK_SIZE) == 2048
+    with pytest.raises(ValueError):
+        MemoryBudget(65 * 1024**2, baseline=64 * 1024**2)
+
+
+def test_max_memory_cli_output_is_complete(tmp_path):
+    """Test a budgeted partitioned conversion writes every event."""
+    input_file = tmp_path / "input.jsonl"
+    input_file.write_bytes(b"".join(set_line(index, values=3) for index in range(500)))
+    output = tmp_path / "by-host"
+
+    result = CliRunner().invoke(
+        main,
+        [str(input_file), "-o", str(output), "--partition-by", "host"]
+        + ["--max-memory", "1G"],
+    )
+
+    assert result.exit_code == 0
+    assert sum(message_count(path) for path in output.glob("*.mcap")) == 500
+
+    result = CliRunner().invoke(
+        main, [str(input_file), "-o", str(output), "--max-memory", "1K"]
+    )
+    assert result.exit_code != 0
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "mkfifo") or current_rss() is None,
+    reason="needs FIFOs and /proc to measure resident memory",
+)
+def test_peak_rss_stays_under_budget(tmp_path):
+    """Test converting a large input stream stays under a fixed RSS bound."""
+    fifo = tmp_path / "input.jsonl"
+    os.mkfifo(fifo)
+    feeder = threading.Thread(
+        target=stream_input, args=(fifo, parse_size(MEMORY_TEST_SIZE)), daemon=True
+    )
+    feeder.start()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(vector2mcap.__file__).parents[1]), env.get("PYTHONPATH", "")]
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", CONVERT_SCRIPT, str(fifo)]
+        + ["-o", str(tmp_path / "by-host"), "--partition-by", "host"]
+        + ["--max-memory", RSS_BOUND],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=3600,
+    )
+    feeder.join(10)
+
+    assert completed.returncode == 0, completed.stderr
+    peak = json.loads(completed.stdout.strip().splitlines()[-1])["peak_rss"]
+    assert peak < parse_size(RSS_BOUND)
+    assert len(list((tmp_path / "by-host").glob("*.mcap"))) == 32
@@ -0,0 +1,131 @@
+"""Tests for merging MCAP files."""
+
+from pathlib import Path
+
+import pytest
+from mcap.reader import make_reader
+from mcap_protobuf.writer import Writer
+
+from vector2mcap import event_pb2
+from vector2mcap.filters import parse_time_bound
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.merger import merge_mcap
+
+from .conftest import write_lines
+
+
+def make_mcap(tmp_path, name, seconds):
+    """Convert metrics at the given seconds into an MCAP file."""
+    jsonl_path = write_lines(
+        tmp_path / f"{name}.jsonl",
+        seconds,
+        name=name,
+        host="test-host",
+        value_type="counter",
+    )
+    mcap_path = tmp_path / f"{name}.mcap"
+    write_mcap([jsonl_path], str(mcap_path))
+    return str(mcap_path)
+
+
+def read_messages(path):
+    """Return (topic, log_time, metric name) for every message in log order."""
+    with open(path, "rb") as f:
+        reader = make_reader(f, validate_crcs=True)
+        messages = []
+        for schema, channel, message in reader.iter_messages(log_time_order=False):
+            event = event_pb2.EventWrapper()
+            event.ParseFromString(message.data)
+            messages.append((channel.topic, message.log_time, event.metric.name))
+        return messages, reader.get_summary()
+
+
+def test_merge_disjoint_files_copies_chunks(tmp_path):
+    """Test inputs with disjoint time ranges are merged without decompression."""
+    later = make_mcap(tmp_path, "later", [30, 31, 32])
+    earlier = make_mcap(tmp_path, "earlier", [10, 11])
+    output = str(tmp_path / "merged.mcap")
+
+    stats = merge_mcap([later, earlier], output)
+
+    assert stats.chunks_copied == 2
+    assert stats.chunks_rebuilt == 0
+    assert stats.messages == 5
+
+    messages, summary = read_messages(output)
+    assert [m[2] for m in messages] == ["earlier"] * 2 + ["later"] * 3
+    assert summary.statistics.message_count == 5
+    assert summary.statistics.chunk_count == 2
+    assert summary.statistics.channel_count == 1
+    assert summary.statistics.schema_count == 1
+    assert list(summary.statistics.channel_message_counts.values()) == [5]
+
+
+def test_merge_overlapping_files_interleaves(tmp_path):
+    """Test overlapping inputs are decompressed and interleaved by time."""
+    even = make_mcap(tmp_path, "even", [10, 12, 14])
+    odd = make_mcap(tmp_path, "odd", [11, 13])
+    output = str(tmp_path / "merged.mcap")
+
+    stats = merge_mcap([even, odd], output)
+
+    assert stats.chunks_rebuilt == 2
+    messages, summary = read_messages(output)
+    times = [m[1] for m in messages]
+    assert times == sorted(times)
+    assert [m[2] for m in messages] == ["even", "odd", "even", "odd", "even"]
+    assert summary.statistics.message_count == 5
+
+
+def test_merge_concat_keeps_input_order(tmp_path):
+    """Test concatenation copies chunks in the order given."""
+    even = make_mcap(tmp_path, "even", [10, 12, 14])
+    odd = make_mcap(tmp_path, "odd", [11, 13])
+    output = str(tmp_path / "merged.mcap")
+
+    stats = merge_mcap([even, odd], output, interleave=False)
+
+    assert stats.chunks_copied == 2
+    messages, _ = read_messages(output)
+    assert [m[2] for m in messages] == ["even"] * 3 + ["odd"] * 2
+
+
+def test_merge_remaps_channels(tmp_path):
+    """Test inputs with conflicting channel ids are remapped."""
+    converted = make_mcap(tmp_path, "converted", [10, 11])
+    other = str(tmp_path / "other.mcap")
+    with open(other, "wb") as f, Writer(f) as writer:
+        metric = event_pb2.EventWrapper()
+        metric.metric.name = "other"
+        for topic, time in [("other_topic", "14:20:05"), ("vector_event", "14:20:50")]:
+            log_time = parse_time_bound(f"2025-07-16T{time}Z")
+            writer.write_message(
+                topic, metric, log_time=log_time, publish_time=log_time
+            )
+    output = str(tmp_path / "merged.mcap")
+
+    stats = merge_mcap([converted, other], output)
+
+    assert stats.chunks_rebuilt == 1
+    messages, summary = read_messages(output)
+    assert [(m[0], m[2]) for m in messages] == [
+        ("other_topic", "other"),
+        ("vector_event", "converted"),
+        ("vector_event", "converted"),
+        ("vector_event", "other"),
+    ]
+    # The generic writer stores the full schema and this tool a trimmed one,
+    # so each input keeps its own schema and vector_event channel
+    assert summary.statistics.channel_count == 3
+    assert summary.statistics.schema_count == 2
+
+
+def test_merge_rejects_truncated_input(tmp_path):
+    """Test an input cut off before its summary section is rejected."""
+    complete = make_mcap(tmp_path, "complete", [10])
+    truncated = tmp_path / "truncated.mcap"
+    data = Path(complete).read_bytes()
+    truncated.write_bytes(data[: len(data) // 2])
+
+    with pytest.raises(Exception):
+        merge_mcap([complete, str(truncated)], str(tmp_path / "merged.mcap"))
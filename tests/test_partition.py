@@ -0,0 +1,127 @@
+"""Tests for partitioning output by tag."""
+
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import event_pb2
+from vector2mcap.cli import main
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.partition import partition_file_name
+from vector2mcap.series import read_series_index
+
+from .conftest import metric_line
+
+
+HOSTS = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+
+def write_input(tmp_path, hosts=HOSTS, seconds=10, value=None):
+    """Write samples that cycle through the hosts every second."""
+    path = tmp_path / "input.jsonl"
+    path.write_text(
+        "".join(
+            metric_line(second, value=value, tags={"host": host} if host else {})
+            for second in range(seconds)
+            for host in hosts
+        )
+    )
+    return str(path)
+
+
+def read_hosts_and_times(path):
+    """Return the host tags and log times of every message in a file."""
+    with open(path, "rb") as f:
+        hosts, times = set(), []
+        for _, _, message in make_reader(f, validate_crcs=True).iter_messages():
+            event = event_pb2.EventWrapper()
+            event.ParseFromString(message.data)
+            hosts.add(event.metric.tags_v1.get("host"))
+            times.append(message.log_time)
+        return hosts, times
+
+
+def test_partition_by_host(tmp_path):
+    """Test each host gets its own file with all of its events."""
+    output_dir = tmp_path / "out"
+    write_mcap([write_input(tmp_path)], str(output_dir), partition_by="host")
+
+    assert sorted(path.name for path in output_dir.iterdir()) == sorted(
+        f"{host}.mcap" for host in HOSTS
+    )
+    for host in HOSTS:
+        hosts, times = read_hosts_and_times(output_dir / f"{host}.mcap")
+        assert hosts == {host}
+        assert len(times) == 10
+
+
+def test_partition_pool_evicts_and_merges_segments(tmp_path):
+    """Test partitions reopened after eviction are merged into one file."""
+    output_dir = tmp_path / "out"
+    write_mcap(
+        [write_input(tmp_path)], str(output_dir), partition_by="host", max_open_files=2
+    )
+
+    assert sorted(path.name for path in output_dir.iterdir()) == sorted(
+        f"{host}.mcap" for host in HOSTS
+    )
+    for host in HOSTS:
+        hosts, times = read_hosts_and_times(output_dir / f"{host}.mcap")
+        assert hosts == {host}
+        assert times == sorted(times) and len(times) == 10
+        assert read_series_index(str(output_dir / f"{host}.mcap"))[0]["count"] == 10
+
+
+def test_partition_untagged_and_unsafe_values(tmp_path):
+    """Test missing tags and unsafe tag values get distinct safe names."""
+    output_dir = tmp_path / "out"
+    write_mcap(
+        [write_input(tmp_path, hosts=["", "_untagged", "a/b", "a_b", ".."], seconds=2)],
+        str(output_dir),
+        partition_by="host",
+    )
+
+    names = sorted(path.name for path in output_dir.iterdir())
+    assert len(names) == 5
+    assert "_untagged.mcap" in names
+    assert "a_b.mcap" in names
+    assert all("/" not in name and not name.startswith(".") for name in names)
+
+
+def test_partition_file_name():
+    """Test safe values are kept and unsafe ones are disambiguated."""
+    assert partition_file_name("node-1.example") == "node-1.example"
+    assert partition_file_name("a/b") != partition_file_name("a:b")
+    assert partition_file_name("a/b").startswith("a_b-")
+    assert partition_file_name(None) == "_untagged"
+    assert partition_file_name("_untagged") != "_untagged"
+    hashed = partition_file_name("a/b")
+    assert partition_file_name(hashed) != hashed
+
+
+def test_partition_dedupe_survives_eviction(tmp_path):
+    """Test unchanged samples stay suppressed after a partition is reopened."""
+    output_dir = tmp_path / "out"
+    write_mcap(
+        [write_input(tmp_path, value=1)],
+        str(output_dir),
+        partition_by="host",
+        max_open_files=2,
+        dedupe=True,
+    )
+
+    for host in HOSTS:
+        assert read_hosts_and_times(output_dir / f"{host}.mcap")[1] == [
+            1752675600 * 10**9
+        ]
+
+
+def test_partition_cli(tmp_path):
+    """Test --partition-by on the command line."""
+    output_dir = tmp_path / "out"
+    result = CliRunner().invoke(
+        main,
+        [write_input(tmp_path), "-o", str(output_dir), "--partition-by", "host"],
+    )
+
+    assert result.exit_code == 0
+    assert len(list(output_dir.iterdir())) == len(HOSTS)
@@ -0,0 +1,142 @@
+"""Tests for recovering truncated MCAP output."""
+
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import event_pb2
+from vector2mcap.cli import main
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.merger import merge_mcap
+from vector2mcap.recovery import read_checkpoint, recover_mcap
+
+from .conftest import write_lines
+
+
+LINE_COUNT = 1000
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    """Create a JSONL file of gauges whose values count up from 0."""
+    return write_lines(
+        tmp_path / "input.jsonl", range(LINE_COUNT), name="gauge", tags={}
+    )
+
+
+def gauge_values(path):
+    """Return the gauge value of every message in the file."""
+    with open(path, "rb") as f:
+        reader = make_reader(f, validate_crcs=True)
+        values = []
+        for _, _, message in reader.iter_messages(log_time_order=False):
+            event = event_pb2.EventWrapper()
+            event.ParseFromString(message.data)
+            values.append(int(event.metric.gauge.value))
+        return values
+
+
+def truncate(path, fraction):
+    """Cut a file down to a fraction of its size, returning the new path."""
+    data = Path(path).read_bytes()
+    truncated = Path(path).with_suffix(".truncated.mcap")
+    truncated.write_bytes(data[: int(len(data) * fraction)])
+    return str(truncated)
+
+
+def test_recover_and_resume(tmp_path, jsonl_file):
+    """Test a truncated conversion can be recovered, resumed and merged."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], output, checkpoint_interval=100)
+    truncated = truncate(output, 0.5)
+
+    recovered = str(tmp_path / "recovered.mcap")
+    result = recover_mcap(truncated, recovered)
+
+    assert result.truncated
+    checkpoint = result.checkpoint
+    assert checkpoint is not None
+    assert checkpoint.message_count % 100 == 0
+    assert 0 < checkpoint.message_count < LINE_COUNT
+    assert checkpoint.line_number == checkpoint.message_count
+    assert result.messages_recovered == checkpoint.message_count
+    assert gauge_values(recovered) == list(range(checkpoint.message_count))
+    assert read_checkpoint(recovered) == checkpoint
+
+    rest = str(tmp_path / "rest.mcap")
+    write_mcap([jsonl_file], rest, resume_from=checkpoint)
+    assert gauge_values(rest) == list(range(checkpoint.message_count, LINE_COUNT))
+
+    merged = str(tmp_path / "merged.mcap")
+    merge_mcap([recovered, rest], merged)
+    assert gauge_values(merged) == list(range(LINE_COUNT))
+
+
+def test_recover_without_checkpoints(tmp_path, jsonl_file):
+    """Test every complete chunk is kept when there are no checkpoints."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], output, checkpoint_interval=0)
+    # Cut into the summary section, so the data section is intact
+    truncated = truncate(output, 0.99)
+
+    recovered = str(tmp_path / "recovered.mcap")
+    result = recover_mcap(truncated, recovered)
+
+    assert result.checkpoint is None
+    assert result.chunks_dropped == 0
+    assert gauge_values(recovered) == list(range(LINE_COUNT))
+
+
+def test_recover_complete_file(tmp_path, jsonl_file):
+    """Test recovering an intact file keeps every message."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], output, checkpoint_interval=100)
+
+    recovered = str(tmp_path / "recovered.mcap")
+    result = recover_mcap(output, recovered)
+
+    assert not result.truncated
+    assert result.checkpoint is None
+    assert result.messages_recovered == LINE_COUNT
+    assert gauge_values(recovered) == list(range(LINE_COUNT))
+
+
+def test_recover_rejects_non_mcap(tmp_path, jsonl_file):
+    """Test a file that is not MCAP is rejected."""
+    with pytest.raises(Exception):
+        recover_mcap(jsonl_file, str(tmp_path / "recovered.mcap"))
+
+
+def test_resume_rejects_unknown_file(tmp_path, jsonl_file):
+    """Test resuming with inputs that do not contain the checkpoint's file."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], output, checkpoint_interval=100)
+    recovered = str(tmp_path / "recovered.mcap")
+    checkpoint = recover_mcap(truncate(output, 0.5), recovered).checkpoint
+
+    other = tmp_path / "other.jsonl"
+    other.write_text("")
+    with pytest.raises(ValueError):
+        write_mcap([str(other)], str(tmp_path / "rest.mcap"), resume_from=checkpoint)
+
+
+def test_recover_cli(tmp_path, jsonl_file):
+    """Test the recover and convert --resume-from commands."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([jsonl_file], output, checkpoint_interval=100)
+    truncated = truncate(output, 0.5)
+    recovered = str(tmp_path / "recovered.mcap")
+    rest = str(tmp_path / "rest.mcap")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["recover", truncated, "-o", recovered])
+    assert result.exit_code == 0
+    assert "Resume position" in result.output
+
+    result = runner.invoke(
+        main, ["convert", jsonl_file, "-o", rest, "--resume-from", recovered]
+    )
+    assert result.exit_code == 0
+    assert len(gauge_values(recovered)) + len(gauge_values(rest)) == LINE_COUNT
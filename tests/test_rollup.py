@@ -0,0 +1,207 @@
+"""Tests for streaming rollups."""
+
+import pytest
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import event_pb2
+from vector2mcap.cli import main
+from vector2mcap.mcap_writer import ROLLUP_TOPIC, TOPIC, write_mcap
+from vector2mcap.rollup import ROLLUP_TAG, Rollup
+
+from .conftest import write_lines
+
+
+SECOND = 1_000_000_000
+
+START = 1_752_675_600 * SECOND
+
+
+def make_metric(seconds, value_type="gauge", value=0.0, incremental=False):
+    """Build a metric at START plus the given number of seconds."""
+    metric = event_pb2.Metric(name="m", namespace="vector")
+    metric.tags_v1["host"] = "a"
+    metric.timestamp.FromNanoseconds(START + int(seconds * SECOND))
+    metric.kind = (
+        event_pb2.Metric.Kind.Incremental
+        if incremental
+        else event_pb2.Metric.Kind.Absolute
+    )
+    if value_type in ("gauge", "counter"):
+        getattr(metric, value_type).value = value
+    return metric
+
+
+def by_aggregate(rollups):
+    """Map each rollup's aggregate tag to the rollup."""
+    return {metric.tags_v1[ROLLUP_TAG]: metric for metric in rollups}
+
+
+def test_gauge_window():
+    """Test gauges roll up to last, min, max and mean."""
+    rollup = Rollup(10 * SECOND)
+    for seconds, value in [(0, 4.0), (3, 1.0), (6, 7.0)]:
+        assert rollup.add(make_metric(seconds, value=value)) == []
+
+    rollups = rollup.add(make_metric(10, value=0.0))
+
+    aggregates = by_aggregate(rollups)
+    assert {k: v.gauge.value for k, v in aggregates.items()} == {
+        "last": 7.0,
+        "min": 1.0,
+        "max": 7.0,
+        "mean": 4.0,
+    }
+    last = aggregates["last"]
+    assert last.timestamp.ToNanoseconds() == START
+    assert last.interval_ms == 10_000
+    assert last.tags_v1["host"] == "a"
+    assert rollup.stats.windows_closed == 1
+
+
+def test_counter_windows():
+    """Test absolute counters keep the last value and incremental ones sum."""
+    rollup = Rollup(10 * SECOND)
+    for seconds in range(5):
+        rollup.add(make_metric(seconds, "counter", 100.0 + seconds))
+        rollup.add(make_metric(seconds, "counter", 2.0, incremental=True))
+
+    rollups = rollup.flush()
+
+    assert len(rollups) == 2
+    absolute, incremental = rollups
+    assert absolute.tags_v1[ROLLUP_TAG] == "last"
+    assert absolute.counter.value == 104.0
+    assert incremental.tags_v1[ROLLUP_TAG] == "sum"
+    assert incremental.counter.value == 10.0
+    assert incremental.kind == event_pb2.Metric.Kind.Incremental
+
+
+def test_histogram_buckets_merge():
+    """Test incremental histogram buckets are summed by upper limit."""
+    rollup = Rollup(10 * SECOND)
+    for seconds, counts in [(0, [(1.0, 1), (5.0, 2)]), (1, [(0.5, 4), (1.0, 3)])]:
+        metric = make_metric(seconds, "aggregated_histogram3", incremental=True)
+        histogram = metric.aggregated_histogram3
+        for upper_limit, count in counts:
+            histogram.buckets.add(upper_limit=upper_limit, count=count)
+        histogram.count = sum(count for _, count in counts)
+        histogram.sum = 1.5
+        rollup.add(metric)
+
+    (merged,) = rollup.flush()
+
+    histogram = merged.aggregated_histogram3
+    assert [(b.upper_limit, b.count) for b in histogram.buckets] == [
+        (0.5, 4),
+        (1.0, 4),
+        (5.0, 2),
+    ]
+    assert histogram.count == 10
+    assert histogram.sum == 3.0
+
+
+def test_lateness_and_late_samples():
+    """Test windows stay open for the lateness, then late samples are dropped."""
+    rollup = Rollup(10 * SECOND, lateness=5 * SECOND)
+    rollup.add(make_metric(1, value=1.0))
+    assert rollup.add(make_metric(12, value=1.0)) == []
+    # Within the lateness: still joins the first window
+    assert rollup.add(make_metric(9, value=3.0)) == []
+
+    closed = rollup.add(make_metric(15, value=1.0))
+    assert by_aggregate(closed)["max"].gauge.value == 3.0
+
+    assert rollup.add(make_metric(2, value=9.0)) == []
+    assert rollup.stats.late_samples == 1
+
+
+def test_rollup_keeps_input_tags():
+    """Test a user's rollup tag is kept and already tagged samples are skipped."""
+    rollup = Rollup(10 * SECOND)
+    metric = make_metric(0, value=1.0)
+    metric.tags_v1["rollup"] = "user"
+    rollup.add(metric)
+    tagged = make_metric(1, value=5.0)
+    tagged.tags_v1[ROLLUP_TAG] = "max"
+    assert rollup.add(tagged) == []
+
+    rollups = rollup.flush()
+    assert {metric.tags_v1["rollup"] for metric in rollups} == {"user"}
+    assert by_aggregate(rollups)["max"].gauge.value == 1.0
+    assert rollup.stats.tagged_samples == 1
+
+
+def test_rollup_rejects_empty_window():
+    """Test a non-positive window is rejected."""
+    with pytest.raises(ValueError):
+        Rollup(0)
+
+
+def write_gauges(tmp_path, host="a", seconds=range(120)):
+    """Write one-second gauge samples, two minutes of them by default."""
+    return write_lines(tmp_path / f"{host}.jsonl", seconds, host=host)
+
+
+def topic_counts(path):
+    """Count messages per topic."""
+    with open(path, "rb") as f:
+        counts = {}
+        for _, channel, _ in make_reader(f).iter_messages():
+            counts[channel.topic] = counts.get(channel.topic, 0) + 1
+        return counts
+
+
+def test_write_mcap_rollup(tmp_path):
+    """Test raw and rolled-up topics are both written."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([write_gauges(tmp_path)], output, rollup=Rollup(60 * SECOND))
+
+    # Two windows of four aggregates each
+    assert topic_counts(output) == {TOPIC: 120, ROLLUP_TOPIC: 8}
+
+
+def test_rollup_only_cli(tmp_path):
+    """Test --rollup-only writes just the rollups."""
+    output = str(tmp_path / "output.mcap")
+    result = CliRunner().invoke(
+        main,
+        [write_gauges(tmp_path), "-o", output, "--rollup", "30", "--rollup-only"],
+    )
+
+    assert result.exit_code == 0
+    assert topic_counts(output) == {ROLLUP_TOPIC: 16}
+
+
+def test_rollup_only_requires_rollup(tmp_path):
+    """Test --rollup-only on its own is rejected."""
+    result = CliRunner().invoke(
+        main, [write_gauges(tmp_path), "-o", str(tmp_path / "o.mcap"), "--rollup-only"]
+    )
+    assert result.exit_code != 0
+
+
+def test_rollup_per_host_files_over_the_same_span(tmp_path):
+    """Test files read one after another do not close each other's windows."""
+    output = str(tmp_path / "output.mcap")
+    inputs = [write_gauges(tmp_path, host) for host in ("a", "b")]
+    result = CliRunner().invoke(
+        main, inputs + ["-o", output, "--rollup", "60", "--rollup-only"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "dropped" not in result.output
+    # Two hosts, two windows of four aggregates each
+    assert topic_counts(output) == {ROLLUP_TOPIC: 16}
+
+
+def test_late_samples_are_reported_without_verbose(tmp_path):
+    """Test samples behind their series' watermark are dropped with a warning."""
+    path = write_gauges(tmp_path, seconds=[*range(90), 5])
+    result = CliRunner().invoke(
+        main,
+        [path, "-o", str(tmp_path / "output.mcap"), "--rollup", "60", "--rollup-only"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Warning: dropped 1 samples" in result.output
@@ -0,0 +1,149 @@
+"""Tests for preview sampling."""
+
+from collections import Counter
+
+import pytest
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import event_pb2
+from vector2mcap.cli import main
+from vector2mcap.file_reader import read_jsonl_ranges
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.sampling import EveryNthSampler, RangeSampling, ReservoirSampler
+
+from .conftest import message_count, metric_line
+
+
+def make_event(host, second):
+    """Build a gauge event for a host at the given second past 14:20."""
+    event = event_pb2.EventWrapper()
+    event.metric.name = "cpu"
+    event.metric.tags_v1["host"] = host
+    event.metric.timestamp.FromNanoseconds((1_752_675_600 + second) * 10**9)
+    event.metric.gauge.value = second
+    return event
+
+
+def write_input(tmp_path, lines=4000):
+    """Write a file of numbered gauge samples."""
+    path = tmp_path / "input.jsonl"
+    path.write_text(
+        "".join(metric_line(index, host=f"h{index % 4}") for index in range(lines))
+    )
+    return str(path)
+
+
+def test_every_nth_sampler_per_series():
+    """Test each series keeps its first sample and every Nth after it."""
+    sampler = EveryNthSampler(4)
+    kept = []
+    for second in range(10):
+        for host in ("a", "b"):
+            kept.extend(sampler.add(make_event(host, second)))
+
+    assert [(e.metric.tags_v1["host"], e.metric.gauge.value) for e in kept] == [
+        ("a", 0),
+        ("b", 0),
+        ("a", 4),
+        ("b", 4),
+        ("a", 8),
+        ("b", 8),
+    ]
+    assert sampler.flush() == []
+    assert sampler.stats.seen == 20 and sampler.stats.kept == 6
+
+
+def test_reservoir_sampler():
+    """Test reservoirs hold a bounded, time-ordered sample of each series."""
+    sampler = ReservoirSampler(5, seed=3)
+    for second in range(200):
+        assert sampler.add(make_event("a", second)) == []
+    for second in range(3):
+        sampler.add(make_event("b", second))
+
+    kept = sampler.flush()
+
+    hosts = Counter(event.metric.tags_v1["host"] for event in kept)
+    assert hosts == {"a": 5, "b": 3}
+    times = [event.metric.timestamp.ToNanoseconds() for event in kept]
+    assert times == sorted(times)
+    # Later samples make it into the reservoir, not just the first five
+    assert (
+        max(e.metric.gauge.value for e in kept if e.metric.tags_v1["host"] == "a") > 5
+    )
+
+
+def test_samplers_reject_empty_sizes():
+    """Test sizes below one are rejected."""
+    with pytest.raises(ValueError):
+        EveryNthSampler(0)
+    with pytest.raises(ValueError):
+        ReservoirSampler(0)
+    with pytest.raises(ValueError):
+        RangeSampling(0)
+
+
+def test_range_sampling_ranges():
+    """Test ranges are spread evenly, or cover a small file whole."""
+    assert RangeSampling(4, 100).ranges(300) == [(0, 300)]
+    assert RangeSampling(4, 10).ranges(1000) == [
+        (0, 10),
+        (250, 260),
+        (500, 510),
+        (750, 760),
+    ]
+
+
+def test_read_jsonl_ranges_reads_whole_lines(tmp_path):
+    """Test only lines in the ranges are read, each of them whole."""
+    path = write_input(tmp_path)
+    size = (tmp_path / "input.jsonl").stat().st_size
+
+    events = list(read_jsonl_ranges(path, RangeSampling(4, 1000)))
+
+    values = [event["metric"]["gauge"]["value"] for event in events]
+    assert 0 < len(values) < 4000 / 10
+    assert values[0] == 0
+    # A range starts in the last quarter of the file
+    assert values[-1] > 3000
+    line_size = size / 4000
+    assert len(values) == pytest.approx(4 * 1000 / line_size, abs=8)
+
+
+def test_write_mcap_with_sampling(tmp_path):
+    """Test range and per-series sampling together produce a small preview."""
+    output = str(tmp_path / "preview.mcap")
+    write_mcap(
+        [write_input(tmp_path)],
+        output,
+        sampler=EveryNthSampler(5),
+        range_sampling=RangeSampling(8, 2000),
+    )
+
+    with open(output, "rb") as f:
+        reader = make_reader(f)
+        count = reader.get_summary().statistics.message_count
+        hosts = {
+            event_pb2.EventWrapper.FromString(message.data).metric.tags_v1["host"]
+            for _, _, message in reader.iter_messages()
+        }
+    assert 0 < count < 4000 / 20
+    assert hosts == {"h0", "h1", "h2", "h3"}
+
+
+def test_sampling_cli(tmp_path):
+    """Test --sample-reservoir and the conflicting option check."""
+    input_file = write_input(tmp_path, lines=400)
+    output = str(tmp_path / "preview.mcap")
+    runner = CliRunner()
+
+    result = runner.invoke(main, [input_file, "-o", output, "--sample-reservoir", "10"])
+    assert result.exit_code == 0
+    assert message_count(output) == 40
+
+    result = runner.invoke(
+        main,
+        [input_file, "-o", output, "--sample-every", "2", "--sample-reservoir", "2"],
+    )
+    assert result.exit_code != 0
@@ -0,0 +1,107 @@
+"""Tests for profiling inputs."""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from vector2mcap.cli import main
+from vector2mcap.filters import parse_time_bound
+from vector2mcap.scan import HyperLogLog, scan_file, scan_files
+
+from .conftest import metric_line
+
+
+def profiled_line(host, second, value_type="gauge", kind="absolute"):
+    """Build a line half a second past the given second, named after its type."""
+    return metric_line(
+        second + 0.5,
+        f"cpu_{value_type}",
+        "a" if value_type == "set" else 1.0,
+        tags={"host": host, "region": "eu"},
+        value_type=value_type,
+        kind=kind,
+    )
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    """Write two files with 50 series, some malformed lines and mixed types."""
+    first = tmp_path / "a.jsonl"
+    first.write_text(
+        "".join(profiled_line(f"h{i % 25}", 30 - i % 30) for i in range(100))
+        + "not json\n"
+        + '{"log":"message"}\n'
+        + "\n"
+    )
+    second = tmp_path / "b.jsonl"
+    second.write_text(
+        "".join(
+            profiled_line(f"h{i}", 40 + i % 5, "set", "incremental") for i in range(25)
+        )
+        + profiled_line("h0", 50, "distribution")
+    )
+    return [str(first), str(second)]
+
+
+def test_scan_file(input_files):
+    """Test counts, time span and malformed lines of one file."""
+    profile = scan_file(input_files[0])
+
+    assert profile.lines == 102
+    assert profile.events == 100
+    assert profile.malformed == 2
+    assert profile.start_time == parse_time_bound("2025-07-16T14:20:01.5Z")
+    assert profile.end_time == parse_time_bound("2025-07-16T14:20:30.5Z")
+    assert profile.series.estimate() == 25
+    assert profile.tag_values["region"].estimate() == 1
+
+
+def test_scan_files_merges_in_parallel(input_files):
+    """Test per-file profiles are merged across worker processes."""
+    result = scan_files(input_files, workers=2)
+
+    assert [file.path for file in result.files] == input_files
+    total = result.total
+    assert total.files == 2
+    assert total.events == 126
+    assert total.unsupported == 1
+    assert total.series.estimate() == 51
+    assert total.tag_values["host"].estimate() == 25
+    assert total.value_types == {"gauge": 100, "set": 25, "distribution": 1}
+    assert total.kinds == {"absolute": 101, "incremental": 25}
+    assert total.end_time == parse_time_bound("2025-07-16T14:20:50.5Z")
+
+
+def test_hyperloglog_estimate_and_merge():
+    """Test large estimates are close and merging counts shared items once."""
+    first, second = HyperLogLog(), HyperLogLog()
+    for i in range(60_000):
+        first.add(f"series-{i}".encode())
+    for i in range(40_000, 100_000):
+        second.add(f"series-{i}".encode())
+
+    first.merge(second)
+
+    assert abs(first.estimate() - 100_000) < 3_000
+    with pytest.raises(ValueError):
+        first.merge(HyperLogLog(10))
+
+
+def test_scan_cli_json(input_files):
+    """Test the JSON profile printed by the scan command."""
+    result = CliRunner().invoke(main, ["scan", *input_files, "--json", "--top", "1"])
+
+    assert result.exit_code == 0
+    profile = json.loads(result.output)
+    assert profile["events"] == 126
+    assert profile["top_names"] == {"cpu_gauge": 100}
+    assert profile["per_file"][input_files[0]]["malformed"] == 2
+
+
+def test_scan_cli_table(input_files):
+    """Test the human-readable report."""
+    result = CliRunner().invoke(main, ["scan", *input_files])
+
+    assert result.exit_code == 0
+    assert "Series (estimated): 51" in result.output
@@ -0,0 +1,79 @@
+"""Tests for the trimmed protobuf schemas."""
+
+from google.protobuf.descriptor_pb2 import FileDescriptorSet
+from mcap.reader import make_reader
+from mcap_protobuf.decoder import DecoderFactory
+from mcap_protobuf.schema import build_file_descriptor_set
+
+from vector2mcap import compact_pb2, event_pb2
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.schema import schema_data
+
+
+def write_input(tmp_path):
+    """Write one event of every converted value type."""
+    path = tmp_path / "input.jsonl"
+    path.write_text(
+        '{"metric":{"name":"requests","namespace":"app","tags":{"host":"a"},'
+        '"timestamp":"2025-07-16T14:20:00Z","kind":"incremental",'
+        '"counter":{"value":3.0}}}\n'
+        '{"metric":{"name":"cpu","tags":{"host":"a"},'
+        '"timestamp":"2025-07-16T14:20:01Z","kind":"absolute",'
+        '"gauge":{"value":0.5}}}\n'
+        '{"metric":{"name":"users","timestamp":"2025-07-16T14:20:02Z",'
+        '"kind":"incremental","set":{"values":["x","y"]}}}\n'
+        '{"metric":{"name":"latency","timestamp":"2025-07-16T14:20:03Z",'
+        '"kind":"absolute","aggregated_histogram":{"buckets":'
+        '[{"upper_limit":0.1,"count":2},{"upper_limit":1.0,"count":5}],'
+        '"count":7,"sum":2.5}}}\n'
+    )
+    return str(path)
+
+
+def test_schema_is_trimmed():
+    """Test the EventWrapper schema leaves out logs, traces and unused types."""
+    descriptor_set = FileDescriptorSet.FromString(schema_data(event_pb2.EventWrapper))
+    event_file = descriptor_set.file[-1]
+    messages = {message.name: message for message in event_file.message_type}
+
+    assert [file.name for file in descriptor_set.file] == [
+        "google/protobuf/timestamp.proto",
+        event_file.name,
+    ]
+    assert [field.name for field in messages["EventWrapper"].field] == ["metric"]
+    assert "Log" not in messages and "Distribution2" not in messages
+    assert "HistogramBucket3" in messages
+    full_size = len(
+        build_file_descriptor_set(event_pb2.EventWrapper).SerializeToString()
+    )
+    assert len(schema_data(event_pb2.EventWrapper)) < full_size / 2
+
+
+def test_schema_data_is_cached():
+    """Test each message type is serialized once and shared."""
+    assert schema_data(compact_pb2.Sample) is schema_data(compact_pb2.Sample)
+    assert schema_data(event_pb2.EventWrapper) is schema_data(event_pb2.EventWrapper)
+
+
+def test_trimmed_schema_decodes_every_value_type(tmp_path):
+    """Test messages written with the trimmed schema decode completely."""
+    output = str(tmp_path / "output.mcap")
+    write_mcap([write_input(tmp_path)], output)
+
+    with open(output, "rb") as f:
+        reader = make_reader(f, decoder_factories=[DecoderFactory()])
+        decoded = [
+            (message.data, proto)
+            for _, _, message, proto in reader.iter_decoded_messages()
+        ]
+
+    assert len(decoded) == 4
+    for data, proto in decoded:
+        # The trimmed schema loses nothing that was written
+        assert proto.SerializeToString() == data
+    metrics = [proto.metric for _, proto in decoded]
+    assert metrics[0].namespace == "app" and metrics[0].counter.value == 3.0
+    assert metrics[0].kind == event_pb2.Metric.Incremental
+    assert list(metrics[2].set.values) == ["x", "y"]
+    assert metrics[3].aggregated_histogram3.buckets[1].count == 5
+    assert metrics[3].timestamp.seconds == 1_752_675_603
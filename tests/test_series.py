@@ -0,0 +1,187 @@
+"""Tests for per-series statistics and the series index."""
+
+import math
+
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap import event_pb2
+from vector2mcap.cli import main
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.merger import merge_mcap
+from vector2mcap.series import (
+    SERIES_INDEX_NAME,
+    SERIES_SUMMARY_METADATA_NAME,
+    Deduplicator,
+    SeriesTable,
+    read_series_index,
+)
+
+from .conftest import metric_line, write_lines
+
+
+def make_metric(name, value, tags=None, value_type="gauge"):
+    """Build a Metric with a scalar value."""
+    metric = event_pb2.Metric(name=name, namespace="vector")
+    metric.tags_v1.update(tags or {"host": "a"})
+    getattr(metric, value_type).value = value
+    return metric
+
+
+def test_series_table_statistics():
+    """Test counts, time range and value range per series."""
+    table = SeriesTable()
+    assert table.observe(make_metric("cpu", 2.0), 20) == 0
+    assert table.observe(make_metric("cpu", 5.0), 10) == 0
+    assert table.observe(make_metric("cpu", 3.0), 30) == 0
+    assert table.observe(make_metric("cpu", 1.0, {"host": "b"}), 15) == 1
+
+    assert len(table) == 2
+    rows = list(table.rows())
+    assert rows[0] == {
+        "name": "cpu",
+        "namespace": "vector",
+        "tags": {"host": "a"},
+        "type": "gauge",
+        "count": 3,
+        "first_time": 10,
+        "last_time": 30,
+        "min": 2.0,
+        "max": 5.0,
+        "last": 3.0,
+    }
+    assert rows[1]["tags"] == {"host": "b"}
+    assert table.summary_metadata() == {
+        "series_count": "2",
+        "message_count": "4",
+        "start_time": "10",
+        "end_time": "30",
+    }
+
+
+def test_series_key_ignores_tag_order():
+    """Test the same tags in a different order map to the same series."""
+    table = SeriesTable()
+    first = table.series_id(make_metric("cpu", 1.0, {"a": "1", "b": "2"}))
+    second = table.series_id(make_metric("cpu", 1.0, {"b": "2", "a": "1"}))
+    assert first == second
+
+
+def test_series_without_scalar_value():
+    """Test sets have no value range."""
+    table = SeriesTable()
+    metric = event_pb2.Metric(name="users")
+    metric.set.values.extend(["x", "y"])
+    table.observe(metric, 1)
+
+    row = next(table.rows())
+    assert row["type"] == "set"
+    assert row["min"] is None and row["max"] is None and row["last"] is None
+    assert math.isnan(table.last_values[0])
+
+
+def test_write_mcap_stores_series_index(tmp_path):
+    """Test the index is readable from the summary section."""
+    jsonl_path = tmp_path / "input.jsonl"
+    jsonl_path.write_text(
+        metric_line(1, "cpu", 0.5)
+        + metric_line(2, "cpu", 0.7)
+        + metric_line(3, "cpu", 0.1, host="b")
+        + metric_line(4, "mem", 100)
+    )
+    output = str(tmp_path / "output.mcap")
+    write_mcap([str(jsonl_path)], output)
+
+    with open(output, "rb") as f:
+        summary = make_reader(f).get_summary()
+    assert [index.name for index in summary.attachment_indexes] == [SERIES_INDEX_NAME]
+    assert [index.name for index in summary.metadata_indexes] == [
+        SERIES_SUMMARY_METADATA_NAME
+    ]
+
+    rows = read_series_index(output)
+    assert [(row["name"], row["tags"]["host"], row["count"]) for row in rows] == [
+        ("cpu", "a", 2),
+        ("cpu", "b", 1),
+        ("mem", "a", 1),
+    ]
+    assert rows[0]["min"] == 0.5 and rows[0]["max"] == 0.7 and rows[0]["last"] == 0.7
+
+
+def test_read_series_index_combines_merged_inputs(tmp_path):
+    """Test merged files report one row per series."""
+    outputs = []
+    for name, seconds in [("early", [1, 2]), ("late", [30])]:
+        jsonl_path = write_lines(tmp_path / f"{name}.jsonl", seconds)
+        outputs.append(str(tmp_path / f"{name}.mcap"))
+        write_mcap([jsonl_path], outputs[-1])
+    merged = str(tmp_path / "merged.mcap")
+    merge_mcap(outputs, merged)
+
+    rows = read_series_index(merged)
+    assert len(rows) == 1
+    assert rows[0]["count"] == 3
+    assert rows[0]["min"] == 1 and rows[0]["max"] == 30 and rows[0]["last"] == 30
+
+
+def test_deduplicator_suppresses_unchanged_absolute_samples():
+    """Test repeats are dropped until the value changes or the heartbeat passes."""
+    table = SeriesTable()
+    dedupe = Deduplicator(heartbeat=100)
+    samples = [(0, 1.0), (10, 1.0), (20, 2.0), (30, 2.0), (120, 2.0), (130, 2.0)]
+
+    written = []
+    for log_time, value in samples:
+        metric = make_metric("cpu", value)
+        metric.kind = event_pb2.Metric.Kind.Absolute
+        if dedupe.should_write(table.series_id(metric), metric, log_time):
+            written.append(log_time)
+
+    assert written == [0, 20, 120]
+    assert dedupe.suppressed == 3
+
+
+def test_deduplicator_keeps_incremental_and_other_series():
+    """Test incremental samples and distinct series are never suppressed."""
+    table = SeriesTable()
+    dedupe = Deduplicator()
+    incremental = make_metric("requests", 0.0, value_type="counter")
+    incremental.kind = event_pb2.Metric.Kind.Incremental
+    other = make_metric("cpu", 0.0, {"host": "b"})
+    other.kind = event_pb2.Metric.Kind.Absolute
+
+    for log_time in range(3):
+        for metric in (incremental, other):
+            dedupe.should_write(table.series_id(metric), metric, log_time)
+
+    assert dedupe.suppressed == 2
+
+
+def test_write_mcap_dedupe(tmp_path):
+    """Test only changed samples and heartbeats reach the file."""
+    jsonl_path = tmp_path / "input.jsonl"
+    values = [0, 0, 0, 0, 1, 1, 1, 1, 1, 1]
+    jsonl_path.write_text(
+        "".join(
+            metric_line(second, "cpu", value) for second, value in enumerate(values)
+        )
+    )
+    output = str(tmp_path / "output.mcap")
+    write_mcap([str(jsonl_path)], output, dedupe=True, heartbeat=3_000_000_000)
+
+    with open(output, "rb") as f:
+        times = [message.log_time for _, _, message in make_reader(f).iter_messages()]
+    seconds = [(time - times[0]) // 1_000_000_000 for time in times]
+    assert seconds == [0, 3, 4, 7]
+    assert read_series_index(output)[0]["count"] == 4
+
+
+def test_heartbeat_requires_dedupe(tmp_path):
+    """Test --heartbeat on its own is rejected."""
+    jsonl_path = tmp_path / "input.jsonl"
+    jsonl_path.write_text(metric_line(1, "cpu", 0))
+    result = CliRunner().invoke(
+        main, [str(jsonl_path), "-o", str(tmp_path / "out.mcap"), "--heartbeat", "60"]
+    )
+    assert result.exit_code != 0
+    assert "--heartbeat requires --dedupe" in result.output
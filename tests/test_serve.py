@@ -0,0 +1,194 @@
+"""Tests for the HTTP ingestion server."""
+
+import gzip
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import vector2mcap
+from vector2mcap import serve
+from vector2mcap.serve import IngestServer, parse_batch, parse_listen_address
+
+from .conftest import message_count, metric_event, metric_line
+
+
+def ndjson(seconds):
+    """Encode events as a newline-delimited batch."""
+    return "".join(metric_line(s) for s in seconds).encode()
+
+
+def post(server, body, headers=None):
+    """POST a batch and return the status code."""
+    host, port = server.server_address
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/", data=body, headers=headers or {}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Run a server on a free local port."""
+    ingest = IngestServer(str(tmp_path / "out"), ("127.0.0.1", 0))
+    ingest.start()
+    yield ingest
+    ingest.close()
+
+
+def test_serve_ndjson_gzip_and_array_batches(server, tmp_path):
+    """Test every batch encoding ends up in the output file."""
+    assert post(server, ndjson(range(0, 10))) == 200
+    assert (
+        post(server, gzip.compress(ndjson(range(10, 20))), {"Content-Encoding": "gzip"})
+        == 200
+    )
+    array = json.dumps([metric_event(s) for s in range(20, 25)]).encode()
+    assert post(server, array, {"Content-Type": "application/json"}) == 200
+
+    outputs = server.close()
+
+    assert [message_count(path) for path in outputs] == [25]
+    assert server.stats.batches == 3 and server.stats.written == 25
+    assert not list((tmp_path / "out").glob("*.partial"))
+
+
+def test_serve_rejects_bad_input(server):
+    """Test bad encodings are refused and bad lines are counted and skipped."""
+    assert post(server, b"not gzip", {"Content-Encoding": "gzip"}) == 400
+    assert post(server, b"x", {"Content-Encoding": "br"}) == 400
+    assert post(server, ndjson([1]) + b"{broken\n" + b'{"log":"x"}\n') == 200
+
+    server.close()
+
+    assert server.stats.written == 1
+    assert server.stats.rejected_events == 2
+
+
+def test_serve_health_check(server):
+    """Test GET on the root answers Vector's health check."""
+    host, port = server.server_address
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as response:
+        assert response.status == 200
+
+
+def test_serve_rolls_files(tmp_path):
+    """Test a new file is started once the message limit is reached."""
+    with IngestServer(
+        str(tmp_path / "out"), ("127.0.0.1", 0), roll_messages=10
+    ) as ingest:
+        for start in range(0, 30, 5):
+            assert post(ingest, ndjson(range(start, start + 5))) == 200
+
+    assert [message_count(path) for path in ingest.outputs] == [10, 10, 10]
+    assert len({path.name for path in ingest.outputs}) == 3
+
+
+def test_serve_backpressure(tmp_path, monkeypatch):
+    """Test requests are refused with 429 while the writer is stuck."""
+    entered = threading.Event()
+    release = threading.Event()
+    original = serve.RollingWriter.write
+
+    def slow_write(self, event):
+        entered.set()
+        release.wait()
+        original(self, event)
+
+    monkeypatch.setattr(serve.RollingWriter, "write", slow_write)
+    ingest = IngestServer(
+        str(tmp_path / "out"),
+        ("127.0.0.1", 0),
+        max_queued_batches=1,
+        backpressure_timeout=0.05,
+    )
+    ingest.start()
+    try:
+        assert post(ingest, ndjson([0])) == 200
+        assert entered.wait(5)
+        # Fills the queue while the writer is stuck on the first batch
+        assert post(ingest, ndjson([1])) == 200
+        host, port = ingest.server_address
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(
+                urllib.request.Request(f"http://127.0.0.1:{port}/", data=ndjson([2]))
+            )
+        assert error.value.code == 429
+        assert error.value.headers["Retry-After"] == "1"
+
+        # Refused from the headers alone, without waiting for the body
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(
+                b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 60000000\r\n\r\n"
+            )
+            assert client.recv(64).startswith(b"HTTP/1.0 429")
+    finally:
+        release.set()
+        ingest.close()
+
+    assert ingest.stats.refused_batches == 2
+    assert [message_count(path) for path in ingest.outputs] == [2]
+
+
+def run_cli(args):
+    """Start the command-line tool in a subprocess with piped output."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(vector2mcap.__file__).parents[1]), env.get("PYTHONPATH", "")]
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "vector2mcap", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=env,
+    )
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_serve_finishes_file_on_sigterm(tmp_path):
+    """Test SIGTERM writes what was received and finishes the file."""
+    output = tmp_path / "out"
+    process = run_cli(["serve", "--listen", "127.0.0.1:0", "-o", str(output)])
+    try:
+        line = process.stdout.readline()
+        port = int(re.search(r":(\d+)", line).group(1))
+        server = SimpleNamespace(server_address=("127.0.0.1", port))
+        assert post(server, ndjson(range(10))) == 200
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(30) == 0
+    finally:
+        process.kill()
+
+    assert [message_count(path) for path in output.glob("*.mcap")] == [10]
+    assert not list(output.glob("*.partial"))
+
+
+def test_parse_batch_counts_rejected_lines():
+    """Test unparseable and unconvertible lines are counted."""
+    events, rejected = parse_batch(ndjson([1, 2]) + b"\n{oops\n[1]\n")
+    assert len(events) == 2
+    assert rejected == 2
+
+
+def test_parse_listen_address():
+    """Test the accepted listen address forms."""
+    assert parse_listen_address(":8080") == ("", 8080)
+    assert parse_listen_address("127.0.0.1:9000") == ("127.0.0.1", 9000)
+    assert parse_listen_address("8080") == ("", 8080)
+    with pytest.raises(ValueError):
+        parse_listen_address("localhost:http")
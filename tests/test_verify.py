@@ -0,0 +1,166 @@
+"""Tests for verifying MCAP files."""
+
+from click.testing import CliRunner
+from mcap.reader import make_reader
+
+from vector2mcap.cli import main
+from vector2mcap.filters import EventFilter, parse_time_bound
+from vector2mcap.mcap_writer import write_mcap
+from vector2mcap.verify import _input_checks, verify_mcap
+
+from .conftest import metric_line, write_lines
+
+
+def write_input(tmp_path, seconds=300, name="input.jsonl"):
+    """Write samples out of time order, as interleaved sources produce them."""
+    order = sorted(range(seconds), key=lambda second: (second * 7919) % seconds)
+    return write_lines(tmp_path / name, order)
+
+
+def test_verify_matching_file(tmp_path, small_chunks):
+    """Test a correct conversion verifies in parallel with full sampling."""
+    input_file = write_input(tmp_path)
+    output = str(tmp_path / "output.mcap")
+    write_mcap([input_file], output)
+
+    report = verify_mcap(output, [input_file], sample_rate=1.0, workers=2)
+
+    assert report.ok, report.problems
+    assert report.chunks_checked > 5
+    assert report.messages == report.input_events == 300
+    assert report.samples_checked == 300
+
+
+def test_verify_splits_large_inputs_across_workers(tmp_path):
+    """Test a large input is counted in ranges that add up to the whole."""
+    input_file = tmp_path / "input.jsonl"
+    input_file.write_text(
+        "".join(
+            metric_line(second, name=f"cpu{index}")
+            for second in range(300)
+            for index in range(40)
+        )
+    )
+    output = str(tmp_path / "output.mcap")
+    write_mcap([str(input_file)], output)
+
+    assert len(_input_checks([str(input_file)], None, 0.0, None, 4)) > 1
+    report = verify_mcap(output, [str(input_file)], sample_rate=0.01, workers=4, seed=3)
+
+    assert report.ok, report.problems
+    assert report.input_events == 12_000
+    assert report.samples_checked > 0
+
+
+def test_verify_ignores_lines_the_converter_rejects(tmp_path):
+    """Test unsupported, nameless and malformed lines are not expected in the output."""
+    input_file = tmp_path / "input.jsonl"
+    distribution = (
+        '{"metric":{"name":"latency","timestamp":"2025-07-16T15:00:00Z",'
+        '"kind":"absolute","distribution":{"samples":[],"statistic":"histogram"}}}\n'
+    )
+    nameless = '{"metric":{"timestamp":"2025-07-16T16:00:00Z","gauge":{"value":1}}}\n'
+    malformed = '{"metric":{"name":"cpu","timestamp":"2025-07-16T17:00:00Z",\n'
+    input_file.write_text(
+        metric_line(0) + distribution + metric_line(1) + nameless + malformed
+    )
+    output = str(tmp_path / "output.mcap")
+    write_mcap([str(input_file)], output)
+
+    report = verify_mcap(output, [str(input_file)])
+
+    assert report.ok, report.problems
+    assert report.input_events == 2
+
+
+def test_verify_compact_file_with_filter(tmp_path):
+    """Test compact samples and filtered conversions are compared correctly."""
+    input_file = write_input(tmp_path)
+    output = str(tmp_path / "output.mcap")
+    event_filter = EventFilter(since=parse_time_bound("2025-07-16T14:21:00Z"))
+    write_mcap([input_file], output, event_filter=event_filter, compact=True)
+
+    report = verify_mcap(
+        output,
+        [input_file],
+        EventFilter(since=parse_time_bound("2025-07-16T14:21:00Z")),
+        sample_rate=0.5,
+        seed=1,
+    )
+
+    assert report.ok, report.problems
+    assert report.input_events == 240
+    assert 0 < report.samples_checked < 240
+
+
+def test_verify_detects_missing_and_changed_events(tmp_path):
+    """Test inputs that no longer match the output are reported."""
+    input_file = write_input(tmp_path, seconds=60)
+    output = str(tmp_path / "output.mcap")
+    write_mcap([input_file], output)
+
+    with open(input_file, "a") as f:
+        f.write(metric_line(90))
+        f.write(metric_line(30, value=1000, name="other"))
+
+    report = verify_mcap(output, [input_file], sample_rate=1.0)
+
+    assert not report.ok
+    problems = "\n".join(report.problems)
+    assert "Inputs hold 62 events, output holds 60" in problems
+    assert "output spans" in problems
+    assert "Event 'other'" in problems
+
+
+def test_verify_detects_corrupt_chunk(tmp_path):
+    """Test a damaged chunk fails its checks."""
+    input_file = write_input(tmp_path)
+    output = tmp_path / "output.mcap"
+    write_mcap([input_file], str(output))
+    with open(output, "rb") as f:
+        chunk_index = make_reader(f).get_summary().chunk_indexes[0]
+
+    data = bytearray(output.read_bytes())
+    middle = chunk_index.chunk_start_offset + chunk_index.chunk_length // 2
+    data[middle] ^= 0xFF
+    output.write_bytes(bytes(data))
+
+    report = verify_mcap(str(output))
+
+    assert not report.ok
+    assert report.problems[0].startswith(
+        f"Chunk at byte {chunk_index.chunk_start_offset}"
+    )
+
+
+def test_verify_truncated_file(tmp_path):
+    """Test a file without a summary section is reported."""
+    input_file = write_input(tmp_path)
+    output = tmp_path / "output.mcap"
+    write_mcap([input_file], str(output))
+    output.write_bytes(output.read_bytes()[:-100])
+
+    report = verify_mcap(str(output))
+
+    assert not report.ok
+    assert "summary" in report.problems[0]
+
+
+def test_verify_cli(tmp_path):
+    """Test the exit status reflects the verification result."""
+    input_file = write_input(tmp_path)
+    other_file = write_input(tmp_path, seconds=10, name="other.jsonl")
+    output = str(tmp_path / "output.mcap")
+    write_mcap([input_file], output)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["verify", output, input_file, "--sample", "0.1"])
+    assert result.exit_code == 0, result.output
+    assert "Verified" in result.output
+
+    result = runner.invoke(main, ["verify", output, input_file, other_file])
+    assert result.exit_code != 0
+    assert "Inputs hold 310 events" in result.output
+
+    result = runner.invoke(main, ["verify", output, "--sample", "0.1"])
+    assert result.exit_code != 0
@@ -0,0 +1,217 @@
+"""Tests for the directory watcher."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import vector2mcap
+from vector2mcap.cli import main
+from vector2mcap.watch import (
+    STATE_FILE_NAME,
+    InputMovedError,
+    Watcher,
+    complete_end,
+    convert_range,
+)
+
+from .conftest import message_count, metric_line, write_lines
+
+
+def watch_once(input_dir, output_dir, **kwargs):
+    """Run a watcher over the files there now and return it."""
+    watcher = Watcher([str(input_dir)], str(output_dir), workers=1, **kwargs)
+    watcher.run(once=True)
+    return watcher
+
+
+def test_complete_end_stops_at_last_newline(tmp_path):
+    """Test only complete lines are counted as ready."""
+    path = tmp_path / "input.jsonl"
+    path.write_bytes(b"one\ntwo\nthr")
+    assert complete_end(str(path), 0, 11) == 8
+    assert complete_end(str(path), 8, 11) == 8
+
+
+def test_resumes_from_state_and_skips_rotated_files(tmp_path):
+    """Test appended lines, rotation by rename and restarts convert each line once."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    active = input_dir / "metrics.out"
+    write_lines(active, range(10))
+    with open(active, "a") as f:
+        f.write(metric_line(10)[:20])
+
+    first = watch_once(input_dir, output_dir)
+    assert [p.name for p in first.outputs] == ["metrics.out.mcap"]
+    assert message_count(first.outputs[0]) == 10
+    assert (output_dir / STATE_FILE_NAME).exists()
+
+    # Finish the partial line and append more, then rotate
+    with open(active, "a") as f:
+        f.write(metric_line(10)[20:] + metric_line(11))
+    active.rename(input_dir / "metrics.out.1")
+    write_lines(active, range(20, 25))
+
+    second = watch_once(input_dir, output_dir)
+    converted = len("".join(metric_line(index) for index in range(10)))
+    counts = {p.name: message_count(p) for p in second.outputs}
+    assert counts == {"metrics.out.1.%d.mcap" % converted: 2, "metrics.out-1.mcap": 5}
+
+    third = watch_once(input_dir, output_dir)
+    assert third.outputs == []
+    assert sorted(r.offset for r in third.records) == sorted(
+        [(input_dir / "metrics.out.1").stat().st_size, active.stat().st_size]
+    )
+
+
+def test_rotation_between_submission_and_collection(tmp_path):
+    """Test a file renamed before its result is collected keeps its progress."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    active = input_dir / "a.log"
+    write_lines(active, range(5))
+    watcher = Watcher(
+        [str(input_dir)], str(output_dir), settle=0, workers=1, use_inotify=False
+    )
+
+    # The in-process worker runs at once, the result is collected next poll
+    watcher.poll()
+    active.rename(input_dir / "a.log.1")
+    write_lines(active, range(10, 13))
+    watcher.poll()
+    watcher.close()
+
+    counts = {p.name: message_count(p) for p in watcher.outputs}
+    assert counts == {"a.log.mcap": 5, "a.log-1.mcap": 3}
+    assert watcher.stats.events == 8
+
+    # A worker reading a path that now holds another file refuses it
+    stat = (input_dir / "a.log.1").stat()
+    with pytest.raises(InputMovedError):
+        convert_range(
+            str(active),
+            (stat.st_dev, stat.st_ino),
+            0,
+            stat.st_size,
+            str(tmp_path / "moved.mcap"),
+        )
+
+
+def test_rolling_output_records_progress_when_finished(tmp_path):
+    """Test rolling mode writes all files into one output per roll."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    write_lines(input_dir / "a.jsonl", range(5))
+    write_lines(input_dir / "day" / "b.jsonl", range(5, 12))
+    (input_dir / "notes.txt").write_text("not metrics\n")
+
+    watcher = watch_once(input_dir, output_dir, roll_interval=3600, pattern="*.jsonl")
+
+    assert len(watcher.outputs) == 1
+    assert message_count(watcher.outputs[0]) == 12
+    assert watcher.stats.conversions == 2
+    assert all(record.offset > 0 for record in watcher.records)
+    assert not list(output_dir.glob("*.partial"))
+
+
+def test_rolling_file_holds_whole_ranges(tmp_path):
+    """Test a roll on message count waits for the range being written."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    write_lines(input_dir / "a.jsonl", range(5))
+    watcher = Watcher(
+        [str(input_dir)],
+        str(output_dir),
+        settle=0,
+        workers=1,
+        roll_interval=3600,
+        roll_messages=3,
+        use_inotify=False,
+    )
+    watcher.poll()
+    watcher.poll()
+
+    # Finished and recorded before the watcher is closed, as if it were killed
+    assert [message_count(path) for path in watcher.outputs] == [5]
+    assert [record.offset for record in watcher.records] == [
+        (input_dir / "a.jsonl").stat().st_size
+    ]
+    watcher.close()
+
+
+def test_daemon_converts_files_as_they_settle(tmp_path):
+    """Test a running watcher picks up new files and stops cleanly."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    for use_inotify in (True, False):
+        watcher = Watcher(
+            [str(input_dir)],
+            str(output_dir),
+            settle=0.2,
+            poll_interval=0.05,
+            workers=1,
+            use_inotify=use_inotify,
+        )
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            name = f"metrics-{use_inotify}.out"
+            write_lines(input_dir / name, range(3))
+            deadline = time.monotonic() + 10
+            while not watcher.outputs and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+            thread.join(10)
+
+        assert not thread.is_alive()
+        assert [p.name for p in watcher.outputs] == [name + ".mcap"]
+
+
+def test_watch_cli_once(tmp_path):
+    """Test the watch command converts existing files and exits with --once."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    write_lines(input_dir / "metrics.out", range(4))
+
+    result = CliRunner().invoke(
+        main, ["watch", str(input_dir), "-o", str(output_dir), "--once"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Converted 4 events" in result.output
+    assert message_count(output_dir / "metrics.out.mcap") == 4
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_watch_finishes_rolling_file_on_sigterm(tmp_path):
+    """Test SIGTERM finishes the rolling file and records progress."""
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    write_lines(input_dir / "metrics.out", range(6))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(vector2mcap.__file__).parents[1]), env.get("PYTHONPATH", "")]
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "vector2mcap", "watch", str(input_dir)]
+        + ["-o", str(output_dir), "--settle", "0", "--roll-interval", "3600"],
+        stdout=subprocess.DEVNULL,
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not list(output_dir.glob("*.partial")) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(30) == 0
+    finally:
+        process.kill()
+
+    assert [message_count(path) for path in output_dir.glob("*.mcap")] == [6]
+    state = json.loads((output_dir / STATE_FILE_NAME).read_text())
+    assert [entry["offset"] for entry in state["files"]] == [
+        (input_dir / "metrics.out").stat().st_size
+    ]